@@ -1,12 +1,20 @@
 import asyncio
+import base64
+import contextlib
 import hashlib
-import io
+import hmac
+import json
 import logging
+import math
+import os
 import pathlib
-import struct
-import subprocess
+import re
+import threading
+import time
 import warnings
-from collections import OrderedDict
+from collections import Counter, OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import NamedTuple
 
 # Supprimer les warnings bruit des dépendances
 warnings.filterwarnings("ignore", message=".*dropout option adds dropout.*")
@@ -14,19 +22,74 @@ warnings.filterwarnings("ignore", message=".*weight_norm.*is deprecated.*")
 warnings.filterwarnings("ignore", message=".*Trying to convert audio.*")
 logging.getLogger("phonemizer").setLevel(logging.ERROR)
 
+import anyio  # noqa: E402
 import gradio as gr  # noqa: E402
 import numpy as np  # noqa: E402
-import soundfile as sf  # noqa: E402
 from fastapi import FastAPI, Request  # noqa: E402
 from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse  # noqa: E402
 
-from tts_engine import KokoroEngine  # noqa: E402
+import tracing  # noqa: E402
+from audio_buffer import AudioBuffer  # noqa: E402
+from audio_encoder import encode_stream, wav_header  # noqa: E402
+from lexicon import Lexicon, load_lexicons  # noqa: E402
+from memory import process_memory  # noqa: E402
+from phrase_pack import PhrasePack  # noqa: E402
+from scheduler import CostModel, PriorityLock  # noqa: E402
+from shared_cache import SharedCache  # noqa: E402
+from tts_engine import INPUT_FORMATS, SAMPLE_RATE, KokoroEngine  # noqa: E402
+
+logger = logging.getLogger(__name__)
 
 MAX_INPUT_LENGTH = 750_000
 MIN_SPEED = 0.5
 MAX_SPEED = 2.0
 MAX_QUEUE_SIZE = 3
+# File des requêtes avec budget de latence : au-delà de MAX_QUEUE_SIZE, mais
+# bornée quel que soit le budget annoncé
+MAX_BUDGETED_QUEUE_SIZE = int(os.environ.get("KOKORO_MAX_BUDGETED_QUEUE", "8"))
 CACHE_MAX_ENTRIES = 100
+# Au-delà, une réponse encodée est streamée sans être gardée en cache
+CACHE_MAX_ENTRY_BYTES = 16 * 1024 * 1024
+# Lexiques de prononciation externes (un fichier .tsv/.json par lexique)
+LEXICON_DIR = os.environ.get(
+    "KOKORO_LEXICON_DIR", str(pathlib.Path(__file__).parent / "lexicons")
+)
+DEFAULT_LEXICON = "default"
+# Si défini, les endpoints /admin exigent "Authorization: Bearer <token>"
+ADMIN_TOKEN = os.environ.get("KOKORO_ADMIN_TOKEN")
+# Backends espeak indépendants du G2P (phonémisation en parallèle de l'inférence)
+G2P_POOL_SIZE = int(os.environ.get("KOKORO_G2P_POOL_SIZE", "2"))
+# Au-delà de cette durée prédite (attente + synthèse), la requête est refusée
+# avec 503 + Retry-After au lieu d'entrer en file (0 : pas de limite)
+DEADLINE_SECONDS = float(os.environ.get("KOKORO_DEADLINE_SECONDS", "0"))
+# Secondes de priorité gagnées par seconde d'attente (ordonnancement SJF)
+SJF_AGING = float(os.environ.get("KOKORO_SJF_AGING", "1.0"))
+# Backend d'inférence du modèle (eager, int8, compile) et threads torch
+INFERENCE_BACKEND = os.environ.get("KOKORO_BACKEND", "eager")
+INFERENCE_THREADS = int(os.environ.get("KOKORO_THREADS", "0")) or None
+# Poids du modèle mappés depuis ce fichier, partagés entre workers (créé au
+# premier démarrage s'il n'existe pas)
+WEIGHTS_MMAP = os.environ.get("KOKORO_WEIGHTS_MMAP") or None
+# Cache de second niveau commun aux workers (ex. /dev/shm/kokoro-tts-cache),
+# désactivé si vide, et son budget en Mio
+SHARED_CACHE_DIR = os.environ.get("KOKORO_SHARED_CACHE_DIR", "")
+SHARED_CACHE_MB = int(os.environ.get("KOKORO_SHARED_CACHE_MB", "512"))
+# Phrase pack (phrase_pack.py) : phrases servies depuis un mmap, sans le modèle
+PHRASE_PACK = os.environ.get("KOKORO_PHRASE_PACK", "")
+# Budget de latence (latency_budget / X-Latency-Budget) : sous charge, premier
+# segment raccourci à ce nombre de caractères pour tenir le budget (0 : jamais)
+SHORT_FIRST_CHARS = int(os.environ.get("KOKORO_SHORT_FIRST_CHARS", "120"))
+# Backend plus rapide (ex. int8) chargé à part, avec sa propre file, pour les
+# requêtes dont le budget ne tient pas sur le moteur principal (vide : aucun)
+FAST_BACKEND = os.environ.get("KOKORO_FAST_BACKEND", "")
+# Taille des chunks de KPipeline : le premier audio sort après ce texte
+FIRST_CHUNK_CHARS = 400
+# Traces des requêtes (tracing.py) : exporteur "file" (OTLP/JSON dans
+# KOKORO_TRACE_FILE, "-" pour stderr) ou "otel" (API OpenTelemetry), vide
+# pour désactiver, et fraction des requêtes tracées
+TRACE_EXPORTER = os.environ.get("KOKORO_TRACE_EXPORTER", "")
+TRACE_FILE = os.environ.get("KOKORO_TRACE_FILE", "-")
+TRACE_SAMPLE = float(os.environ.get("KOKORO_TRACE_SAMPLE", "1.0"))
 
 try:
     import sounddevice as sd
@@ -37,50 +100,229 @@ except Exception:
     _has_audio = False
 
 if _has_audio:
-    from audio_player import play_stream  # noqa: E402
+    from audio_player import play_stream_async  # noqa: E402
 
 _engine: KokoroEngine | None = None
+_fast_engine: KokoroEngine | None = None
+# Chargements hors boucle d'événements : un seul thread construit chaque moteur
+_engine_load_lock = threading.Lock()
 _queue_count = 0
 _audio_cache: OrderedDict[str, bytes] = OrderedDict()
+_metrics: Counter[str] = Counter()
+_lexicons: dict[str, Lexicon] = load_lexicons(LEXICON_DIR)
+_cost_model = CostModel()
+_fast_cost_model = CostModel()
+_shared_cache: SharedCache | None = (
+    SharedCache(SHARED_CACHE_DIR, SHARED_CACHE_MB * 1024 * 1024)
+    if SHARED_CACHE_DIR
+    else None
+)
+_phrase_pack: PhrasePack | None = PhrasePack(PHRASE_PACK) if PHRASE_PACK else None
+if _phrase_pack is not None and not _phrase_pack.accepts(
+    _lexicons.get(DEFAULT_LEXICON), INFERENCE_BACKEND
+):
+    # Sinon le pack serait ignoré sans bruit pour toutes les requêtes par défaut
+    logger.warning(
+        "Phrase pack %s rendu avec un autre lexique ou backend (%s) que le "
+        "lexique par défaut et %s : il ne servira pas ces requêtes",
+        PHRASE_PACK,
+        _phrase_pack.backend,
+        INFERENCE_BACKEND,
+    )
+tracing.configure(TRACE_EXPORTER, TRACE_FILE, TRACE_SAMPLE)
+# %(request_id)s utilisable dans tout format de log, sous uvicorn comme gunicorn
+tracing.install_log_request_id()
 
 
 def get_engine() -> KokoroEngine:
     global _engine
-    if _engine is None:
-        _engine = KokoroEngine()
+    with _engine_load_lock:
+        if _engine is None:
+            _engine = KokoroEngine(
+                g2p_pool_size=G2P_POOL_SIZE,
+                backend=INFERENCE_BACKEND,
+                threads=INFERENCE_THREADS,
+                phrase_pack=_phrase_pack,
+                weights=WEIGHTS_MMAP,
+            )
     return _engine
 
 
-def _cache_key(text: str, voice: str, speed: float, response_format: str) -> str:
-    raw = f"{text}|{voice}|{speed}|{response_format}"
+def get_fast_engine() -> KokoroEngine:
+    """Moteur de secours sur FAST_BACKEND, chargé au démarrage (voir _lifespan)."""
+    global _fast_engine
+    with _engine_load_lock:
+        if _fast_engine is None:
+            _fast_engine = KokoroEngine(
+                g2p_pool_size=G2P_POOL_SIZE,
+                backend=FAST_BACKEND,
+                threads=INFERENCE_THREADS,
+                phrase_pack=_phrase_pack,
+                weights=WEIGHTS_MMAP,
+            )
+    return _fast_engine
+
+
+def _fast_lane_enabled() -> bool:
+    return bool(FAST_BACKEND) and FAST_BACKEND != INFERENCE_BACKEND
+
+
+class _Plan(NamedTuple):
+    """Chemin de synthèse retenu pour une requête (X-Synthesis-Path)."""
+
+    path: str
+    lane: str = "default"
+    priority: float | None = None
+    first_segment_chars: int | None = None
+
+
+def _plans(budgeted: bool) -> list[_Plan]:
+    """Chemins possibles, du moins au plus dégradé."""
+    plans = [_Plan("full")]
+    if budgeted:
+        # Passe devant les jobs plus récents que leur propre coût
+        plans.append(_Plan("priority", priority=0.0))
+        if SHORT_FIRST_CHARS:
+            plans.append(_Plan("short_first", "default", 0.0, SHORT_FIRST_CHARS))
+        # Les estimations supposent le modèle chargé : pas de voie rapide avant
+        if _fast_lane_enabled() and _fast_engine is not None:
+            plans.append(_Plan("fast", "fast", 0.0, SHORT_FIRST_CHARS or None))
+    return plans
+
+
+def _lane(name: str) -> tuple[PriorityLock, CostModel, Callable[[], KokoroEngine]]:
+    """File, modèle de coût et moteur d'une voie de synthèse."""
+    if name == "fast":
+        return _fast_lock, _fast_cost_model, get_fast_engine
+    return _engine_lock, _cost_model, get_engine
+
+
+def _cache_key(
+    text: str, voice: str, speed: float, response_format: str, *variant: str
+) -> str:
+    raw = "|".join([text, voice, str(speed), response_format, *variant])
     return hashlib.sha256(raw.encode()).hexdigest()
 
 
-def _cache_get(key: str) -> bytes | None:
+def _get_lexicon(name: str | None) -> Lexicon | None:
+    """Lexique demandé, ou le lexique par défaut s'il existe. KeyError si inconnu."""
+    if name is None:
+        return _lexicons.get(DEFAULT_LEXICON)
+    return _lexicons[name]
+
+
+def _lexicon_variant(lexicon: Lexicon | None) -> str:
+    # Le contenu du lexique change l'audio : il fait partie de la clé de cache
+    return f"{lexicon.name}:{lexicon.version}" if lexicon is not None else ""
+
+
+def _pack_used(
+    lexicon: Lexicon | None, input_format: str = "text", backend: str = ""
+) -> bool:
+    """Vrai si le moteur sert les phrases du pack pour ce lexique et ce backend."""
+    return (
+        _phrase_pack is not None
+        and input_format == "text"
+        and _phrase_pack.accepts(lexicon, backend or INFERENCE_BACKEND)
+    )
+
+
+def _packed(
+    text: str,
+    voice: str,
+    speed: float,
+    lexicon: Lexicon | None = None,
+    input_format: str = "text",
+) -> bool:
+    """Vrai si le texte entier est dans le phrase pack : ni file ni modèle."""
+    return (
+        _pack_used(lexicon, input_format)
+        and _phrase_pack.pcm(text, voice, speed) is not None
+    )
+
+
+async def _cache_get(key: str) -> bytes | None:
     if key in _audio_cache:
         _audio_cache.move_to_end(key)
         return _audio_cache[key]
+    if _shared_cache is not None:
+        # Lecture de fichier (jusqu'à 16 Mo) : hors de la boucle asyncio
+        data = await asyncio.to_thread(_shared_cache.get, key)
+        if data is not None:
+            # Synthétisé par un autre worker : remonté dans le cache local
+            _metrics["shared_cache_hits"] += 1
+            _cache_put_local(key, data)
+            return data
     return None
 
 
-def _cache_put(key: str, data: bytes) -> None:
+async def _cache_put(key: str, data: bytes) -> None:
+    _cache_put_local(key, data)
+    if _shared_cache is not None:
+        try:
+            await asyncio.to_thread(_shared_cache.put, key, data)
+        except OSError:
+            logger.warning("Écriture impossible dans le cache partagé", exc_info=True)
+
+
+def _cache_put_local(key: str, data: bytes) -> None:
     _audio_cache[key] = data
     _audio_cache.move_to_end(key)
     while len(_audio_cache) > CACHE_MAX_ENTRIES:
         _audio_cache.popitem(last=False)
 
 
-def synthesize(text: str) -> tuple[int, np.ndarray]:
-    """Génère l'audio et renvoie l'audio complet pour Gradio. Joue sur les HP si disponible."""
-    engine = get_engine()
-    sr = engine.sample_rate
-    if _has_audio:
-        chunks = play_stream(engine.generate_stream(text), sr)
-    else:
-        chunks = list(engine.generate_stream(text))
-    if not chunks:
-        return sr, np.array([], dtype=np.float32)
-    return sr, np.concatenate(chunks)
+async def synthesize(text: str) -> AsyncIterator[tuple[int, np.ndarray]]:
+    """Streame l'audio vers Gradio au fil de la synthèse. Joue sur les HP si disponible.
+
+    Même chemin que l'API : file du moteur (_engine_chunks), limite de file
+    et cache audio. Le document complet n'est jamais attendu avant de jouer.
+    """
+    global _queue_count
+    voice, speed, lexicon = "ff_siwis", 1.0, _get_lexicon(None)
+    # Sans charger le modèle : un hit de cache ou un texte vide reste instantané
+    sr = SAMPLE_RATE
+    pack = (f"pack:{_phrase_pack.version}",) if _pack_used(lexicon) else ()
+    key = _cache_key(
+        text,
+        voice,
+        speed,
+        "gradio",
+        _lexicon_variant(lexicon),
+        INFERENCE_BACKEND,
+        *pack,
+    )
+    cached = await _cache_get(key)
+    if cached is not None:
+        yield sr, np.frombuffer(cached, dtype=np.int16)
+        return
+    if not text.strip():
+        return
+    if _queue_count >= MAX_QUEUE_SIZE:
+        raise gr.Error("Serveur occupé, réessayez dans quelques secondes.")
+
+    _queue_count += 1
+    # Accumule pour le cache tant que l'audio tient dans une entrée
+    buf = AudioBuffer(dither=True)
+    cacheable = True
+    try:
+        async with contextlib.aclosing(
+            _engine_chunks(text, voice, speed, lexicon=lexicon)
+        ) as chunks:
+            if _has_audio:
+                chunks = play_stream_async(chunks, sr)
+            async for chunk in chunks:
+                if cacheable and (len(buf) + len(chunk)) * 2 > CACHE_MAX_ENTRY_BYTES:
+                    cacheable = False
+                if not cacheable:
+                    buf.clear()
+                # Copie : Gradio garde le chunk, la vue serait invalidée
+                # par le prochain append
+                yield sr, buf.append(chunk).copy()
+        if cacheable:
+            await _cache_put(key, buf.tobytes())
+    finally:
+        _queue_count -= 1
 
 
 # --- Gradio interface ---
@@ -92,7 +334,7 @@ demo = gr.Interface(
         placeholder="Entrez le texte en français...",
         lines=4,
     ),
-    outputs=gr.Audio(label="Audio généré", type="numpy"),
+    outputs=gr.Audio(label="Audio généré", type="numpy", streaming=True, autoplay=True),
     title="Text-to-Speech Français",
     description="Synthèse vocale en français avec Kokoro.",
     api_name="predict",
@@ -101,32 +343,24 @@ demo = gr.Interface(
 
 # --- FastAPI custom routes (registered BEFORE Gradio's catch-all) ---
 
-app = FastAPI()
 
-_engine_lock = asyncio.Lock()
-_HERE = pathlib.Path(__file__).parent
+@contextlib.asynccontextmanager
+async def _lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # Le moteur de secours doit être prêt avant la première requête dégradée :
+    # le charger à la demande bloquerait sa voie pendant toute la quantification
+    if _fast_lane_enabled():
+        await asyncio.to_thread(get_fast_engine)
+    yield
 
 
-def _wav_header(sample_rate: int = 24000, bits: int = 16, channels: int = 1) -> bytes:
-    """Header WAV avec taille inconnue (streaming)."""
-    block_align = channels * bits // 8
-    byte_rate = sample_rate * block_align
-    return struct.pack(
-        "<4sI4s4sIHHIIHH4sI",
-        b"RIFF",
-        0xFFFFFFFF,  # taille totale inconnue
-        b"WAVE",
-        b"fmt ",
-        16,  # PCM
-        1,
-        channels,
-        sample_rate,
-        byte_rate,
-        block_align,
-        bits,
-        b"data",
-        0xFFFFFFFF,  # taille data inconnue
-    )
+app = FastAPI(lifespan=_lifespan)
+# X-Request-ID et span racine de chaque requête
+app.add_middleware(tracing.TracingMiddleware)
+
+# Le job estimé le plus court passe d'abord (voir scheduler.py)
+_engine_lock = PriorityLock(aging=SJF_AGING)
+_fast_lock = PriorityLock(aging=SJF_AGING)
+_HERE = pathlib.Path(__file__).parent
 
 
 @app.get("/test", response_class=HTMLResponse)
@@ -134,67 +368,140 @@ async def test_page():
     return (_HERE / "test.html").read_text()
 
 
-def _encode_wav(pcm_chunks: list[bytes], sample_rate: int = 24000) -> bytes:
-    """Assemble PCM int16 chunks into a complete WAV file."""
-    pcm_data = b"".join(pcm_chunks)
-    bits = 16
-    channels = 1
-    block_align = channels * bits // 8
-    byte_rate = sample_rate * block_align
-    data_size = len(pcm_data)
-    header = struct.pack(
-        "<4sI4s4sIHHIIHH4sI",
-        b"RIFF",
-        36 + data_size,
-        b"WAVE",
-        b"fmt ",
-        16,
-        1,
-        channels,
-        sample_rate,
-        byte_rate,
-        block_align,
-        bits,
-        b"data",
-        data_size,
-    )
-    return header + pcm_data
-
-
-def _encode_audio(pcm_chunks: list[bytes], fmt: str, sample_rate: int = 24000) -> bytes:
-    """Encode PCM int16 chunks to the requested format."""
-    if fmt == "wav":
-        return _encode_wav(pcm_chunks, sample_rate)
-
-    # Reconstruct float32 from int16 for soundfile/ffmpeg
-    pcm_data = b"".join(pcm_chunks)
-    int16_arr = np.frombuffer(pcm_data, dtype=np.int16)
-    float32_arr = int16_arr.astype(np.float32) / 32768.0
-
-    if fmt == "mp3":
-        # Use ffmpeg to encode to mp3
-        wav_buf = io.BytesIO()
-        sf.write(wav_buf, float32_arr, sample_rate, format="WAV", subtype="PCM_16")
-        wav_bytes = wav_buf.getvalue()
-        result = subprocess.run(
-            ["ffmpeg", "-i", "pipe:0", "-f", "mp3", "-ab", "192k", "pipe:1"],
-            input=wav_bytes,
-            capture_output=True,
-        )
-        return result.stdout
-
-    if fmt == "opus":
-        wav_buf = io.BytesIO()
-        sf.write(wav_buf, float32_arr, sample_rate, format="WAV", subtype="PCM_16")
-        wav_bytes = wav_buf.getvalue()
-        result = subprocess.run(
-            ["ffmpeg", "-i", "pipe:0", "-f", "opus", "-ab", "128k", "pipe:1"],
-            input=wav_bytes,
-            capture_output=True,
+@app.get("/v1/metrics")
+async def metrics():
+    return {
+        "queue": _queue_count,
+        "backlog_seconds": round(_engine_lock.backlog(), 3),
+        **(
+            {"fast_backlog_seconds": round(_fast_lock.backlog(), 3)}
+            if FAST_BACKEND
+            else {}
+        ),
+        "seconds_per_char": _cost_model.snapshot(),
+        **(
+            {"shared_cache": await asyncio.to_thread(_shared_cache.stats)}
+            if _shared_cache
+            else {}
+        ),
+        **_metrics,
+    }
+
+
+@app.get("/v1/memory")
+async def memory():
+    """Mémoire de ce worker : processus, moteurs chargés (sans les charger),
+    caches."""
+    return {
+        "pid": os.getpid(),
+        "process": process_memory(),
+        "engine": _engine.memory() if _engine is not None else None,
+        # Moteur FAST_BACKEND (budgets de latence) : une seconde copie du modèle
+        "fast_engine": _fast_engine.memory() if _fast_engine is not None else None,
+        "audio_cache": {
+            "entries": len(_audio_cache),
+            "bytes": sum(len(data) for data in _audio_cache.values()),
+        },
+        **(
+            {"shared_cache": await asyncio.to_thread(_shared_cache.stats)}
+            if _shared_cache
+            else {}
+        ),
+    }
+
+
+_SENTINEL = object()
+
+
+async def _engine_chunks(
+    text: str,
+    voice: str,
+    speed: float,
+    is_disconnected: Callable[[], Awaitable[bool]] | None = None,
+    timestamps: bool = False,
+    priority: float | None = None,
+    lane: str = "default",
+    **options,
+) -> AsyncIterator:
+    """Pilote generate_stream depuis la boucle asyncio en tenant _engine_lock.
+
+    L'annulation est coopérative : si le client se déconnecte, le générateur
+    s'arrête à la prochaine frontière de segment/chunk, et le verrou est
+    relâché dès que le chunk en cours d'inférence est terminé.
+
+    Avec ``timestamps=True``, yield des tuples ``(audio, timings)`` issus de
+    generate_stream_with_timings au lieu de l'audio seul. Les ``options``
+    (lexicon...) sont transmises telles quelles au moteur.
+
+    Le verrou est attribué selon le coût estimé par _cost_model, qui est
+    recalibré avec le temps de calcul mesuré quand la synthèse va au bout.
+    ``priority`` remplace ce coût dans la file ; ``lane="fast"`` passe par
+    le moteur FAST_BACKEND, sa file et son propre modèle de coût.
+    Un texte présent tel quel dans le phrase pack est servi sans le verrou.
+    """
+    if _packed(
+        text, voice, speed, options.get("lexicon"), options.get("input_format", "text")
+    ):
+        _metrics["phrase_pack_hits"] += 1
+        sr = _phrase_pack.sample_rate
+        position = 0
+        for chunk in _phrase_pack.chunks(text, voice, speed):
+            if timestamps:
+                start, position = position, position + len(chunk)
+                timing = {"text": text, "phonemes": "", "start": start / sr}
+                yield chunk, {**timing, "end": position / sr, "words": []}
+            else:
+                yield chunk
+        return
+
+    cancel = threading.Event()
+    lock, cost_model, engine_for = _lane(lane)
+    cost = cost_model.estimate(len(text), voice, speed)
+    # Spans ouverts sans être courants : ce générateur cède la main entre
+    # deux chunks
+    queued = tracing.start("engine.queue", lane=lane, estimate=round(cost, 3))
+    async with lock.hold(cost, priority):
+        queued.end()
+        synthesis = tracing.start("engine.synthesis", chars=len(text), lane=lane)
+        engine = await asyncio.to_thread(engine_for)
+        generate = (
+            engine.generate_stream_with_timings
+            if timestamps
+            else engine.generate_stream
         )
-        return result.stdout
-
-    return _encode_wav(pcm_chunks, sample_rate)
+        it = iter(generate(text, voice=voice, speed=speed, cancel=cancel, **options))
+        pending: asyncio.Future | None = None
+        compute = 0.0
+        try:
+            while True:
+                if is_disconnected is not None and await is_disconnected():
+                    _metrics["cancelled"] += 1
+                    return
+                start = time.perf_counter()
+                # Le thread hérite du span : G2P et inférence s'y rattachent
+                with tracing.activate(synthesis):
+                    pending = asyncio.ensure_future(
+                        asyncio.to_thread(next, it, _SENTINEL)
+                    )
+                chunk = await asyncio.shield(pending)
+                pending = None
+                # Seul le temps passé dans le moteur compte, pas celui du client
+                compute += time.perf_counter() - start
+                if chunk is _SENTINEL:
+                    cost_model.observe(len(text), voice, speed, compute)
+                    return
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            _metrics["cancelled"] += 1
+            raise
+        finally:
+            synthesis.end()
+            cancel.set()
+            if pending is not None:
+                # Le thread utilise encore le modèle : on attend la fin du chunk
+                # en cours avant de relâcher le verrou.
+                with anyio.CancelScope(shield=True):
+                    await asyncio.wait([pending])
 
 
 _FORMAT_MEDIA_TYPES = {
@@ -204,106 +511,423 @@ _FORMAT_MEDIA_TYPES = {
 }
 
 
+# Un audio en cache est figé : cache partagé autorisé
+CACHE_CONTROL = "public, max-age=86400"
+# Le décodeur de Kokoro injecte du bruit aléatoire : deux synthèses des mêmes
+# paramètres ne donnent pas les mêmes octets. Un flux synthétisé ne porte donc
+# ni ETag ni autorisation de cache.
+STREAM_CACHE_CONTROL = "no-store"
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _cache_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparaison faible (RFC 9110) : on ignore un éventuel préfixe W/
+    return etag in (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Premier et dernier octet (inclus) d'un ``Range: bytes=...`` simple.
+
+    None si l'en-tête doit être ignoré (plusieurs intervalles, syntaxe
+    invalide) : on renvoie alors la ressource complète. Un premier octet
+    au-delà de ``size`` signale un intervalle non satisfiable.
+    """
+    m = _RANGE_RE.fullmatch(header.strip())
+    if m is None or m.group(0) == "bytes=-":
+        return None
+    first, last = m.groups()
+    if not first:
+        # Suffixe : les N derniers octets
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _cached_response(
+    request: Request, data: bytes, etag: str, response_format: str
+) -> Response:
+    """Réponse pour un audio complet en cache : ETag fort, 304 et Range."""
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    media_type = _FORMAT_MEDIA_TYPES[response_format]
+    headers = {**_cache_headers(etag), "Accept-Ranges": "bytes"}
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    byte_range = (
+        _parse_range(range_header, len(data))
+        if range_header and (if_range is None or if_range == etag)
+        else None
+    )
+    if byte_range is None:
+        return Response(content=data, media_type=media_type, headers=headers)
+    start, end = byte_range
+    if start >= len(data):
+        return Response(
+            status_code=416,
+            headers={**headers, "Content-Range": f"bytes */{len(data)}"},
+        )
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+    return Response(
+        content=data[start : end + 1],
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def _check_admin(request: Request) -> JSONResponse | None:
+    # Sans jeton configuré, les routes d'administration restent fermées
+    if not ADMIN_TOKEN:
+        return JSONResponse(
+            {"error": "admin endpoints disabled, set KOKORO_ADMIN_TOKEN"},
+            status_code=403,
+        )
+    authorization = request.headers.get("authorization", "")
+    if not hmac.compare_digest(
+        authorization.encode(), f"Bearer {ADMIN_TOKEN}".encode()
+    ):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+    return None
+
+
+def _lexicons_summary() -> dict:
+    return {
+        "lexicons": {
+            name: {"entries": len(lexicon), "version": lexicon.version}
+            for name, lexicon in _lexicons.items()
+        }
+    }
+
+
+@app.get("/admin/lexicons")
+async def list_lexicons(request: Request):
+    if (denied := _check_admin(request)) is not None:
+        return denied
+    return _lexicons_summary()
+
+
+@app.post("/admin/lexicons/reload")
+async def reload_lexicons(request: Request):
+    """Recharge les lexiques depuis LEXICON_DIR, sans toucher au modèle.
+
+    En cas d'erreur de parsing, les lexiques précédents restent en place.
+    """
+    global _lexicons
+    if (denied := _check_admin(request)) is not None:
+        return denied
+    try:
+        lexicons = await asyncio.to_thread(load_lexicons, LEXICON_DIR)
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        return JSONResponse({"error": f"reload failed: {exc}"}, status_code=422)
+    _lexicons = lexicons
+    return _lexicons_summary()
+
+
+def _sse_event(event: str, data: dict) -> str:
+    payload = json.dumps({"type": event, **data}, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
 @app.post("/v1/audio/speech")
 async def speech(request: Request):
+    return await _speech(request, await request.json())
+
+
+@app.get("/v1/audio/speech")
+async def speech_get(request: Request):
+    """Même synthèse, paramètres en query string : une URL stable que
+    navigateurs, lecteurs audio et CDN peuvent mettre en cache."""
+    return await _speech(request, dict(request.query_params))
+
+
+async def _speech(request: Request, body: dict):
     global _queue_count
 
-    body = await request.json()
     text = body.get("input", "")
     voice = body.get("voice", "ff_siwis")
     speed = float(body.get("speed", 1.0))
     response_format = body.get("response_format", "wav")
+    stream_format = body.get("stream_format", "audio")
+    lexicon_name = body.get("lexicon")
+    input_format = body.get("input_format", "text")
+    budget = body.get("latency_budget", request.headers.get("x-latency-budget"))
 
     # --- Validation ---
-    if not voice:
-        return JSONResponse({"error": "voice must not be empty"}, status_code=422)
-    if len(text) > MAX_INPUT_LENGTH:
-        return JSONResponse(
-            {"error": f"input exceeds {MAX_INPUT_LENGTH} characters"},
-            status_code=422,
+    with tracing.span("validate"):
+        if not voice:
+            return JSONResponse({"error": "voice must not be empty"}, status_code=422)
+        if len(text) > MAX_INPUT_LENGTH:
+            return JSONResponse(
+                {"error": f"input exceeds {MAX_INPUT_LENGTH} characters"},
+                status_code=422,
+            )
+        if not (MIN_SPEED <= speed <= MAX_SPEED):
+            return JSONResponse(
+                {"error": f"speed must be between {MIN_SPEED} and {MAX_SPEED}"},
+                status_code=422,
+            )
+        if response_format not in _FORMAT_MEDIA_TYPES:
+            return JSONResponse(
+                {
+                    "error": f"response_format must be one of: {', '.join(_FORMAT_MEDIA_TYPES)}"
+                },
+                status_code=422,
+            )
+        if stream_format not in ("audio", "sse"):
+            return JSONResponse(
+                {"error": "stream_format must be one of: audio, sse"},
+                status_code=422,
+            )
+        if stream_format == "sse" and response_format != "wav":
+            return JSONResponse(
+                {"error": "stream_format sse only supports PCM (response_format wav)"},
+                status_code=422,
+            )
+
+        if input_format not in INPUT_FORMATS:
+            return JSONResponse(
+                {"error": f"input_format must be one of: {', '.join(INPUT_FORMATS)}"},
+                status_code=422,
+            )
+        if budget is not None:
+            try:
+                budget = float(budget)
+            except (TypeError, ValueError):
+                budget = math.nan
+            if not budget > 0:
+                return JSONResponse(
+                    {"error": "latency_budget must be a positive number of seconds"},
+                    status_code=422,
+                )
+        try:
+            lexicon = _get_lexicon(lexicon_name)
+        except KeyError:
+            return JSONResponse(
+                {"error": f"unknown lexicon: {lexicon_name}"},
+                status_code=422,
+            )
+    # Options transmises au moteur ; elles changent l'audio, donc la clé de cache
+    options = {"lexicon": lexicon, "input_format": input_format}
+
+    def plan_key(plan: _Plan) -> str:
+        # Backend, premier segment raccourci et phrases du pack changent l'audio
+        backend = FAST_BACKEND if plan.lane == "fast" else INFERENCE_BACKEND
+        extra = (
+            (f"first:{plan.first_segment_chars}",) if plan.first_segment_chars else ()
         )
-    if not (MIN_SPEED <= speed <= MAX_SPEED):
-        return JSONResponse(
-            {"error": f"speed must be between {MIN_SPEED} and {MAX_SPEED}"},
-            status_code=422,
+        if _pack_used(lexicon, input_format, backend):
+            extra += (f"pack:{_phrase_pack.version}",)
+        return _cache_key(
+            text,
+            voice,
+            speed,
+            response_format,
+            _lexicon_variant(lexicon),
+            input_format,
+            backend,
+            *extra,
         )
-    if response_format not in _FORMAT_MEDIA_TYPES:
+
+    # --- Cache HTTP : ETag, requêtes conditionnelles, Range ---
+    # Seul un audio en cache a des octets figés : la clé lui sert d'ETag fort.
+    plans = _plans(budget is not None)
+    if stream_format == "audio":
+        # Avec un budget, une version dégradée déjà en cache convient aussi
+        with tracing.span("cache.lookup") as lookup:
+            for variant in dict.fromkeys(plan_key(plan) for plan in plans):
+                cached = await _cache_get(variant)
+                if cached is not None:
+                    lookup.set("cache.hit", True)
+                    tracing.current().set("synthesis.path", "cache")
+                    response = _cached_response(
+                        request, cached, f'"{variant}"', response_format
+                    )
+                    response.headers["X-Synthesis-Path"] = "cache"
+                    return response
+            lookup.set("cache.hit", False)
+
+    # --- Admission : file pleine, budget ou échéance impossibles à tenir ---
+    # Avec un budget de latence, on retient le premier chemin dont le délai
+    # prédit avant le premier audio (attente + premier chunk) tient le budget.
+    if _packed(text, voice, speed, **options):
+        plan, wait, estimate, first = _Plan("phrase_pack"), 0.0, 0.0, 0.0
+    else:
+        for plan in plans:
+            lock, cost_model, _engine_for = _lane(plan.lane)
+            estimate = cost_model.estimate(len(text), voice, speed)
+            wait = lock.wait_estimate(estimate, plan.priority)
+            first_chars = plan.first_segment_chars or FIRST_CHUNK_CHARS
+            first = cost_model.estimate(min(len(text), first_chars), voice, speed)
+            if budget is None or wait + first <= budget:
+                break
+        else:
+            _metrics["rejected_budget"] += 1
+            return JSONResponse(
+                {
+                    "error": "request would exceed its latency budget",
+                    "estimated_first_audio_seconds": round(wait + first, 3),
+                    "latency_budget": budget,
+                },
+                status_code=503,
+                headers={"Retry-After": _retry_after(wait)},
+            )
+        # Un budget tenu donne accès à une file plus longue, mais bornée
+        limit = MAX_QUEUE_SIZE if budget is None else MAX_BUDGETED_QUEUE_SIZE
+        if _queue_count >= limit:
+            return JSONResponse(
+                {"error": "server busy, too many pending requests"},
+                status_code=503,
+                headers={"Retry-After": _retry_after(lock.backlog())},
+            )
+    if DEADLINE_SECONDS and wait + estimate > DEADLINE_SECONDS:
+        _metrics["rejected_deadline"] += 1
         return JSONResponse(
             {
-                "error": f"response_format must be one of: {', '.join(_FORMAT_MEDIA_TYPES)}"
+                "error": "request would exceed the synthesis deadline",
+                "estimated_seconds": round(wait + estimate, 3),
+                "deadline_seconds": DEADLINE_SECONDS,
             },
-            status_code=422,
-        )
-
-    # --- Queue limit ---
-    if _queue_count >= MAX_QUEUE_SIZE:
-        return JSONResponse(
-            {"error": "server busy, too many pending requests"},
             status_code=503,
+            headers={"Retry-After": _retry_after(wait)},
         )
+    _metrics[f"path_{plan.path}"] += 1
+    tracing.current().set("synthesis.path", plan.path)
+    if plan.first_segment_chars:
+        options["first_segment_chars"] = plan.first_segment_chars
+    lane = {"priority": plan.priority, "lane": plan.lane}
+    key = plan_key(plan)
+    eta_headers = {
+        "X-Estimated-Wait": f"{wait:.3f}",
+        "X-Estimated-Duration": f"{estimate:.3f}",
+        "X-Synthesis-Path": plan.path,
+        "Cache-Control": STREAM_CACHE_CONTROL,
+    }
+
+    # --- Server-sent events: PCM base64 + timings par chunk ---
+    if stream_format == "sse":
+
+        async def sse_stream():
+            global _queue_count
+            _queue_count += 1
+            buf = AudioBuffer(dither=True)
+            try:
+                async with contextlib.aclosing(
+                    _engine_chunks(
+                        text,
+                        voice,
+                        speed,
+                        request.is_disconnected,
+                        timestamps=True,
+                        **lane,
+                        **options,
+                    )
+                ) as chunks:
+                    async for chunk, timings in chunks:
+                        buf.clear()
+                        with tracing.span("pcm", samples=len(chunk)):
+                            audio = base64.b64encode(buf.append(chunk)).decode()
+                        yield _sse_event("speech.audio.delta", {"audio": audio})
+                        yield _sse_event("speech.audio.timestamps", timings)
+                yield _sse_event("speech.audio.done", {})
+            finally:
+                _queue_count -= 1
 
-    # --- Cache check ---
-    key = _cache_key(text, voice, speed, response_format)
-    cached = _cache_get(key)
-    if cached is not None:
-        return Response(
-            content=cached,
-            media_type=_FORMAT_MEDIA_TYPES[response_format],
+        return StreamingResponse(
+            sse_stream(), media_type="text/event-stream", headers=eta_headers
         )
 
     # --- Streaming WAV (default fast path) ---
     if response_format == "wav" and not text:
         # Empty text → header only
         async def empty_stream():
-            yield _wav_header()
+            yield wav_header()
 
-        return StreamingResponse(empty_stream(), media_type="audio/wav")
+        return StreamingResponse(
+            empty_stream(), media_type="audio/wav", headers=eta_headers
+        )
 
     if response_format == "wav":
 
         async def wav_stream():
             global _queue_count
             _queue_count += 1
+            # Réutilisé comme anneau : un seul buffer de conversion par requête
+            buf = AudioBuffer(dither=True)
             try:
-                yield _wav_header()
-                async with _engine_lock:
-                    engine = get_engine()
-                    it = iter(engine.generate_stream(text, voice=voice, speed=speed))
-                    sentinel = object()
-                    while True:
-                        chunk = await asyncio.to_thread(next, it, sentinel)
-                        if chunk is sentinel:
-                            break
-                        pcm = (chunk * 32767).clip(-32768, 32767).astype(np.int16)
-                        yield pcm.tobytes()
+                yield wav_header()
+                async with contextlib.aclosing(
+                    _engine_chunks(
+                        text, voice, speed, request.is_disconnected, **lane, **options
+                    )
+                ) as chunks:
+                    async for chunk in chunks:
+                        buf.clear()
+                        with tracing.span("pcm", samples=len(chunk)):
+                            pcm = buf.append(chunk).tobytes()
+                        yield pcm
             finally:
                 _queue_count -= 1
 
-        return StreamingResponse(wav_stream(), media_type="audio/wav")
-
-    # --- Non-streaming formats (mp3, opus): collect all chunks then encode ---
-    _queue_count += 1
-    try:
-        pcm_chunks: list[bytes] = []
-        async with _engine_lock:
-            engine = get_engine()
-            it = iter(engine.generate_stream(text, voice=voice, speed=speed))
-            sentinel = object()
-            while True:
-                chunk = await asyncio.to_thread(next, it, sentinel)
-                if chunk is sentinel:
-                    break
-                pcm = (chunk * 32767).clip(-32768, 32767).astype(np.int16)
-                pcm_chunks.append(pcm.tobytes())
-
-        encoded = await asyncio.to_thread(_encode_audio, pcm_chunks, response_format)
-        _cache_put(key, encoded)
-        return Response(
-            content=encoded,
-            media_type=_FORMAT_MEDIA_TYPES[response_format],
+        return StreamingResponse(
+            wav_stream(), media_type="audio/wav", headers=eta_headers
         )
-    finally:
-        _queue_count -= 1
+
+    # --- Formats encodés (mp3, opus) : PCM streamé à travers ffmpeg ---
+    async def encoded_stream():
+        global _queue_count
+        _queue_count += 1
+        buf = AudioBuffer(dither=True)
+
+        async def pcm_stream():
+            async with contextlib.aclosing(
+                _engine_chunks(
+                    text, voice, speed, request.is_disconnected, **lane, **options
+                )
+            ) as chunks:
+                async for chunk in chunks:
+                    buf.clear()
+                    with tracing.span("pcm", samples=len(chunk)):
+                        pcm = buf.append(chunk).tobytes()
+                    yield pcm
+
+        encoded = bytearray()
+        cacheable = True
+        # Durée de vie de ffmpeg, du premier PCM au dernier octet encodé
+        encoding = tracing.start("encode", format=response_format)
+        try:
+            async for data in encode_stream(pcm_stream(), response_format):
+                if cacheable:
+                    encoded += data
+                    if len(encoded) > CACHE_MAX_ENTRY_BYTES:
+                        cacheable = False
+                        encoded = bytearray()
+                yield data
+            # Un flux interrompu par une déconnexion ne doit pas entrer en cache
+            if cacheable and not await request.is_disconnected():
+                await _cache_put(key, bytes(encoded))
+        finally:
+            encoding.end()
+            _queue_count -= 1
+
+    return StreamingResponse(
+        encoded_stream(),
+        media_type=_FORMAT_MEDIA_TYPES[response_format],
+        headers=eta_headers,
+    )
 
 
 # Mount Gradio on our FastAPI app — Gradio's catch-all goes last
@@ -318,4 +942,13 @@ if __name__ == "__main__":
     parser.add_argument("--public", action="store_true", help="Écouter sur 0.0.0.0")
     args = parser.parse_args()
 
+    # L'identifiant de requête (X-Request-ID) préfixe chaque ligne de log
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        logging.Formatter(
+            "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+        )
+    )
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
+
     uvicorn.run(app, host="0.0.0.0" if args.public else "127.0.0.1", port=7860)
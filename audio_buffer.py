@@ -0,0 +1,116 @@
+import numpy as np
+
+# Même échelle que l'ancienne conversion (chunk * 32767).clip(...).astype(np.int16)
+_INT16_SCALE = 32767.0
+_INT16_MIN = -32768
+_INT16_MAX = 32767
+
+
+def float_to_pcm16(
+    audio: np.ndarray,
+    out: np.ndarray,
+    scratch: np.ndarray | None = None,
+    rng: np.random.Generator | None = None,
+) -> np.ndarray:
+    """Convertit un chunk float32 [-1, 1] en int16 dans ``out`` (même longueur).
+
+    Tout le calcul se fait dans ``scratch`` (float32, au moins aussi long que
+    ``audio``) pour éviter les tableaux temporaires de l'expression naïve.
+    Avec ``rng``, un dither TPDF de ±1 LSB est ajouté avant l'arrondi.
+    """
+    n = len(audio)
+    if scratch is None:
+        scratch = np.empty(n, dtype=np.float32)
+    work = scratch[:n]
+    np.multiply(audio, _INT16_SCALE, out=work, casting="unsafe")
+    if rng is not None:
+        noise = scratch[n : 2 * n] if len(scratch) >= 2 * n else np.empty_like(work)
+        rng.random(out=noise, dtype=np.float32)
+        work += noise
+        rng.random(out=noise, dtype=np.float32)
+        work -= noise
+        np.rint(work, out=work)
+    np.clip(work, _INT16_MIN, _INT16_MAX, out=work)
+    np.copyto(out, work, casting="unsafe")
+    return out
+
+
+class AudioBuffer:
+    """Arena audio croissante, partagée par l'API, Gradio et les encodeurs.
+
+    Les chunks float32 du moteur sont écrits à la suite dans un tableau
+    préalloué (int16 converti en place, ou float32 copié) qui grandit par
+    ``realloc`` quand c'est possible : pas de liste de chunks ni de
+    ``np.concatenate`` final, et pas d'aller-retour float → int → float
+    avant l'encodage.
+
+    Les vues renvoyées par :meth:`append` et :attr:`samples` ne restent
+    valides que jusqu'au prochain ``append`` ou ``clear``.
+    """
+
+    def __init__(
+        self,
+        dtype: type = np.int16,
+        capacity: int = 24_000 * 10,
+        dither: bool = False,
+        seed: int = 0,
+    ) -> None:
+        self.dtype = np.dtype(dtype)
+        self._data = np.empty(capacity, dtype=self.dtype)
+        self._scratch = np.empty(0, dtype=np.float32)
+        self._size = 0
+        # Graine fixe : même texte → mêmes octets, ce qui garde le cache déterministe
+        self._rng = np.random.default_rng(seed) if dither else None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def samples(self) -> np.ndarray:
+        """Vue sur les échantillons écrits."""
+        return self._data[: self._size]
+
+    def append(self, audio: np.ndarray) -> np.ndarray:
+        """Ajoute un chunk float32 et renvoie la vue sur la partie écrite."""
+        n = len(audio)
+        self._reserve(self._size + n)
+        dest = self._data[self._size : self._size + n]
+        if self.dtype == np.int16:
+            if len(self._scratch) < 2 * n:
+                self._scratch = np.empty(2 * n, dtype=np.float32)
+            float_to_pcm16(audio, dest, self._scratch, self._rng)
+        else:
+            np.copyto(dest, audio, casting="unsafe")
+        self._size += n
+        return dest
+
+    def clear(self) -> None:
+        """Vide le buffer en gardant la mémoire allouée (réutilisation en anneau)."""
+        self._size = 0
+
+    def tobytes(self) -> bytes:
+        return self.samples.tobytes()
+
+    def getbuffer(self) -> memoryview:
+        """Vue mémoire sans copie, pour l'écriture vers un fichier ou ffmpeg."""
+        return memoryview(self.samples).cast("B")
+
+    def trim(self) -> np.ndarray:
+        """Réduit la capacité à la taille utilisée et renvoie les échantillons."""
+        self._resize(self._size)
+        return self.samples
+
+    def _reserve(self, needed: int) -> None:
+        capacity = len(self._data)
+        if needed > capacity:
+            self._resize(max(needed, capacity + capacity // 2))
+
+    def _resize(self, capacity: int) -> None:
+        try:
+            # realloc en place (mremap pour les gros blocs) : pas de pic à 2x
+            self._data.resize(capacity, refcheck=True)
+        except ValueError:
+            # Une vue est encore référencée : copie classique
+            data = np.empty(capacity, dtype=self.dtype)
+            data[: self._size] = self._data[: self._size]
+            self._data = data
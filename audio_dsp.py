@@ -0,0 +1,144 @@
+"""Post-traitement en flux des chunks produits par Kokoro.
+
+Chaque chunk arrive avec son propre silence de début et de fin ; mis bout à
+bout tels quels, ils allongent l'audio et provoquent parfois des clics aux
+jointures. :class:`SegmentJoiner` rogne ces silences, insère une pause dont
+la durée dépend de la ponctuation qui termine le chunk, et fond les
+jointures — le tout chunk par chunk, en ne retenant que quelques
+millisecondes d'audio entre deux appels.
+"""
+
+import numpy as np
+
+# Pause insérée après un chunk selon son dernier caractère (ms). Sans
+# ponctuation (phrase coupée en deux), les chunks sont fondus l'un dans l'autre.
+PAUSES_MS: dict[str, float] = {
+    ".": 350,
+    "!": 350,
+    "?": 350,
+    "…": 450,
+    ";": 250,
+    ":": 250,
+    ",": 150,
+}
+
+
+def _samples(ms: float, sample_rate: int) -> int:
+    return round(ms * sample_rate / 1000)
+
+
+class SegmentJoiner:
+    """Étage DSP avec état entre les chunks d'un même flux.
+
+    - rognage : les trames de 10 ms sous ``threshold_db`` (dBFS) en début et
+      fin de chunk sont retirées, à ``keep_ms`` près ;
+    - pause : silence de ``pauses_ms[ponctuation]`` après chaque chunk ;
+    - fondu : rampes de ``fade_ms`` autour des pauses, ou fondu enchaîné
+      quand il n'y a pas de pause.
+
+    Les ``fade_ms`` derniers échantillons de chaque chunk sont retenus
+    jusqu'au chunk suivant (ou :meth:`flush`). Après chaque :meth:`process`,
+    ``last_offset`` donne la position dans le flux de l'échantillon 0 du
+    chunk d'entrée, et ``last_span`` l'intervalle conservé, ce qui permet de
+    recaler les timings.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 24_000,
+        threshold_db: float = -50.0,
+        keep_ms: float = 40.0,
+        fade_ms: float = 8.0,
+        pauses_ms: dict[str, float] | None = None,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self._frame = sample_rate // 100
+        self._threshold = 10 ** (threshold_db / 10)  # puissance moyenne par trame
+        self._keep = _samples(keep_ms, sample_rate)
+        self._fade = max(1, _samples(fade_ms, sample_rate))
+        self._ramp = np.linspace(0.0, 1.0, self._fade, dtype=np.float32)
+        self._pauses = {
+            mark: _samples(ms, sample_rate)
+            for mark, ms in (PAUSES_MS if pauses_ms is None else pauses_ms).items()
+        }
+        self._tail: np.ndarray | None = None
+        self._pause = 0
+        self.emitted = 0
+        self.last_offset = 0
+        self.last_span = (0, 0)
+
+    def pause_after(self, text: str) -> int:
+        """Pause (en échantillons) à insérer après un chunk de texte ``text``."""
+        return self._pauses.get(text.rstrip()[-1:], 0)
+
+    def _voiced_bounds(self, audio: np.ndarray) -> tuple[int, int] | None:
+        """Début et fin (exclue) de la partie non silencieuse, marge comprise."""
+        frame = self._frame
+        n_frames = len(audio) // frame
+        if n_frames == 0:
+            return (0, len(audio)) if len(audio) else None
+        frames = audio[: n_frames * frame].reshape(n_frames, frame)
+        power = np.einsum("ij,ij->i", frames, frames) / frame
+        voiced = np.flatnonzero(power > self._threshold)
+        if len(voiced) == 0:
+            return None
+        start = max(0, int(voiced[0]) * frame - self._keep)
+        last = int(voiced[-1]) + 1
+        # La fin partielle (< 1 trame) suit la dernière trame
+        end = len(audio) if last == n_frames else last * frame
+        return start, min(len(audio), end + self._keep)
+
+    def process(self, audio: np.ndarray, text: str = "") -> np.ndarray:
+        """Traite un chunk et renvoie l'audio prêt à être émis (peut être vide)."""
+        audio = np.asarray(audio, dtype=np.float32)
+        held = 0 if self._tail is None else len(self._tail)
+        bounds = self._voiced_bounds(audio)
+        if bounds is None:
+            # Chunk silencieux : il ne compte que comme pause. Sa position
+            # précède la pause, qui n'est émise que si un chunk voisé suit
+            position = self.emitted + held
+            self.last_offset = position
+            self.last_span = (position, position)
+            self._pause = max(self._pause, self.pause_after(text))
+            return audio[:0]
+
+        start, end = bounds
+        kept = audio[start:end]
+        parts: list[np.ndarray] = []
+        if self._tail is not None and self._pause == 0:
+            # Fondu enchaîné : la fin du chunk précédent recouvre le début
+            n = min(len(self._tail), len(kept))
+            parts.append(self._tail[: len(self._tail) - n])
+            parts.append(
+                self._tail[len(self._tail) - n :] * self._ramp[::-1][self._fade - n :]
+                + kept[:n] * self._ramp[:n]
+            )
+            kept_position = self.emitted + held - n
+            parts.append(kept[n:])
+        else:
+            if self._tail is not None:
+                parts.append(self._tail * self._ramp[::-1][self._fade - held :])
+                parts.append(np.zeros(self._pause, dtype=np.float32))
+            kept_position = self.emitted + held + (self._pause if held else 0)
+            n = min(self._fade, len(kept))
+            parts.append(kept[:n] * self._ramp[:n])
+            parts.append(kept[n:])
+
+        stream = np.concatenate(parts)
+        keep_back = min(self._fade, len(stream))
+        out = stream[: len(stream) - keep_back]
+        self._tail = stream[len(stream) - keep_back :].copy()
+        self._pause = self.pause_after(text)
+        self.emitted += len(out)
+        self.last_offset = kept_position - start
+        self.last_span = (kept_position, kept_position + len(kept))
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Fin du flux : renvoie la fin retenue, avec un fondu de sortie."""
+        if self._tail is None:
+            return np.zeros(0, dtype=np.float32)
+        tail = self._tail * self._ramp[::-1][self._fade - len(self._tail) :]
+        self._tail = None
+        self.emitted += len(tail)
+        return tail
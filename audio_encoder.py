@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import struct
+import subprocess
+from collections.abc import AsyncIterator, Iterable
+
+import numpy as np
+
+_FFMPEG_CODECS = {
+    "mp3": ["-f", "mp3", "-ab", "192k"],
+    "opus": ["-f", "opus", "-ab", "128k"],
+}
+
+
+def wav_header(
+    sample_rate: int = 24000,
+    bits: int = 16,
+    channels: int = 1,
+    data_size: int | None = None,
+) -> bytes:
+    """Header WAV ; sans ``data_size``, taille inconnue (streaming)."""
+    block_align = channels * bits // 8
+    byte_rate = sample_rate * block_align
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        0xFFFFFFFF if data_size is None else 36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,  # PCM
+        1,
+        channels,
+        sample_rate,
+        byte_rate,
+        block_align,
+        bits,
+        b"data",
+        0xFFFFFFFF if data_size is None else data_size,
+    )
+
+
+def encode_wav(pcm: np.ndarray, sample_rate: int = 24000) -> bytes:
+    """Assemble PCM int16 samples into a complete WAV file."""
+    header = wav_header(sample_rate, data_size=pcm.nbytes)
+    # Une seule copie : join écrit header et PCM directement dans le résultat
+    return b"".join([header, memoryview(pcm).cast("B")])
+
+
+def _ffmpeg_command(fmt: str, sample_rate: int) -> list[str]:
+    # ffmpeg lit directement le PCM int16 brut, sans repasser par float32/WAV
+    return (
+        ["ffmpeg", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0"]
+        + _FFMPEG_CODECS[fmt]
+        + ["pipe:1"]
+    )
+
+
+def encode_audio(pcm: np.ndarray, fmt: str, sample_rate: int = 24000) -> bytes:
+    """Encode PCM int16 samples to the requested format."""
+    if fmt not in _FFMPEG_CODECS:
+        return encode_wav(pcm, sample_rate)
+    result = subprocess.run(
+        _ffmpeg_command(fmt, sample_rate),
+        input=memoryview(pcm).cast("B"),
+        capture_output=True,
+    )
+    return result.stdout
+
+
+def encode_file(
+    pcm_chunks: Iterable[bytes],
+    fmt: str,
+    path: str,
+    sample_rate: int = 24000,
+) -> None:
+    """Encode un flux PCM int16 directement dans le fichier ``path``.
+
+    Version synchrone de :func:`encode_stream` pour le batch : le WAV est
+    écrit au fil de l'eau puis son en-tête complété, les autres formats
+    passent par ffmpeg qui écrit lui-même le fichier. Rien n'est gardé en
+    mémoire au-delà d'un chunk.
+    """
+    with open(path, "wb") as out:
+        if fmt not in _FFMPEG_CODECS:
+            out.write(wav_header(sample_rate))
+            size = 0
+            for pcm in pcm_chunks:
+                out.write(pcm)
+                size += len(pcm)
+            out.seek(0)
+            out.write(wav_header(sample_rate, data_size=size))
+            return
+        proc = subprocess.Popen(
+            _ffmpeg_command(fmt, sample_rate),
+            stdin=subprocess.PIPE,
+            stdout=out,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            for pcm in pcm_chunks:
+                proc.stdin.write(pcm)
+        finally:
+            proc.stdin.close()
+            returncode = proc.wait()
+    if returncode:
+        raise RuntimeError(f"ffmpeg a échoué ({returncode}) pour {path}")
+
+
+async def encode_stream(
+    pcm_chunks: AsyncIterator[bytes],
+    fmt: str,
+    sample_rate: int = 24000,
+    read_size: int = 64 * 1024,
+) -> AsyncIterator[bytes]:
+    """Encode un flux PCM int16 avec ffmpeg, au fil de l'eau.
+
+    Le PCM est écrit sur l'entrée de ffmpeg pendant que la sortie encodée est
+    relue par blocs : la mémoire reste bornée par les buffers des pipes, quelle
+    que soit la durée de l'audio. Le backpressure de ``drain()`` ralentit la
+    production de PCM si le consommateur ne suit pas.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *_ffmpeg_command(fmt, sample_rate),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    async def feed() -> None:
+        try:
+            async with contextlib.aclosing(pcm_chunks) as chunks:
+                async for pcm in chunks:
+                    proc.stdin.write(pcm)
+                    await proc.stdin.drain()
+        finally:
+            proc.stdin.close()
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while data := await proc.stdout.read(read_size):
+            yield data
+        await feeder
+        await proc.wait()
+    finally:
+        if not feeder.done():
+            feeder.cancel()
+            with contextlib.suppress(asyncio.CancelledError, OSError):
+                await feeder
+        if proc.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+            # wait() n'aboutit qu'une fois les pipes fermés : stdout, en pause
+            # faute de lecteur, doit être vidé jusqu'à EOF.
+            await proc.communicate()
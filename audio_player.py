@@ -1,4 +1,5 @@
-from collections.abc import Iterator
+import asyncio
+from collections.abc import AsyncIterator, Iterator
 
 import numpy as np
 import sounddevice as sd
@@ -16,16 +17,29 @@ def play(audio: np.ndarray, sample_rate: int) -> None:
     sd.wait()
 
 
-def play_stream(chunks: Iterator[np.ndarray], sample_rate: int) -> list[np.ndarray]:
-    """Joue les chunks audio en streaming et renvoie la liste pour concaténation.
+def play_stream(chunks: Iterator[np.ndarray], sample_rate: int) -> Iterator[np.ndarray]:
+    """Joue les chunks audio en streaming et les renvoie au fur et à mesure.
 
     Pas de normalisation per-chunk — le modèle produit du signal cohérent
     en [-1, 1]. Normaliser par chunk provoque des sauts de volume.
     """
-    played: list[np.ndarray] = []
     with sd.OutputStream(samplerate=sample_rate, channels=1, dtype="float32") as stream:
         for chunk in chunks:
             chunk = np.asarray(chunk, dtype=np.float32)
-            played.append(chunk)
             stream.write(chunk.reshape(-1, 1))
-    return played
+            yield chunk
+
+
+async def play_stream_async(
+    chunks: AsyncIterator[np.ndarray], sample_rate: int
+) -> AsyncIterator[np.ndarray]:
+    """Comme play_stream pour un flux asynchrone.
+
+    L'écriture sur la carte son bloque le temps de jouer le chunk : elle se
+    fait dans un thread pour ne pas bloquer la boucle asyncio.
+    """
+    with sd.OutputStream(samplerate=sample_rate, channels=1, dtype="float32") as stream:
+        async for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float32)
+            await asyncio.to_thread(stream.write, chunk.reshape(-1, 1))
+            yield chunk
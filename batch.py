@@ -0,0 +1,330 @@
+"""Synthèse hors ligne d'un corpus, sans passer par le serveur HTTP.
+
+Entrée : un répertoire de fichiers ``.txt`` ou un manifeste JSONL
+(``{"id", "text", "voice", "speed", "output"}``, seul ``text`` est requis).
+Les textes identiques ne sont synthétisés qu'une fois, le travail est
+réparti sur un pool de processus ayant chacun son KokoroEngine, et chaque
+fichier terminé est noté dans ``done.jsonl`` : relancer la même commande
+reprend là où elle s'était arrêtée.
+
+    uv run python batch.py corpus/ -o out/ --format mp3 --workers 4
+"""
+
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import sys
+import time
+from collections.abc import Callable, Iterator
+from typing import NamedTuple
+
+from audio_buffer import AudioBuffer
+from audio_encoder import encode_file
+from inference import BACKENDS
+from lexicon import Lexicon
+
+FORMATS = ("wav", "mp3", "opus")
+DONE_MANIFEST = "done.jsonl"
+
+
+class BatchItem(NamedTuple):
+    id: str
+    text: str
+    voice: str
+    speed: float
+    output: str
+
+
+class BatchStats(NamedTuple):
+    items: int
+    synthesized: int
+    deduplicated: int
+    skipped: int
+    chars: int
+    audio_seconds: float
+    elapsed: float
+
+    def report(self) -> str:
+        speed = self.chars / self.elapsed if self.elapsed else 0.0
+        rtf = self.audio_seconds / self.elapsed if self.elapsed else 0.0
+        return (
+            f"{self.items} fichiers : {self.synthesized} synthétisés, "
+            f"{self.deduplicated} dédupliqués, {self.skipped} déjà faits\n"
+            f"{self.chars} caractères, {self.audio_seconds:.1f}s d'audio "
+            f"en {self.elapsed:.1f}s — {speed:.0f} car/s, {rtf:.1f}x temps réel"
+        )
+
+
+def item_key(item: BatchItem, fmt: str, *variant: str) -> str:
+    """Clé de déduplication : même texte, voix, vitesse, format et variante
+    (version du lexique, backend) → même fichier."""
+    raw = "|".join([item.text, item.voice, str(item.speed), fmt, *variant])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def read_items(
+    source: str | pathlib.Path,
+    fmt: str = "wav",
+    voice: str = "ff_siwis",
+    speed: float = 1.0,
+) -> Iterator[BatchItem]:
+    """Lit un répertoire de ``.txt`` ou un manifeste JSONL."""
+    source = pathlib.Path(source)
+    if source.is_dir():
+        for path in sorted(source.rglob("*.txt")):
+            item_id = path.relative_to(source).with_suffix("").as_posix()
+            yield BatchItem(
+                item_id,
+                path.read_text(encoding="utf-8").strip(),
+                voice,
+                speed,
+                f"{item_id}.{fmt}",
+            )
+        return
+
+    with source.open(encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            text = entry.get("text", entry.get("input"))
+            if text is None:
+                raise ValueError(f"{source}:{lineno}: champ 'text' manquant")
+            item_id = str(entry.get("id", f"{lineno:06d}"))
+            yield BatchItem(
+                item_id,
+                text,
+                entry.get("voice", voice),
+                float(entry.get("speed", speed)),
+                entry.get("output", f"{item_id}.{fmt}"),
+            )
+
+
+def read_done(out_dir: pathlib.Path) -> dict[str, str]:
+    """Fichiers déjà produits par un run précédent : ``clé → chemin``."""
+    done: dict[str, str] = {}
+    manifest = out_dir / DONE_MANIFEST
+    if not manifest.exists():
+        return done
+    with manifest.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Dernière ligne tronquée par une interruption
+                continue
+            if (out_dir / entry["output"]).exists():
+                done[entry["key"]] = entry["output"]
+    return done
+
+
+# --- Worker (un moteur par processus) ---
+
+_worker_engine = None
+_worker_lexicon: Lexicon | None = None
+
+
+def _init_worker(
+    engine_factory: Callable[[], object],
+    lexicon_path: str | None = None,
+    threads: int | None = None,
+) -> None:
+    global _worker_engine, _worker_lexicon
+    if threads:
+        try:
+            import torch
+
+            # Sans ça, chaque processus prend tous les cœurs et ils se battent
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    _worker_engine = engine_factory()
+    _worker_lexicon = Lexicon.load(lexicon_path) if lexicon_path else None
+
+
+def _render(text: str, voice: str, speed: float, fmt: str, path: str) -> float:
+    """Synthétise ``text`` dans ``path`` et renvoie la durée de l'audio (s).
+
+    Le PCM est écrit chunk par chunk (WAV, ou entrée de ffmpeg) : la mémoire
+    reste bornée quelle que soit la longueur de l'entrée du corpus.
+    """
+    engine = _worker_engine
+    # Réutilisé comme anneau : un seul buffer de conversion par fichier
+    buf = AudioBuffer(dither=True)
+    samples = 0
+
+    def pcm_chunks() -> Iterator[bytes]:
+        nonlocal samples
+        for chunk in engine.generate_stream(
+            text, voice=voice, speed=speed, lexicon=_worker_lexicon
+        ):
+            buf.clear()
+            samples += len(chunk)
+            yield buf.append(chunk).tobytes()
+
+    # Écriture atomique : un fichier présent est toujours complet
+    target = pathlib.Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".part")
+    try:
+        encode_file(pcm_chunks(), fmt, str(tmp), engine.sample_rate)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, target)
+    return samples / engine.sample_rate
+
+
+def run_batch(
+    items: list[BatchItem],
+    out_dir: str | pathlib.Path,
+    fmt: str = "wav",
+    workers: int = 1,
+    engine_factory: Callable[[], object] | None = None,
+    lexicon_path: str | None = None,
+    progress: Callable[[str], None] | None = None,
+    backend: str = "eager",
+) -> BatchStats:
+    """Synthétise ``items`` dans ``out_dir`` et renvoie les statistiques du run.
+
+    Avec ``workers <= 1`` tout se fait dans le processus courant ; sinon
+    chaque processus du pool charge son propre moteur une seule fois.
+    Lexique et ``backend`` font partie de la clé de reprise : un run avec
+    un autre lexique ou backend ne réutilise pas les fichiers précédents.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format inconnu : {fmt!r}")
+    if engine_factory is None:
+        from tts_engine import KokoroEngine
+
+        engine_factory = functools.partial(KokoroEngine, backend=backend)
+    lexicon_version = Lexicon.load(lexicon_path).version if lexicon_path else ""
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    done = read_done(out_dir)
+    groups: dict[str, list[BatchItem]] = {}
+    for item in items:
+        key = item_key(item, fmt, lexicon_version, backend)
+        groups.setdefault(key, []).append(item)
+
+    skipped = 0
+    pending: list[tuple[str, list[BatchItem]]] = []
+    for key, group in groups.items():
+        if key in done:
+            # Déjà synthétisé : seules les copies manquantes sont à refaire
+            for item in group:
+                if not (out_dir / item.output).exists():
+                    _copy(out_dir / done[key], out_dir / item.output)
+            skipped += len(group)
+        else:
+            pending.append((key, group))
+    # Les plus longs d'abord : le pool finit plus tôt qu'en ordre arbitraire
+    pending.sort(key=lambda job: len(job[1][0].text), reverse=True)
+
+    synthesized = chars = 0
+    audio_seconds = 0.0
+    with (out_dir / DONE_MANIFEST).open("a", encoding="utf-8") as manifest:
+
+        def finish(key: str, group: list[BatchItem], seconds: float) -> None:
+            nonlocal synthesized, chars, audio_seconds
+            first = group[0]
+            for item in group[1:]:
+                _copy(out_dir / first.output, out_dir / item.output)
+            manifest.write(json.dumps({"key": key, "output": first.output}) + "\n")
+            manifest.flush()
+            synthesized += 1
+            chars += len(first.text)
+            audio_seconds += seconds
+            if progress is not None:
+                progress(f"{first.id} ({seconds:.1f}s)")
+
+        if workers <= 1:
+            _init_worker(engine_factory, lexicon_path)
+            for key, group in pending:
+                finish(key, group, _render(*_render_args(group[0], fmt, out_dir)))
+        else:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(engine_factory, lexicon_path, threads),
+            ) as pool:
+                # Nombre de tâches en vol borné : le corpus n'est pas copié
+                # d'un coup dans la file du pool
+                jobs = iter(pending)
+                in_flight: dict[concurrent.futures.Future, tuple] = {}
+
+                def submit_next() -> None:
+                    for key, group in jobs:
+                        args = _render_args(group[0], fmt, out_dir)
+                        in_flight[pool.submit(_render, *args)] = (key, group)
+                        return
+
+                for _ in range(2 * workers):
+                    submit_next()
+                while in_flight:
+                    finished, _ = concurrent.futures.wait(
+                        in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in finished:
+                        key, group = in_flight.pop(future)
+                        finish(key, group, future.result())
+                        submit_next()
+
+    return BatchStats(
+        items=len(items),
+        synthesized=synthesized,
+        deduplicated=sum(len(group) - 1 for _key, group in pending),
+        skipped=skipped,
+        chars=chars,
+        audio_seconds=audio_seconds,
+        elapsed=time.perf_counter() - start,
+    )
+
+
+def _render_args(item: BatchItem, fmt: str, out_dir: pathlib.Path) -> tuple:
+    return item.text, item.voice, item.speed, fmt, str(out_dir / item.output)
+
+
+def _copy(src: pathlib.Path, dst: pathlib.Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(src, dst)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="Répertoire de .txt ou manifeste JSONL")
+    parser.add_argument("-o", "--output", default="out", help="Répertoire de sortie")
+    parser.add_argument("--format", choices=FORMATS, default="wav")
+    parser.add_argument("--voice", default="ff_siwis")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=1, help="Processus (moteurs)")
+    parser.add_argument("--lexicon", help="Lexique de prononciation (TSV/JSON)")
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default="eager", help="Backend d'inférence"
+    )
+    args = parser.parse_args(argv)
+
+    items = list(read_items(args.source, args.format, args.voice, args.speed))
+    stats = run_batch(
+        items,
+        args.output,
+        fmt=args.format,
+        workers=args.workers,
+        lexicon_path=args.lexicon,
+        progress=lambda msg: print(msg, file=sys.stderr),
+        backend=args.backend,
+    )
+    print(stats.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Facteur temps réel et précision des backends d'inférence (inference.py).
+
+Synthétise un petit corpus avec chaque backend et le compare à l'audio du
+backend eager fp32 : RTF (secondes d'audio par seconde de calcul), SNR,
+log-spectral distance et écart des spectres moyens. Un backend est jugé
+acceptable si ``lsd_db`` reste de l'ordre de quelques dB et ``ltas_db`` < 1 dB.
+
+    uv run python benchmarks/bench_backends.py --backends eager int8 compile
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from inference import BACKENDS, compare_audio  # noqa: E402
+from tts_engine import KokoroEngine  # noqa: E402
+
+CORPUS = [
+    "Bonjour, comment allez-vous aujourd'hui ?",
+    "Le week-end dernier, nous avons visité le musée d'Orsay avec des amis.",
+    "La réunion est reportée à jeudi prochain, quatorze heures trente.",
+    "Après le jogging du matin, j'ai envoyé un email à toute l'équipe.",
+    "Il faisait beau ; les enfants jouaient dans le parc jusqu'au soir.",
+]
+
+
+def synthesize(engine: KokoroEngine, texts: list[str]) -> tuple[list, float]:
+    outputs = []
+    start = time.perf_counter()
+    for text in texts:
+        audio, _sr = engine.generate(text)
+        outputs.append(audio)
+    return outputs, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    reference = None
+    for backend in ("eager", *(b for b in args.backends if b != "eager")):
+        engine = KokoroEngine(backend=backend, threads=args.threads)
+        synthesize(engine, CORPUS[:1])  # chauffe (et compilation pour compile)
+        elapsed = 0.0
+        for _ in range(args.repeat):
+            outputs, seconds = synthesize(engine, CORPUS)
+            elapsed += seconds
+        elapsed /= args.repeat
+        audio_seconds = sum(len(a) for a in outputs) / engine.sample_rate
+        if reference is None:
+            reference = outputs
+        metrics = [compare_audio(r, o) for r, o in zip(reference, outputs)]
+        summary = {k: float(np.mean([m[k] for m in metrics])) for k in metrics[0]}
+        print(
+            f"{backend:8s} RTF {audio_seconds / elapsed:6.1f}x  "
+            f"durée x{summary['duration_ratio']:.3f}  "
+            f"SNR {summary['snr_db']:6.1f} dB  "
+            f"LSD {summary['lsd_db']:5.2f} dB  "
+            f"LTAS {summary['ltas_db']:5.2f} dB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Débit du G2P (espeak + réécriture) selon la taille du pool de backends.
+
+Phonémise le même lot de segments avec FrenchG2P.map pour plusieurs tailles
+de pool et rapporte segments/s et caractères/s. Nécessite phonemizer et
+espeak-ng ; le gain plafonne au nombre de cœurs disponibles.
+
+    uv run python benchmarks/bench_g2p.py --pools 1 2 4 8
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from tts_engine import FrenchG2P, _pipeline_chunks  # noqa: E402
+
+PARAGRAPH = (
+    "Le week-end dernier, nous sommes allés au parking du stade pour voir le "
+    "match de football. Après le jogging du matin, j'ai envoyé un email à "
+    "l'équipe : la deadline du projet approche et le feedback du client est "
+    "attendu lundi. Ensuite, nous avons discuté du budget, du planning et des "
+    "prochaines étapes, autour d'un café, jusqu'à la fin de l'après-midi. "
+)
+
+
+def bench(pool_size: int, chunks: list[str], repeat: int) -> float:
+    g2p = FrenchG2P(pool_size=pool_size)
+    g2p.map(chunks[:pool_size])  # chauffe : chargement d'espeak dans chaque backend
+    start = time.perf_counter()
+    for _ in range(repeat):
+        g2p.map(chunks)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=50_000)
+    parser.add_argument("--pools", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = PARAGRAPH * (args.chars // len(PARAGRAPH) + 1)
+    chunks = _pipeline_chunks(text)
+    chars = sum(len(c) for c in chunks)
+    print(f"{len(chunks)} segments, {chars} caractères, {os.cpu_count()} cœurs")
+
+    baseline = None
+    for pool_size in args.pools:
+        elapsed = bench(pool_size, chunks, args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"pool={pool_size:<3d} {elapsed * 1e3:8.1f} ms "
+            f"{len(chunks) / elapsed:8.1f} segments/s "
+            f"{chars / elapsed / 1e3:7.1f} k chars/s "
+            f"x{baseline / elapsed:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Pic mémoire de l'assemblage PCM pour un document de 750k caractères.
+
+Compare l'ancien chemin (liste de chunks int16 → join → float32 → WAV
+soundfile avant ffmpeg) à AudioBuffer (arena int16 passée telle quelle à
+l'encodeur). Le modèle est simulé : seuls les buffers audio sont mesurés.
+Chaque chemin tourne dans un processus neuf et on rapporte son pic de RSS.
+
+    uv run python benchmarks/bench_memory.py --chars 750000
+"""
+
+import argparse
+import io
+import pathlib
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from audio_buffer import AudioBuffer  # noqa: E402
+
+SAMPLE_RATE = 24_000
+CHARS_PER_CHUNK = 400  # découpage interne de KPipeline pour le français
+
+
+def fake_chunks(chars: int, chars_per_second: float):
+    """Chunks float32 de la taille que Kokoro produirait pour ``chars`` caractères."""
+    samples_per_chunk = int(CHARS_PER_CHUNK / chars_per_second * SAMPLE_RATE)
+    rng = np.random.default_rng(0)
+    template = (rng.standard_normal(samples_per_chunk) * 0.1).astype(np.float32)
+    for _ in range(max(1, chars // CHARS_PER_CHUNK)):
+        yield template.copy()
+
+
+def legacy_path(chunks) -> int:
+    import soundfile as sf
+
+    pcm_chunks = []
+    for chunk in chunks:
+        pcm = (chunk * 32767).clip(-32768, 32767).astype(np.int16)
+        pcm_chunks.append(pcm.tobytes())
+    pcm_data = b"".join(pcm_chunks)
+    float32_arr = np.frombuffer(pcm_data, dtype=np.int16).astype(np.float32) / 32768.0
+    wav_buf = io.BytesIO()
+    sf.write(wav_buf, float32_arr, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return len(wav_buf.getvalue())
+
+
+def buffer_path(chunks) -> int:
+    buf = AudioBuffer(dither=True)
+    for chunk in chunks:
+        buf.append(chunk)
+    return len(buf.getbuffer())
+
+
+PATHS = {"legacy": legacy_path, "buffer": buffer_path}
+
+
+def run_path(name: str, chars: int, chars_per_second: float) -> None:
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    size = PATHS[name](fake_chunks(chars, chars_per_second))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline  # KiB
+    print(
+        f"{name:8s} peak RSS +{peak / 1024:9.1f} MiB | "
+        f"{size / 2**20:9.1f} MiB encoder input | {elapsed:6.2f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=750_000)
+    parser.add_argument(
+        "--chars-per-second",
+        type=float,
+        default=15.0,
+        help="débit de parole simulé (caractères par seconde d'audio)",
+    )
+    parser.add_argument("--path", choices=PATHS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.path:
+        run_path(args.path, args.chars, args.chars_per_second)
+        return
+
+    seconds = args.chars / args.chars_per_second
+    print(f"{args.chars} chars ≈ {seconds / 3600:.1f} h d'audio à {SAMPLE_RATE} Hz")
+    for name in PATHS:
+        subprocess.run(
+            [sys.executable, __file__, "--path", name]
+            + ["--chars", str(args.chars)]
+            + ["--chars-per-second", str(args.chars_per_second)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
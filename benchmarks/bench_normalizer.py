@@ -0,0 +1,59 @@
+"""Débit de la normalisation du texte (nombres, dates, unités, montants).
+
+Normalise un document de ``--chars`` caractères riche en expressions
+numériques et rapporte les caractères/s, seul puis au sein de
+_fix_pronunciation (lexique et corrections compris), segment par segment
+comme dans le moteur.
+
+    uv run python benchmarks/bench_normalizer.py --chars 750000
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from normalizer import normalize  # noqa: E402
+from tts_engine import _fix_pronunciation, _iter_segments  # noqa: E402
+
+PARAGRAPH = (
+    "Le 14/07/2024 à 14h30, 1 250 personnes ont payé 12,50 € pour voir le "
+    "spectacle du XIXe siècle. Le serveur de 3,5 Go tournait à 2,4 GHz, soit "
+    "15 % de plus qu'en 2019. La 2e étape fait 42 km et culmine à 1 850 m ; "
+    "il faisait -3 °C au départ et 21 °C à l'arrivée, vers 17 h. Louis XIV "
+    "a régné 72 ans. Le budget atteint 1 000 000 € pour le 1er trimestre. "
+)
+
+
+def bench(fn, segments: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for segment in segments:
+            fn(segment)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=750_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = (PARAGRAPH * (args.chars // len(PARAGRAPH) + 1))[: args.chars]
+    segments = list(_iter_segments(text))
+    print(f"{len(text)} caractères, {len(segments)} segments")
+    for name, fn in (
+        ("normalize", normalize),
+        ("fix_pronunciation", _fix_pronunciation),
+    ):
+        elapsed = bench(fn, segments, args.repeat)
+        print(
+            f"{name:<18s} {elapsed * 1e3:8.1f} ms "
+            f"{len(text) / elapsed / 1e6:6.2f} M chars/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
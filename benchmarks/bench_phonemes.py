@@ -0,0 +1,104 @@
+"""Coût de la réécriture post-espeak (switches anglais, e2m, ties, tirets).
+
+Compare sur de longues chaînes de phonèmes :
+  - legacy  : l'ancienne suite de str.replace, sans garde ;
+  - regex   : un transducteur en une seule passe (regex + table de lookup) ;
+  - current : tts_engine._postprocess_phonemes.
+Les trois doivent produire exactement la même sortie.
+
+    uv run python benchmarks/bench_phonemes.py
+"""
+
+import argparse
+import pathlib
+import re
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from tts_engine import (  # noqa: E402
+    _E2M,
+    _EN_SWITCH_RE,
+    _EN_SWITCH_RE_NOTIE,
+    EN_TO_FR,
+    _postprocess_phonemes,
+)
+
+FRENCH = "bɔ̃ʒˈuʁ kɔmˈɑ̃ ale vˈu, ʒə sɥi lə- mˈɔ̃d dy sˈɛʁvis. "
+ANGLICISMS = (
+    "ʒˈɛm lə- (^e^n)fˈʊtbɔːl(^f^r) e lə- (^e^n)d^ʒˈɒɡɪŋ(^f^r), "
+    "ɔ̃ pˈaʁl də t^sa « (^e^n)wiːkˈɛnd(^f^r) ». "
+)
+
+
+def legacy(ps: str) -> str:
+    def map_en(section: str) -> str:
+        for old, new in EN_TO_FR:
+            section = section.replace(old, new)
+        return section
+
+    ps = _EN_SWITCH_RE.sub(lambda m: map_en(m.group(1)), ps)
+    ps = _EN_SWITCH_RE_NOTIE.sub(lambda m: map_en(m.group(1)), ps)
+    for old, new in _E2M:
+        ps = ps.replace(old, new)
+    ps = ps.replace("^", "").replace("-", "")
+    return ps.replace("«", "(").replace("»", ")")
+
+
+_CLEANUP = {"^": "", "-": "", "«": "(", "»": ")"}
+_FR_TABLE = {**dict(_E2M), **_CLEANUP}
+_EN_TABLE = {**_FR_TABLE, **dict(EN_TO_FR)}
+
+
+def _alternation(table: dict[str, str]) -> str:
+    return "|".join(map(re.escape, sorted(table, key=len, reverse=True)))
+
+
+_EN_RE = re.compile(_alternation(_EN_TABLE))
+_POST_RE = re.compile(
+    r"\(\^e\^n\)(.*?)\(\^f\^r\)|\(en\)(.*?)\(fr\)|" + _alternation(_FR_TABLE)
+)
+
+
+def _single_pass_repl(match: re.Match) -> str:
+    section = match.group(1) if match.group(1) is not None else match.group(2)
+    if section is not None:
+        return _EN_RE.sub(lambda m: _EN_TABLE[m.group()], section)
+    return _FR_TABLE[match.group()]
+
+
+def single_pass(ps: str) -> str:
+    return _POST_RE.sub(_single_pass_repl, ps)
+
+
+def bench(name: str, text: str, repeat: int) -> None:
+    expected = legacy(text)
+    for label, fn in (
+        ("legacy", legacy),
+        ("regex", single_pass),
+        ("current", _postprocess_phonemes),
+    ):
+        assert fn(text) == expected, f"{label} diverge"
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(text)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(
+            f"{name:10s} {label:8s} {elapsed * 1e3:8.2f} ms "
+            f"({len(text) / elapsed / 1e6:6.1f} M chars/s)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=750_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for name, unit in (("french", FRENCH), ("anglicisms", ANGLICISMS)):
+        bench(name, unit * (args.chars // len(unit)), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Backends d'inférence CPU du modèle acoustique Kokoro.
+
+- ``eager``   : PyTorch fp32, tel que chargé par KPipeline ;
+- ``int8``    : quantification dynamique int8 des Linear et LSTM (BERT,
+  encodeurs, prédicteur de prosodie) — le décodeur convolutif reste en fp32 ;
+- ``compile`` : ``torch.compile`` du décodeur (formes dynamiques).
+
+Dans tous les cas le forward tourne sous ``torch.inference_mode``. Les
+métriques de :func:`compare_audio` servent à vérifier qu'un backend reste
+proche du fp32 (voir benchmarks/bench_backends.py).
+"""
+
+import functools
+import logging
+import os
+import pathlib
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("eager", "int8", "compile")
+
+
+def configure_threads(threads: int | None) -> None:
+    """Fixe le nombre de threads intra-op de torch (None : défaut de torch)."""
+    if not threads:
+        return
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+def prepare_model(model, backend: str = "eager"):
+    """Prépare ``model`` (un KModel) pour ``backend`` et le renvoie.
+
+    La quantification et la compilation modifient le modèle en place.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend inconnu : {backend!r} (attendu : {BACKENDS})")
+    import torch
+
+    model.eval()
+    if backend == "int8":
+        torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8, inplace=True
+        )
+        for module in model.modules():
+            # Kokoro appelle lstm.flatten_parameters(), sans objet pour des
+            # poids packés int8 et absent des LSTM quantifiés
+            if module.__class__.__name__ == "LSTM" and not hasattr(
+                module, "flatten_parameters"
+            ):
+                module.flatten_parameters = _noop
+    elif backend == "compile":
+        model.decoder = torch.compile(model.decoder, dynamic=True)
+
+    forward = model.forward
+
+    @functools.wraps(forward)
+    def forward_inference(*args, **kwargs):
+        # Plus léger que no_grad : pas de suivi de version des tenseurs
+        with torch.inference_mode():
+            return forward(*args, **kwargs)
+
+    model.forward = forward_inference
+    logger.info("Modèle Kokoro prêt (backend %s)", backend)
+    return model
+
+
+def _noop() -> None:
+    pass
+
+
+# --- Poids mappés en mémoire ---
+
+
+def map_weights(model, path: str | pathlib.Path) -> int:
+    """Remplace les poids de ``model`` par ceux de ``path``, mappés en mémoire.
+
+    Le fichier (``torch.save`` du state_dict) est créé au premier appel. Les
+    tenseurs chargés avec ``mmap=True`` pointent sur le page cache : tous
+    les processus qui mappent le même fichier partagent ces pages, au lieu
+    d'en garder chacun une copie privée. À appeler avant :func:`prepare_model`
+    (la quantification int8 recopie les poids qu'elle convertit). Renvoie le
+    nombre d'octets mappés.
+    """
+    import torch
+
+    path = pathlib.Path(path)
+    if not path.exists():
+        # Plusieurs workers peuvent démarrer ensemble : écriture atomique
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+        os.close(fd)
+        torch.save(model.state_dict(), tmp)
+        os.replace(tmp, path)
+        logger.info("Poids exportés pour mmap : %s", path)
+    state = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    model.load_state_dict(state, assign=True)
+    model._mapped_storages = {t.untyped_storage().data_ptr() for t in state.values()}
+    return sum(t.numel() * t.element_size() for t in state.values())
+
+
+def _tensors(value):
+    # Les Linear quantifiés exposent leurs poids packés sous forme de tuples
+    if isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _tensors(item)
+    elif hasattr(value, "element_size"):
+        yield value
+
+
+def model_memory(model) -> dict[str, int]:
+    """Taille des poids du modèle, dont la part mappée depuis un fichier."""
+    mapped_storages = getattr(model, "_mapped_storages", set())
+    total = mapped = count = 0
+    for value in model.state_dict().values():
+        for tensor in _tensors(value):
+            size = tensor.numel() * tensor.element_size()
+            total += size
+            count += tensor.numel()
+            try:
+                if tensor.untyped_storage().data_ptr() in mapped_storages:
+                    mapped += size
+            except (RuntimeError, NotImplementedError):
+                pass  # tenseurs quantifiés : jamais mappés
+    return {"parameters": count, "bytes": total, "mapped_bytes": mapped}
+
+
+# --- Précision par rapport au fp32 ---
+
+_N_FFT = 1024
+_HOP = 256
+_EPS = 1e-8
+
+
+def _log_spectrogram(audio: np.ndarray) -> np.ndarray:
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < _N_FFT:
+        audio = np.pad(audio, (0, _N_FFT - len(audio)))
+    n_frames = 1 + (len(audio) - _N_FFT) // _HOP
+    frames = np.lib.stride_tricks.as_strided(
+        audio,
+        shape=(n_frames, _N_FFT),
+        strides=(audio.strides[0] * _HOP, audio.strides[0]),
+    )
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(_N_FFT), axis=1))
+    return 20 * np.log10(spectrum + _EPS)
+
+
+def compare_audio(reference: np.ndarray, candidate: np.ndarray) -> dict[str, float]:
+    """Distance entre l'audio fp32 de référence et celui d'un autre backend.
+
+    - ``duration_ratio`` : rapport des longueurs (les durées prédites peuvent
+      varier d'une frame après quantification) ;
+    - ``snr_db`` : rapport signal/erreur sur la partie commune ;
+    - ``lsd_db`` : log-spectral distance moyenne par frame, en dB ;
+    - ``ltas_db`` : écart RMS des spectres moyens (insensible à l'alignement).
+    """
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    n = min(len(reference), len(candidate))
+    ref, cand = reference[:n], candidate[:n]
+    error = float(np.sum((ref - cand) ** 2))
+    signal = float(np.sum(ref**2))
+    snr = float("inf") if error == 0 else 10 * np.log10((signal + _EPS) / error)
+
+    ref_spec = _log_spectrogram(ref)
+    cand_spec = _log_spectrogram(cand)
+    lsd = float(np.mean(np.sqrt(np.mean((ref_spec - cand_spec) ** 2, axis=1))))
+    ltas = float(
+        np.sqrt(
+            np.mean(
+                (
+                    _log_spectrogram(reference).mean(axis=0)
+                    - _log_spectrogram(candidate).mean(axis=0)
+                )
+                ** 2
+            )
+        )
+    )
+    return {
+        "duration_ratio": len(candidate) / max(len(reference), 1),
+        "snr_db": float(snr),
+        "lsd_db": lsd,
+        "ltas_db": ltas,
+    }
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import pathlib
+import re
+from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+# Mots du texte et des termes, découpés par la même regex ; deux mots d'un
+# terme multi-mots peuvent être séparés par des espaces, un tiret ou une
+# apostrophe (« open source » = « open-source », « l'open source »).
+_WORD_RE = re.compile(r"\w+")
+_JOINER_RE = re.compile(r"[\s'’-]+")
+
+_CACHE_FORMAT = 3
+LEXICON_SUFFIXES = (".tsv", ".json")
+
+
+def _key(term: str) -> str:
+    return " ".join(_WORD_RE.findall(term))
+
+
+class Lexicon:
+    """Lexique de prononciation indexé : ``terme → graphie phonétique``.
+
+    Contrairement à FRENCH_FIXES (une regex par entrée), la recherche se fait
+    par dictionnaire sur les mots du texte : le coût dépend de la longueur du
+    texte et du nombre de mots du plus long terme, pas du nombre d'entrées.
+    Les termes multi-mots sont prioritaires sur les termes plus courts, et
+    les entrées sensibles à la casse sur les autres.
+
+    Sans ``version`` explicite, la version est un hash du contenu indexé :
+    le même lexique copié ailleurs (conteneur, autre date) garde sa version.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[tuple[str, str, bool]],
+        name: str = "",
+        version: str = "",
+    ) -> None:
+        self.name = name
+        self.version = version
+        self._exact: dict[str, str] = {}
+        self._folded: dict[str, str] = {}
+        self._first_words: set[str] = set()
+        self.max_words = 0
+        for term, replacement, case_sensitive in entries:
+            key = _key(term)
+            if not key:
+                continue
+            if case_sensitive:
+                self._exact[key] = replacement
+            else:
+                key = key.casefold()
+                self._folded[key] = replacement
+            self._first_words.add(key.split(" ", 1)[0].casefold())
+            self.max_words = max(self.max_words, key.count(" ") + 1)
+        if not version:
+            content = json.dumps(
+                [sorted(self._exact.items()), sorted(self._folded.items())],
+                ensure_ascii=False,
+            )
+            self.version = hashlib.sha256(content.encode()).hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._folded)
+
+    def _lookup(self, key: str) -> str | None:
+        replacement = self._exact.get(key)
+        if replacement is None:
+            replacement = self._folded.get(key.casefold())
+        return replacement
+
+    def apply(self, text: str) -> str:
+        """Remplace les termes du lexique trouvés dans ``text``."""
+        if not self.max_words:
+            return text
+        words = list(_WORD_RE.finditer(text))
+        out: list[str] = []
+        last = 0
+        i = 0
+        while i < len(words):
+            if words[i].group().casefold() not in self._first_words:
+                i += 1
+                continue
+            # Plus long terme d'abord ; les mots doivent être contigus
+            span = 1
+            while (
+                span < self.max_words
+                and i + span < len(words)
+                and _JOINER_RE.fullmatch(
+                    text, words[i + span - 1].end(), words[i + span].start()
+                )
+            ):
+                span += 1
+            for n in range(span, 0, -1):
+                key = " ".join(w.group() for w in words[i : i + n])
+                replacement = self._lookup(key)
+                if replacement is not None:
+                    out.append(text[last : words[i].start()])
+                    out.append(replacement)
+                    last = words[i + n - 1].end()
+                    i += n
+                    break
+            else:
+                i += 1
+        if not out:
+            return text
+        out.append(text[last:])
+        return "".join(out)
+
+    @classmethod
+    def load(cls, path: str | pathlib.Path, use_cache: bool = True) -> "Lexicon":
+        """Charge un lexique TSV ou JSON, via son cache binaire s'il est à jour.
+
+        TSV : ``terme<TAB>remplacement[<TAB>cs]``, ``cs`` pour une entrée
+        sensible à la casse ; lignes vides et commentaires ``#`` ignorés.
+        JSON : objet ``{terme: remplacement}`` ou liste d'objets
+        ``{"term", "replacement", "case_sensitive"}``.
+
+        Le cache (``<fichier>.cache``, index en JSON : aucun code exécuté à
+        la lecture) est invalidé par la taille et la date de modification du
+        fichier source.
+        """
+        path = pathlib.Path(path)
+        stat = path.stat()
+        stamp = hashlib.sha256(
+            f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}".encode()
+        ).hexdigest()[:16]
+        cache_path = path.with_name(path.name + ".cache")
+
+        if use_cache and cache_path.exists():
+            try:
+                cached = json.loads(cache_path.read_text(encoding="utf-8"))
+                if cached.get("format") == _CACHE_FORMAT and cached["stamp"] == stamp:
+                    index = cached["index"]
+                    lexicon = cls.__new__(cls)
+                    lexicon.name = path.stem
+                    lexicon.version = str(index["version"])
+                    lexicon._exact = dict(index["exact"])
+                    lexicon._folded = dict(index["folded"])
+                    lexicon._first_words = set(index["first_words"])
+                    lexicon.max_words = int(index["max_words"])
+                    return lexicon
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                logger.warning(
+                    "Cache de lexique illisible, reconstruction : %s", cache_path
+                )
+
+        lexicon = cls(_parse(path), name=path.stem)
+        if use_cache:
+            index = {
+                "version": lexicon.version,
+                "exact": lexicon._exact,
+                "folded": lexicon._folded,
+                "first_words": sorted(lexicon._first_words),
+                "max_words": lexicon.max_words,
+            }
+            try:
+                cache_path.write_text(
+                    json.dumps(
+                        {"format": _CACHE_FORMAT, "stamp": stamp, "index": index},
+                        ensure_ascii=False,
+                    ),
+                    encoding="utf-8",
+                )
+            except OSError:
+                logger.warning(
+                    "Impossible d'écrire le cache de lexique : %s", cache_path
+                )
+        return lexicon
+
+
+def _parse(path: pathlib.Path) -> list[tuple[str, str, bool]]:
+    if path.suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(data, dict):
+            return [(term, repl, False) for term, repl in data.items()]
+        return [
+            (e["term"], e["replacement"], bool(e.get("case_sensitive", False)))
+            for e in data
+        ]
+
+    entries = []
+    for lineno, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) < 2:
+            raise ValueError(f"{path}:{lineno}: attendu 'terme<TAB>remplacement'")
+        case_sensitive = len(fields) > 2 and fields[2].strip() == "cs"
+        entries.append((fields[0].strip(), fields[1].strip(), case_sensitive))
+    return entries
+
+
+def load_lexicons(directory: str | pathlib.Path) -> dict[str, Lexicon]:
+    """Charge tous les lexiques d'un répertoire, indexés par nom de fichier."""
+    directory = pathlib.Path(directory)
+    if not directory.is_dir():
+        return {}
+    return {
+        path.stem: Lexicon.load(path)
+        for path in sorted(directory.iterdir())
+        if path.suffix in LEXICON_SUFFIXES
+    }
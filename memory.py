@@ -0,0 +1,64 @@
+"""Empreinte mémoire du processus : RSS, part partagée, libération.
+
+Sous Linux, ``/proc/self/smaps_rollup`` distingue la mémoire privée du
+processus de celle qu'il partage avec d'autres (poids mappés, phrase pack,
+bibliothèques). C'est la part privée qui se multiplie avec le nombre de
+workers. Ailleurs, seul le pic de RSS (getrusage) est disponible.
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import pathlib
+import resource
+import sys
+
+_SMAPS_ROLLUP = pathlib.Path("/proc/self/smaps_rollup")
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+    "Swap": "swap",
+}
+
+
+def process_memory() -> dict[str, int]:
+    """Mémoire du processus courant, en octets."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Kio sous Linux, en octets sous macOS
+    stats = {"peak_rss": usage if sys.platform == "darwin" else usage * 1024}
+    try:
+        lines = _SMAPS_ROLLUP.read_text().splitlines()
+    except OSError:
+        return stats
+    for line in lines:
+        name, _, value = line.partition(":")
+        field = _SMAPS_FIELDS.get(name)
+        if field is not None:
+            stats[field] = int(value.split()[0]) * 1024
+    if "private_clean" in stats:
+        stats["private"] = stats["private_clean"] + stats["private_dirty"]
+        stats["shared"] = stats["shared_clean"] + stats["shared_dirty"]
+    return stats
+
+
+def release_memory() -> None:
+    """Collecte les objets libérés et rend au système le tas inutilisé.
+
+    Après le chargement du modèle, les poids remplacés (mmap, int8) et les
+    composants abandonnés restent sinon comptés dans le RSS : glibc ne rend
+    pas spontanément la mémoire libérée au milieu du tas.
+    """
+    gc.collect()
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return
+    try:
+        libc = ctypes.CDLL(libc_name)
+        malloc_trim = libc.malloc_trim
+    except (OSError, AttributeError):
+        return  # pas glibc (macOS, musl)
+    malloc_trim(0)
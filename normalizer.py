@@ -0,0 +1,429 @@
+"""Normalisation du texte français avant le G2P : nombres, dates, unités...
+
+espeak-ng lit mal (et lentement) les suites numériques : « 3,5 Go »,
+« 12 € », « 14h30 », « XIXe ». :func:`normalize` les réécrit en toutes
+lettres en une seule passe : une regex compilée, une alternative par type
+d'expression, et la réécriture est choisie d'après le groupe qui a matché.
+
+- cardinaux (« 1 000 000 », « 1.000 »), décimaux (« 3,5 »), négatifs,
+  intervalles (« 10-20 » → « dix à vingt »), « 1,5 million » ;
+- ordinaux (« 1er », « 2e », « 3ème », « 2nde ») ;
+- dates (« 14/07/1789 », « 14/07 », « 2024-07-14 ») et heures (« 14h30 »,
+  « 8 h ») ;
+- unités (« 3,5 Go », « 90 km/h », « 20 °C », « 15 % ») ;
+- montants (« 12 € », « 12,50 € », « $5 », « 1 000 000 € ») ;
+- chiffres romains suivis d'un suffixe ordinal (« XIXe siècle ») ou
+  précédés d'un nom de souverain ou de division (« Louis XIV »,
+  « chapitre III »).
+"""
+
+import re
+
+_UNITS = (
+    "zéro",
+    "un",
+    "deux",
+    "trois",
+    "quatre",
+    "cinq",
+    "six",
+    "sept",
+    "huit",
+    "neuf",
+    "dix",
+    "onze",
+    "douze",
+    "treize",
+    "quatorze",
+    "quinze",
+    "seize",
+)
+_TENS = {2: "vingt", 3: "trente", 4: "quarante", 5: "cinquante", 6: "soixante"}
+_SCALES = ((10**12, "billion"), (10**9, "milliard"), (10**6, "million"))
+_SCALE_WORDS = ("billion", "milliard", "million")
+# Au-delà (identifiants, numéros de série...), lecture chiffre par chiffre
+_MAX_CARDINAL_DIGITS = 15
+
+_MONTHS = (
+    "janvier",
+    "février",
+    "mars",
+    "avril",
+    "mai",
+    "juin",
+    "juillet",
+    "août",
+    "septembre",
+    "octobre",
+    "novembre",
+    "décembre",
+)
+
+# Unité → (singulier, pluriel, féminin)
+UNITS: dict[str, tuple[str, str, bool]] = {
+    "Go": ("gigaoctet", "gigaoctets", False),
+    "Mo": ("mégaoctet", "mégaoctets", False),
+    "Ko": ("kilooctet", "kilooctets", False),
+    "ko": ("kilooctet", "kilooctets", False),
+    "To": ("téraoctet", "téraoctets", False),
+    "Mb/s": ("mégabit par seconde", "mégabits par seconde", False),
+    "Gb/s": ("gigabit par seconde", "gigabits par seconde", False),
+    "km/h": ("kilomètre par heure", "kilomètres par heure", False),
+    "m/s": ("mètre par seconde", "mètres par seconde", False),
+    "km²": ("kilomètre carré", "kilomètres carrés", False),
+    "m²": ("mètre carré", "mètres carrés", False),
+    "m³": ("mètre cube", "mètres cubes", False),
+    "km": ("kilomètre", "kilomètres", False),
+    "cm": ("centimètre", "centimètres", False),
+    "mm": ("millimètre", "millimètres", False),
+    "m": ("mètre", "mètres", False),
+    "kg": ("kilogramme", "kilogrammes", False),
+    "mg": ("milligramme", "milligrammes", False),
+    "g": ("gramme", "grammes", False),
+    "t": ("tonne", "tonnes", True),
+    "L": ("litre", "litres", False),
+    "l": ("litre", "litres", False),
+    "mL": ("millilitre", "millilitres", False),
+    "ml": ("millilitre", "millilitres", False),
+    "cL": ("centilitre", "centilitres", False),
+    "cl": ("centilitre", "centilitres", False),
+    "h": ("heure", "heures", True),
+    "min": ("minute", "minutes", True),
+    "ms": ("milliseconde", "millisecondes", True),
+    "s": ("seconde", "secondes", True),
+    "kWh": ("kilowattheure", "kilowattheures", False),
+    "kW": ("kilowatt", "kilowatts", False),
+    "W": ("watt", "watts", False),
+    "V": ("volt", "volts", False),
+    "mAh": ("milliampère-heure", "milliampères-heures", False),
+    "GHz": ("gigahertz", "gigahertz", False),
+    "MHz": ("mégahertz", "mégahertz", False),
+    "kHz": ("kilohertz", "kilohertz", False),
+    "Hz": ("hertz", "hertz", False),
+    "°C": ("degré Celsius", "degrés Celsius", False),
+    "°": ("degré", "degrés", False),
+    "%": ("pour cent", "pour cent", False),
+    "‰": ("pour mille", "pour mille", False),
+}
+
+# Devise → (unité, unités, féminin, centième, centièmes)
+CURRENCIES: dict[str, tuple[str, str, bool, str, str]] = {
+    "€": ("euro", "euros", False, "centime", "centimes"),
+    "EUR": ("euro", "euros", False, "centime", "centimes"),
+    "$": ("dollar", "dollars", False, "cent", "cents"),
+    "USD": ("dollar", "dollars", False, "cent", "cents"),
+    "£": ("livre", "livres", True, "penny", "pence"),
+}
+
+# Chiffres romains sans suffixe : seulement après ces mots
+_REGNAL_NAMES = (
+    "Louis",
+    "Henri",
+    "Charles",
+    "François",
+    "Philippe",
+    "Napoléon",
+    "Jean",
+    "Paul",
+    "Pie",
+    "Léon",
+    "Benoît",
+    "Grégoire",
+    "Clément",
+    "Édouard",
+    "Edouard",
+    "Élisabeth",
+    "Elisabeth",
+    "Elizabeth",
+    "George",
+    "Georges",
+    "Guillaume",
+    "Richard",
+    "Frédéric",
+    "Alexandre",
+    "Nicolas",
+    "Pierre",
+    "Ramsès",
+)
+_DIVISIONS = ("chapitre", "tome", "acte", "livre", "partie", "scène", "volume", "titre")
+
+
+# --- Nombres en toutes lettres ---
+
+
+def _below_100(n: int) -> str:
+    if n < 17:
+        return _UNITS[n]
+    if n < 20:
+        return "dix-" + _UNITS[n - 10]
+    tens, unit = divmod(n, 10)
+    if tens == 7:
+        return "soixante et onze" if n == 71 else "soixante-" + _below_100(n - 60)
+    if tens == 8:
+        return "quatre-vingts" if unit == 0 else "quatre-vingt-" + _UNITS[unit]
+    if tens == 9:
+        return "quatre-vingt-" + _below_100(n - 80)
+    if unit == 0:
+        return _TENS[tens]
+    if unit == 1:
+        return _TENS[tens] + " et un"
+    return _TENS[tens] + "-" + _UNITS[unit]
+
+
+def _below_1000(n: int, final: bool = True) -> str:
+    """``final=False`` devant « mille » : « quatre-vingt mille », « deux cent mille »."""
+    hundreds, rest = divmod(n, 100)
+    if hundreds == 0:
+        words = _below_100(rest)
+        return words[:-1] if not final and words == "quatre-vingts" else words
+    prefix = "cent" if hundreds == 1 else _UNITS[hundreds] + " cent"
+    if rest == 0:
+        return prefix + ("s" if hundreds > 1 and final else "")
+    words = _below_100(rest)
+    if not final and words == "quatre-vingts":
+        words = "quatre-vingt"
+    return f"{prefix} {words}"
+
+
+def cardinal(n: int, feminine: bool = False) -> str:
+    """Nombre cardinal en toutes lettres (orthographe traditionnelle)."""
+    if n < 0:
+        return "moins " + cardinal(-n, feminine)
+    if n == 0:
+        return "zéro"
+    parts = []
+    for scale, name in _SCALES:
+        count, n = divmod(n, scale)
+        if count:
+            parts.append(f"{cardinal(count)} {name}{'s' if count > 1 else ''}")
+    thousands, n = divmod(n, 1000)
+    if thousands:
+        parts.append(
+            "mille" if thousands == 1 else _below_1000(thousands, False) + " mille"
+        )
+    if n:
+        parts.append(_below_1000(n))
+    words = " ".join(parts)
+    if feminine and (words == "un" or words.endswith(" un")):
+        words += "e"
+    return words
+
+
+def ordinal(n: int, feminine: bool = False) -> str:
+    """Nombre ordinal en toutes lettres : 1 → premier, 21 → vingt et unième."""
+    if n == 1:
+        return "première" if feminine else "premier"
+    words = cardinal(n)
+    if words.startswith("un m"):
+        # « millionième », pas « un millionième »
+        words = words[3:]
+    if words.endswith("cinq"):
+        return words + "uième"
+    if words.endswith("neuf"):
+        return words[:-1] + "vième"
+    if words.endswith("s") and not words.endswith("trois"):
+        # « quatre-vingts », « deux cents », « deux millions »
+        words = words[:-1]
+    return words.removesuffix("e") + "ième"
+
+
+def _digits(digits: str) -> str:
+    return " ".join(_UNITS[int(d)] for d in digits)
+
+
+def _integer(digits: str, feminine: bool = False) -> str:
+    if (len(digits) > 1 and digits[0] == "0") or len(digits) > _MAX_CARDINAL_DIGITS:
+        return _digits(digits)
+    return cardinal(int(digits), feminine)
+
+
+def _fraction(digits: str) -> str:
+    """Partie décimale : « 05 » → « zéro cinq », « 14159 » chiffre par chiffre."""
+    stripped = digits.lstrip("0")
+    zeros = "zéro " * (len(digits) - len(stripped))
+    if not stripped:
+        return zeros.strip()
+    if len(stripped) > 3:
+        return zeros + _digits(stripped)
+    return zeros + cardinal(int(stripped))
+
+
+def _split_number(number: str) -> tuple[str, str | None]:
+    """``"1 000,5"`` → ``("1000", "5")`` ; le point est un séparateur de
+    milliers s'il est suivi de groupes de trois chiffres, sinon une virgule."""
+    number = re.sub(r"[ \u00a0\u202f]", "", number)
+    if "," in number:
+        integer, fraction = number.split(",", 1)
+        return integer.replace(".", ""), fraction
+    if "." in number and not re.fullmatch(r"\d{1,3}(?:\.\d{3})+", number):
+        integer, fraction = number.split(".", 1)
+        return integer, fraction
+    return number.replace(".", ""), None
+
+
+def _number(number: str, feminine: bool = False) -> str:
+    integer, fraction = _split_number(number)
+    words = _integer(integer, feminine and fraction is None)
+    if fraction is not None:
+        words += " virgule " + _fraction(fraction)
+    return words
+
+
+def _quantity(number: str, singular: str, plural: str, feminine: bool) -> str:
+    """« 3,5 Go » → « trois virgule cinq gigaoctets »."""
+    integer, fraction = _split_number(number)
+    words = _number(number, feminine)
+    noun = plural if int(integer or "0") >= 2 else singular
+    if fraction is None and re.search(r"(?:million|milliard|billion)s?$", words):
+        # « un million d'euros », « deux milliards de kilomètres »
+        return words + (" d'" if noun[0] in "aeéèêiouhy" else " de ") + noun
+    return f"{words} {noun}"
+
+
+def _money(number: str, currency: str) -> str:
+    unit, units, feminine, cent, cents = CURRENCIES[currency]
+    integer, fraction = _split_number(number)
+    if fraction is None or len(fraction) > 2:
+        return _quantity(number, unit, units, feminine)
+    subunits = int(fraction.ljust(2, "0"))
+    if int(integer or "0") == 0:
+        return _quantity(str(subunits), cent, cents, False)
+    words = _quantity(integer, unit, units, feminine)
+    return f"{words} {cardinal(subunits)}" if subunits else words
+
+
+# --- Chiffres romains ---
+
+_ROMAN_VALUES = {"I": 1, "V": 5, "X": 10, "L": 50, "C": 100, "D": 500, "M": 1000}
+_ROMAN_TABLE = (
+    (1000, "M"), (900, "CM"), (500, "D"), (400, "CD"), (100, "C"), (90, "XC"),
+    (50, "L"), (40, "XL"), (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I"),
+)  # fmt: skip
+
+
+def _to_roman(n: int) -> str:
+    out = []
+    for value, numeral in _ROMAN_TABLE:
+        count, n = divmod(n, value)
+        out.append(numeral * count)
+    return "".join(out)
+
+
+def roman_value(numeral: str) -> int | None:
+    """Valeur d'un chiffre romain bien formé (« XIV » → 14), sinon None."""
+    total = 0
+    for i, ch in enumerate(numeral):
+        value = _ROMAN_VALUES[ch]
+        following = _ROMAN_VALUES[numeral[i + 1]] if i + 1 < len(numeral) else 0
+        total += -value if value < following else value
+    # « IIII », « VX »... ne sont pas des chiffres romains
+    return total if 0 < total < 4000 and _to_roman(total) == numeral else None
+
+
+# --- Regex unique ---
+
+_NUMBER = (
+    r"\d{1,3}(?:[ \u00a0\u202f]\d{3})+(?:,\d+)?(?!\d)"
+    r"|\d{1,3}(?:\.\d{3})+(?:,\d+)?(?!\d|\.\d)"
+    r"|\d+(?:[.,]\d+)?(?![.,]?\d)"
+)
+# Une unité collée à un mot (« 3 m'a », « 2 s'il ») n'en est pas une
+_END = r"(?![\w'’])"
+
+
+def _alternatives(words: list[str] | tuple[str, ...]) -> str:
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+_CONTEXT_WORDS = [*_REGNAL_NAMES, *_DIVISIONS, *(w.capitalize() for w in _DIVISIONS)]
+
+_NORMALIZE_RE = re.compile(
+    # Filtre rapide : seules ces positions peuvent commencer une expression
+    r"(?=[\d€$£\-−IVXLCDM" + "".join(sorted({w[0] for w in _CONTEXT_WORDS})) + r"])"
+    r"(?<![\w.,])(?:"
+    rf"(?P<iso>(?P<iso_y>\d{{4}})-(?P<iso_m>0[1-9]|1[0-2])-(?P<iso_d>0[1-9]|[12]\d|3[01])){_END}"
+    rf"|(?P<date>(?P<date_d>0?[1-9]|[12]\d|3[01])/(?P<date_m>0?[1-9]|1[0-2])/(?P<date_y>\d{{4}}|\d{{2}})){_END}"
+    # Sans année, jour et mois sur deux chiffres : « 1/2 » reste une fraction
+    rf"|(?P<day_month>(?P<dm_d>0[1-9]|[12]\d|3[01])/(?P<dm_m>0[1-9]|1[0-2])){_END}(?!/\d)"
+    rf"|(?P<time>(?P<time_h>[01]?\d|2[0-3])(?:\s?[hH]\s?(?P<time_m>[0-5]\d)?|:(?P<time_m2>[0-5]\d))){_END}"
+    rf"|(?P<ord>(?P<ord_n>\d+)(?P<ord_suffix>ère|ere|er|re|nde|nd|ème|eme|è|e)(?P<ord_s>s)?){_END}"
+    rf"|(?P<money>(?P<money_cur>[€$£])\s?(?P<money_n>{_NUMBER})){_END}"
+    rf"|(?P<unit>(?P<unit_neg>[-−])?(?P<unit_n>{_NUMBER})\s?"
+    rf"(?P<unit_name>{_alternatives([*UNITS, *CURRENCIES])})){_END}"
+    rf"|(?P<scale>(?P<scale_neg>[-−])?(?P<scale_n>{_NUMBER})\s(?P<scale_word>{_alternatives(_SCALE_WORDS)})s?){_END}"
+    # Intervalle : seule la borne basse est réécrite, la haute (unité, montant)
+    # l'est ensuite par sa propre alternative. Pas de suite « 06-12-34 ».
+    r"|(?<![-–])(?P<range>(?P<range_n>\d+)\s?[-–]\s?)(?=(?:0|[1-9]\d*)(?!\d|\s?[-–]\s?\d))"
+    rf"|(?P<roman>(?P<roman_n>[IVXLCDM]{{2,}}|[IVX])(?P<roman_suffix>er|re|ème|e)){_END}"
+    rf"|(?P<titled>(?P<titled_word>{_alternatives(_CONTEXT_WORDS)})\s+(?P<titled_n>[IVXLCDM]{{2,}}|[IVX])){_END}"
+    rf"|(?P<number>(?P<number_neg>[-−])?(?P<number_n>{_NUMBER})){_END}"
+    r")"
+)
+
+
+def _date(day: int, month: int, year: str | None) -> str:
+    words = f"{'premier' if day == 1 else cardinal(day)} {_MONTHS[month - 1]}"
+    return f"{words} {_integer(year)}" if year else words
+
+
+def _replace(m: re.Match) -> str:
+    kind = m.lastgroup
+    g = m.group
+    if kind == "number":
+        words = _number(g("number_n"))
+        return "moins " + words if g("number_neg") else words
+    if kind == "unit":
+        name = g("unit_name")
+        if name in CURRENCIES:
+            words = _money(g("unit_n"), name)
+        else:
+            words = _quantity(g("unit_n"), *UNITS[name])
+        return "moins " + words if g("unit_neg") else words
+    if kind == "scale":
+        # Pluriel dès deux, et après une virgule : « un virgule cinq millions »
+        integer, fraction = _split_number(g("scale_n"))
+        plural = fraction is not None or int(integer or "0") >= 2
+        words = f"{_number(g('scale_n'))} {g('scale_word')}{'s' if plural else ''}"
+        return "moins " + words if g("scale_neg") else words
+    if kind == "range":
+        return f"{_integer(g('range_n'))} à "
+    if kind == "money":
+        return _money(g("money_n"), g("money_cur"))
+    if kind == "ord":
+        n = int(g("ord_n"))
+        suffix = g("ord_suffix")
+        if suffix in ("nd", "nde") and n == 2:
+            words = "second" if suffix == "nd" else "seconde"
+        else:
+            words = ordinal(n, feminine=suffix in ("re", "ère", "ere"))
+        return words + "s" if g("ord_s") else words
+    if kind == "time":
+        hours = int(g("time_h"))
+        minutes = int(g("time_m") or g("time_m2") or 0)
+        words = f"{cardinal(hours, True)} heure{'s' if hours > 1 else ''}"
+        return f"{words} {cardinal(minutes, True)}" if minutes else words
+    if kind == "date":
+        return _date(int(g("date_d")), int(g("date_m")), g("date_y"))
+    if kind == "day_month":
+        return _date(int(g("dm_d")), int(g("dm_m")), None)
+    if kind == "iso":
+        return _date(int(g("iso_d")), int(g("iso_m")), g("iso_y"))
+    if kind == "roman":
+        value = roman_value(g("roman_n"))
+        if value is None:
+            return g(0)
+        return ordinal(value, feminine=g("roman_suffix") == "re")
+    if kind == "titled":
+        value = roman_value(g("titled_n"))
+        if value is None:
+            return g(0)
+        word = g("titled_word")
+        if value == 1 and word in _REGNAL_NAMES:
+            return f"{word} premier"
+        return f"{word} {cardinal(value)}"
+    return g(0)
+
+
+def normalize(text: str) -> str:
+    """Réécrit en toutes lettres les nombres, dates, heures, unités et montants."""
+    return _NORMALIZE_RE.sub(_replace, text)
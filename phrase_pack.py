@@ -0,0 +1,233 @@
+"""Phrase packs : audio pré-calculé des phrases fréquentes (SVI, annonces...).
+
+Un pack est un fichier unique, mappé en mémoire au chargement :
+
+    KOKOPAK1 | longueur de l'en-tête (uint64) | en-tête JSON | PCM int16
+
+L'en-tête indexe chaque phrase (``voix|vitesse|texte``) par son décalage et
+sa longueur en échantillons dans le PCM. Servir une phrase ne coûte qu'une
+lecture dans le mmap, sans travail du modèle ; plusieurs workers qui
+chargent le même pack partagent les mêmes pages.
+
+    uv run python phrase_pack.py phrases.txt -o phrases.pack --voice ff_siwis
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import tempfile
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from inference import BACKENDS
+from lexicon import Lexicon
+
+MAGIC = b"KOKOPAK1"
+_FORMAT = 1
+_LENGTH = struct.Struct("<Q")
+# Les chunks d'une phrase servie telle quelle (streaming, annulation)
+CHUNK_SAMPLES = 12_000
+
+
+def phrase_key(text: str, voice: str, speed: float) -> str:
+    """Clé d'index : espaces normalisés, vitesse arrondie comme CostModel."""
+    return f"{voice}|{round(speed, 2):g}|{' '.join(text.split())}"
+
+
+class PhrasePack:
+    """Pack chargé en lecture seule via mmap."""
+
+    def __init__(self, path: str | pathlib.Path) -> None:
+        self.path = pathlib.Path(path)
+        with self.path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} n'est pas un phrase pack")
+        (header_len,) = _LENGTH.unpack_from(self._mmap, len(MAGIC))
+        start = len(MAGIC) + _LENGTH.size
+        raw_header = self._mmap[start : start + header_len]
+        header = json.loads(raw_header)
+        if header.get("format") != _FORMAT:
+            self._mmap.close()
+            raise ValueError(f"{self.path} : format de pack non supporté")
+        self.sample_rate: int = header["sample_rate"]
+        self.lexicon: str = header.get("lexicon", "")
+        self.backend: str = header.get("backend", "eager")
+        # Empreinte du contenu, calculée au rendu : l'audio servi en dépend
+        # (clés de cache). Lire le PCM ici toucherait chaque page du mmap.
+        self.version: str = (
+            header.get("version") or hashlib.sha256(raw_header).hexdigest()[:16]
+        )
+        self._entries: dict[str, tuple[int, int]] = {
+            key: (offset, length) for key, (offset, length) in header["entries"].items()
+        }
+        data_offset = start + header_len
+        self._pcm = (
+            np.frombuffer(self._mmap, dtype="<i2", offset=data_offset)
+            if data_offset < len(self._mmap)
+            else np.zeros(0, dtype="<i2")
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Taille du fichier mappé, en octets."""
+        return len(self._mmap)
+
+    def accepts(self, lexicon: Lexicon | None, backend: str = "eager") -> bool:
+        """Le pack n'est valable que pour le lexique et le backend d'inférence
+        avec lesquels il a été rendu."""
+        return self.backend == backend and self.lexicon == (
+            lexicon.version if lexicon is not None else ""
+        )
+
+    def pcm(self, text: str, voice: str, speed: float) -> np.ndarray | None:
+        """PCM int16 de la phrase : une vue sur le mmap, sans copie."""
+        entry = self._entries.get(phrase_key(text, voice, speed))
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._pcm[offset : offset + length]
+
+    def get(self, text: str, voice: str, speed: float) -> np.ndarray | None:
+        """Audio float32 de la phrase, comme en sortie du moteur."""
+        pcm = self.pcm(text, voice, speed)
+        if pcm is None:
+            return None
+        return pcm.astype(np.float32) / 32767
+
+    def chunks(self, text: str, voice: str, speed: float) -> Iterator[np.ndarray]:
+        """Yield l'audio de la phrase par chunks de CHUNK_SAMPLES."""
+        pcm = self.pcm(text, voice, speed)
+        if pcm is None:
+            return
+        for start in range(0, len(pcm), CHUNK_SAMPLES):
+            yield pcm[start : start + CHUNK_SAMPLES].astype(np.float32) / 32767
+
+    def close(self) -> None:
+        self._pcm = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Des vues sont encore utilisées : le mmap sera libéré avec elles
+            pass
+
+
+def build_pack(
+    phrases: Iterable[tuple[str, str, float]],
+    path: str | pathlib.Path,
+    engine,
+    lexicon: Lexicon | None = None,
+) -> int:
+    """Rend ``(texte, voix, vitesse)`` avec ``engine`` dans un pack.
+
+    Le PCM est écrit au fil du rendu dans un fichier temporaire, puis le
+    pack est assemblé et remplacé de façon atomique. Renvoie le nombre
+    de phrases.
+    """
+    path = pathlib.Path(path)
+    entries: dict[str, tuple[int, int]] = {}
+    offset = 0
+    digest = hashlib.sha256()
+    with tempfile.TemporaryFile(dir=path.parent) as data:
+        for text, voice, speed in phrases:
+            key = phrase_key(text, voice, speed)
+            if key in entries or not text.strip():
+                continue
+            length = 0
+            for chunk in engine.generate_stream(
+                text, voice=voice, speed=speed, lexicon=lexicon
+            ):
+                pcm = np.round(np.clip(chunk, -1.0, 1.0) * 32767).astype("<i2")
+                data.write(pcm.tobytes())
+                digest.update(pcm.tobytes())
+                length += len(pcm)
+            entries[key] = (offset, length)
+            offset += length
+
+        header = {
+            "format": _FORMAT,
+            "sample_rate": engine.sample_rate,
+            "lexicon": lexicon.version if lexicon is not None else "",
+            "backend": getattr(engine, "backend", "eager"),
+            "entries": entries,
+        }
+        digest.update(json.dumps(header, ensure_ascii=False, sort_keys=True).encode())
+        header["version"] = digest.hexdigest()[:16]
+        encoded = json.dumps(header, ensure_ascii=False).encode()
+        # Espaces en fin d'en-tête : le PCM commence sur une frontière de 8 octets
+        encoded += b" " * (-(len(MAGIC) + _LENGTH.size + len(encoded)) % 8)
+
+        tmp = path.with_name(path.name + ".part")
+        with tmp.open("wb") as out:
+            out.write(MAGIC)
+            out.write(_LENGTH.pack(len(encoded)))
+            out.write(encoded)
+            data.seek(0)
+            while block := data.read(1 << 20):
+                out.write(block)
+        os.replace(tmp, path)
+    return len(entries)
+
+
+def read_phrases(
+    source: str | pathlib.Path, voices: list[str], speeds: list[float]
+) -> Iterator[tuple[str, str, float]]:
+    """Phrases d'un fichier texte (une par ligne) ou JSONL (``text``,
+    ``voice``, ``speed``) ; les lignes texte sont rendues pour chaque
+    combinaison de voix et de vitesse."""
+    source = pathlib.Path(source)
+    with source.open(encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if source.suffix == ".jsonl":
+                entry = json.loads(line)
+                if "text" not in entry:
+                    raise ValueError(f"{source}:{lineno}: champ 'text' manquant")
+                for voice in [entry["voice"]] if "voice" in entry else voices:
+                    for speed in [entry["speed"]] if "speed" in entry else speeds:
+                        yield entry["text"], voice, float(speed)
+                continue
+            for voice in voices:
+                for speed in speeds:
+                    yield line, voice, speed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="Phrases : une par ligne, ou JSONL")
+    parser.add_argument("-o", "--output", default="phrases.pack")
+    parser.add_argument("--voice", nargs="+", default=["ff_siwis"])
+    parser.add_argument("--speed", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--lexicon", help="Lexique de prononciation (TSV/JSON)")
+    parser.add_argument("--backend", choices=BACKENDS, default="eager")
+    args = parser.parse_args(argv)
+
+    from tts_engine import KokoroEngine
+
+    engine = KokoroEngine(backend=args.backend)
+    lexicon = Lexicon.load(args.lexicon) if args.lexicon else None
+    count = build_pack(
+        read_phrases(args.source, args.voice, args.speed),
+        args.output,
+        engine,
+        lexicon,
+    )
+    size = pathlib.Path(args.output).stat().st_size
+    print(f"{count} phrases, {size / 1e6:.1f} Mo → {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Estimation du coût des synthèses et ordonnancement du moteur.
+
+Le coût d'une requête dépend de la longueur du texte et, inversement, de la
+vitesse : :class:`CostModel` apprend en ligne les secondes de calcul par
+caractère, par couple (voix, vitesse). :class:`PriorityLock` remplace le
+verrou du moteur : le job estimé le plus court passe d'abord, avec un
+vieillissement qui évite de faire attendre indéfiniment les longs textes.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+
+# Débit initial avant toute mesure (CPU, vitesse 1.0) : ~100 caractères/s
+DEFAULT_SECONDS_PER_CHAR = 0.01
+
+
+class CostModel:
+    """Moyenne mobile exponentielle des secondes de calcul par caractère.
+
+    Une estimation par couple (voix, vitesse) ; pour un couple encore jamais
+    mesuré, on part de la moyenne toutes voix confondues, ramenée à la
+    vitesse demandée (le nombre de frames à décoder varie en 1/vitesse).
+    """
+
+    def __init__(
+        self, seconds_per_char: float = DEFAULT_SECONDS_PER_CHAR, alpha: float = 0.2
+    ) -> None:
+        self.alpha = alpha
+        # Secondes par caractère à vitesse 1.0, toutes voix confondues
+        self._base = seconds_per_char
+        self._rates: dict[tuple[str, float], float] = {}
+
+    @staticmethod
+    def _key(voice: str, speed: float) -> tuple[str, float]:
+        return voice, round(speed, 2)
+
+    def seconds_per_char(self, voice: str, speed: float) -> float:
+        rate = self._rates.get(self._key(voice, speed))
+        return rate if rate is not None else self._base / speed
+
+    def estimate(self, chars: int, voice: str, speed: float) -> float:
+        """Durée de synthèse prédite, en secondes."""
+        return chars * self.seconds_per_char(voice, speed)
+
+    def observe(self, chars: int, voice: str, speed: float, seconds: float) -> None:
+        """Met à jour le modèle avec une synthèse complète mesurée."""
+        if chars <= 0 or seconds <= 0:
+            return
+        rate = seconds / chars
+        key = self._key(voice, speed)
+        previous = self._rates.get(key)
+        self._rates[key] = (
+            rate if previous is None else previous + self.alpha * (rate - previous)
+        )
+        self._base += self.alpha * (rate * speed - self._base)
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            f"{voice}@{speed:g}": rate for (voice, speed), rate in self._rates.items()
+        }
+
+
+class PriorityLock:
+    """Verrou asyncio qui sert d'abord le job au coût estimé le plus faible.
+
+    Priorité d'un job : ``coût - aging × attente``. Comme tous les jobs
+    vieillissent au même rythme, l'ordre est fixé à l'entrée dans la file
+    (``coût + aging × instant d'arrivée``) et un tas suffit. Avec
+    ``aging=1``, une seconde d'attente compense une seconde de coût.
+
+    Un job urgent (budget de latence) peut passer une ``priority`` plus
+    faible que son coût. Avec 0, il passe devant tout job qui a attendu
+    moins longtemps que son propre coût, mais pas devant les autres.
+    """
+
+    def __init__(self, aging: float = 1.0) -> None:
+        self.aging = aging
+        self._locked = False
+        self._waiters: list[tuple[float, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._holder_cost = 0.0
+        self._holder_since = 0.0
+
+    def locked(self) -> bool:
+        return self._locked
+
+    def _pending(self) -> list[tuple[float, int, float, asyncio.Future]]:
+        return [w for w in self._waiters if not w[3].done()]
+
+    def waiting(self) -> int:
+        """Nombre de jobs en attente (hors job en cours)."""
+        return len(self._pending())
+
+    def wait_estimate(self, cost: float, priority: float | None = None) -> float:
+        """Attente prédite avant qu'un job de coût ``cost`` arrivant maintenant démarre."""
+        if not self._locked:
+            return 0.0
+        remaining = max(
+            0.0, self._holder_cost - (time.monotonic() - self._holder_since)
+        )
+        priority = (
+            cost if priority is None else priority
+        ) + self.aging * time.monotonic()
+        ahead = sum(w[2] for w in self._pending() if w[0] <= priority)
+        return remaining + ahead
+
+    def backlog(self) -> float:
+        """Travail restant estimé, job en cours compris (secondes)."""
+        if not self._locked:
+            return 0.0
+        remaining = max(
+            0.0, self._holder_cost - (time.monotonic() - self._holder_since)
+        )
+        return remaining + sum(w[2] for w in self._pending())
+
+    def _grant(self, cost: float) -> None:
+        self._locked = True
+        self._holder_cost = cost
+        self._holder_since = time.monotonic()
+
+    async def acquire(self, cost: float = 0.0, priority: float | None = None) -> None:
+        if not self._locked and not self._pending():
+            self._grant(cost)
+            return
+        future = asyncio.get_running_loop().create_future()
+        priority = (
+            cost if priority is None else priority
+        ) + self.aging * time.monotonic()
+        heapq.heappush(self._waiters, (priority, next(self._seq), cost, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Le verrou nous a été passé juste avant l'annulation
+                self.release()
+            raise
+        self._grant(cost)
+
+    def release(self) -> None:
+        while self._waiters:
+            _priority, _seq, _cost, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Le verrou passe directement au suivant : personne ne peut
+                # le prendre entre-temps
+                future.set_result(None)
+                return
+        self._locked = False
+
+    def hold(self, cost: float = 0.0, priority: float | None = None) -> "_Held":
+        """``async with lock.hold(cost):`` — acquire/release avec un coût."""
+        return _Held(self, cost, priority)
+
+
+class _Held:
+    def __init__(self, lock: PriorityLock, cost: float, priority: float | None) -> None:
+        self._lock = lock
+        self._cost = cost
+        self._priority = priority
+
+    async def __aenter__(self) -> None:
+        await self._lock.acquire(self._cost, self._priority)
+
+    async def __aexit__(self, *exc) -> None:
+        self._lock.release()
@@ -0,0 +1,152 @@
+"""Cache audio partagé entre les processus workers d'un même hôte.
+
+Sous plusieurs workers uvicorn/gunicorn, chaque processus a son propre
+``_audio_cache`` : le taux de hit est divisé par le nombre de workers.
+:class:`SharedCache` est un second niveau commun à tous : un fichier par
+entrée dans un répertoire en mémoire partagée (``/dev/shm``, tmpfs), écrit
+de façon atomique. Le budget en octets et l'éviction LRU (date d'accès
+portée par le mtime) sont gérés par tous les processus sous un verrou
+``flock`` : le fichier verrou porte les totaux courants (octets, entrées),
+et le répertoire n'est parcouru que lorsqu'une écriture fait dépasser le
+budget.
+"""
+
+import contextlib
+import fcntl
+import logging
+import os
+import pathlib
+import re
+import struct
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = "/dev/shm/kokoro-tts-cache"
+_LOCK_NAME = ".lock"
+# Totaux des entrées (octets, nombre), en tête du fichier verrou
+_TOTALS = struct.Struct("<qq")
+# Clés utilisables telles quelles comme noms de fichier (hash hexadécimal)
+_KEY_RE = re.compile(r"[0-9a-zA-Z_-]{1,128}")
+
+
+class SharedCache:
+    """Cache ``clé → octets`` partagé par fichiers, borné à ``max_bytes``.
+
+    Les lectures ne prennent pas le verrou : une entrée est toujours
+    complète (``os.replace``) et peut seulement disparaître entre deux
+    appels, ce qui se traduit par un miss.
+    """
+
+    def __init__(
+        self, directory: str | pathlib.Path, max_bytes: int = 512 * 1024 * 1024
+    ) -> None:
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock_path = self.directory / _LOCK_NAME
+        self._lock_path.touch(exist_ok=True)
+
+    def _path(self, key: str) -> pathlib.Path:
+        if not _KEY_RE.fullmatch(key):
+            raise ValueError(f"clé de cache invalide : {key!r}")
+        return self.directory / key
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock_path.open("r+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_totals(self, f) -> tuple[int, int]:
+        f.seek(0)
+        raw = f.read(_TOTALS.size)
+        if len(raw) == _TOTALS.size:
+            return _TOTALS.unpack(raw)
+        # Premier accès : totaux reconstruits depuis le répertoire
+        entries = self._entries()
+        return sum(size for _mtime, size, _path in entries), len(entries)
+
+    @staticmethod
+    def _write_totals(f, total: int, count: int) -> None:
+        f.seek(0)
+        f.write(_TOTALS.pack(total, count))
+        f.truncate()
+        f.flush()
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            # mtime = dernier accès, pour l'éviction LRU
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Écriture hors verrou ; seuls le remplacement et le total le prennent
+            with self._locked() as lock:
+                total, count = self._read_totals(lock)
+                try:
+                    total -= path.stat().st_size
+                except FileNotFoundError:
+                    count += 1
+                os.replace(tmp, path)
+                total += len(data)
+                if total > self.max_bytes:
+                    total, count = self._evict()
+                self._write_totals(lock, total, count)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp)
+            raise
+
+    def _entries(self) -> list[tuple[float, int, pathlib.Path]]:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("."):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, pathlib.Path(entry.path)))
+        return entries
+
+    def _evict(self) -> tuple[int, int]:
+        """Évince les entrées les moins récemment lues (verrou tenu) ;
+        renvoie les nouveaux totaux (octets, entrées)."""
+        entries = self._entries()
+        total, count = sum(size for _mtime, size, _path in entries), len(entries)
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+            total -= size
+            count -= 1
+        return total, count
+
+    def clear(self) -> None:
+        with self._locked() as lock:
+            for _mtime, _size, path in self._entries():
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+            self._write_totals(lock, 0, 0)
+
+    def stats(self) -> dict[str, int]:
+        """Totaux tenus par les écritures : aucun parcours du répertoire."""
+        with self._locked() as lock:
+            total, count = self._read_totals(lock)
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
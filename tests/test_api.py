@@ -1,3 +1,4 @@
+import asyncio
 import struct
 from unittest.mock import patch
 
@@ -5,10 +6,11 @@ import numpy as np
 import pytest
 from starlette.testclient import TestClient
 
+from scheduler import CostModel
 from tts_engine import KokoroEngine
 
 
-def _fake_generate_stream(text, voice=None, speed=None):
+def _fake_generate_stream(text, voice=None, speed=None, cancel=None, **_options):
     """Yield deux chunks de silence pour simuler le moteur TTS."""
     if not text:
         return
@@ -16,12 +18,20 @@ def _fake_generate_stream(text, voice=None, speed=None):
         yield np.zeros(480, dtype=np.float32)
 
 
+def _fake_generate_stream_with_timings(
+    text, voice=None, speed=None, cancel=None, **_options
+):
+    for i, chunk in enumerate(_fake_generate_stream(text, voice, speed, cancel)):
+        yield chunk, {"text": text, "start": i * 0.02, "end": (i + 1) * 0.02}
+
+
 @pytest.fixture()
 def client():
     """Client de test avec le moteur TTS mocké."""
     fake_engine = object.__new__(KokoroEngine)
     fake_engine.sample_rate = 24000
     fake_engine.generate_stream = _fake_generate_stream
+    fake_engine.generate_stream_with_timings = _fake_generate_stream_with_timings
 
     with patch("app.get_engine", return_value=fake_engine):
         import app
@@ -29,6 +39,10 @@ def client():
         # Reset queue count and cache between tests
         app._queue_count = 0
         app._audio_cache.clear()
+        app._lexicons = {}
+        app._cost_model = CostModel()
+        app._shared_cache = None
+        app._phrase_pack = None
         yield TestClient(app.app)
 
 
@@ -185,3 +199,840 @@ def test_speech_queue_full(client):
     )
     assert response.status_code == 503
     app._queue_count = 0
+
+
+# --- Tests annulation ---
+
+
+def test_engine_chunks_cancelled_on_disconnect(client):
+    """Client déconnecté → génération interrompue, verrou relâché, métrique incrémentée."""
+    import asyncio
+
+    import app
+
+    produced = []
+
+    def _endless_stream(text, voice=None, speed=None, cancel=None, **_options):
+        while not cancel.is_set():
+            produced.append(1)
+            yield np.zeros(480, dtype=np.float32)
+
+    app.get_engine().generate_stream = _endless_stream
+    app._metrics.clear()
+    calls = 0
+
+    async def _is_disconnected():
+        nonlocal calls
+        calls += 1
+        return calls > 2
+
+    async def _consume():
+        return [
+            c
+            async for c in app._engine_chunks(
+                "Bonjour", "ff_siwis", 1.0, _is_disconnected
+            )
+        ]
+
+    chunks = asyncio.run(_consume())
+    assert len(chunks) == 2
+    assert len(produced) == 2
+    assert not app._engine_lock.locked()
+    assert app._metrics["cancelled"] == 1
+
+
+def test_metrics_endpoint(client):
+    response = client.get("/v1/metrics")
+    assert response.status_code == 200
+    assert response.json()["queue"] == 0
+
+
+# --- Tests SSE / timestamps ---
+
+
+def test_speech_sse_events(client):
+    """stream_format=sse → événements audio + timestamps puis done."""
+    import base64
+    import json
+
+    response = client.post(
+        "/v1/audio/speech",
+        json={"input": "Bonjour", "stream_format": "sse"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    types = [e["type"] for e in events]
+    assert types == [
+        "speech.audio.delta",
+        "speech.audio.timestamps",
+        "speech.audio.delta",
+        "speech.audio.timestamps",
+        "speech.audio.done",
+    ]
+    assert len(base64.b64decode(events[0]["audio"])) == 480 * 2
+    assert events[3]["start"] == pytest.approx(0.02)
+
+
+def test_speech_sse_rejects_encoded_formats(client):
+    response = client.post(
+        "/v1/audio/speech",
+        json={"input": "Bonjour", "stream_format": "sse", "response_format": "mp3"},
+    )
+    assert response.status_code == 422
+
+
+def test_speech_invalid_stream_format(client):
+    response = client.post(
+        "/v1/audio/speech",
+        json={"input": "Bonjour", "stream_format": "ws"},
+    )
+    assert response.status_code == 422
+
+
+# --- Tests mémoire bornée ---
+
+
+async def _stream_discarding(asgi_app, payload):
+    """Appelle l'app ASGI en jetant le corps reçu (TestClient garde tout en mémoire)."""
+    import asyncio
+    import json
+
+    body = json.dumps(payload).encode()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    received = 0
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/v1/audio/speech",
+        "raw_path": b"/v1/audio/speech",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    await asgi_app(scope, receive, send)
+    return received
+
+
+def test_wav_stream_peak_memory_is_flat(client):
+    """Le pic mémoire ne dépend pas de la durée de l'audio streamé."""
+    import asyncio
+    import tracemalloc
+
+    import app
+
+    def _measure(n_chunks):
+        def _long_stream(text, voice=None, speed=None, cancel=None, **_options):
+            for _ in range(n_chunks):
+                yield np.full(24_000, 0.1, dtype=np.float32)
+
+        app.get_engine().generate_stream = _long_stream
+        tracemalloc.start()
+        try:
+            received = asyncio.run(_stream_discarding(app.app, {"input": "Bonjour"}))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert received == 44 + n_chunks * 24_000 * 2
+        return peak
+
+    short_peak = _measure(20)
+    long_peak = _measure(200)  # ~9,6 Mo de PCM
+    assert long_peak < short_peak + 1_000_000
+
+
+# --- Lexiques ---
+
+
+def test_speech_unknown_lexicon_returns_422(client):
+    response = client.post(
+        "/v1/audio/speech", json={"input": "Bonjour", "lexicon": "inconnu"}
+    )
+    assert response.status_code == 422
+
+
+def test_speech_passes_lexicon_to_engine(client):
+    import app
+    from lexicon import Lexicon
+
+    seen = []
+
+    def _recording_stream(
+        text, voice=None, speed=None, cancel=None, lexicon=None, **_options
+    ):
+        seen.append(lexicon)
+        yield np.zeros(480, dtype=np.float32)
+
+    lexicon = Lexicon([("Kubernetes", "Kubernètesse", False)], name="tech")
+    app._lexicons = {"tech": lexicon}
+    app.get_engine().generate_stream = _recording_stream
+    response = client.post(
+        "/v1/audio/speech", json={"input": "Bonjour", "lexicon": "tech"}
+    )
+    assert response.status_code == 200
+    assert seen == [lexicon]
+
+
+def test_lexicon_version_is_part_of_cache_key():
+    import app
+    from lexicon import Lexicon
+
+    v1 = Lexicon([], name="tech", version="1")
+    v2 = Lexicon([], name="tech", version="2")
+    key1 = app._cache_key("a", "ff_siwis", 1.0, "wav", app._lexicon_variant(v1))
+    key2 = app._cache_key("a", "ff_siwis", 1.0, "wav", app._lexicon_variant(v2))
+    assert key1 != key2
+
+
+_ADMIN = {"Authorization": "Bearer secret"}
+
+
+def test_reload_lexicons(client, tmp_path):
+    import app
+
+    (tmp_path / "tech.tsv").write_text("Kubernetes\tKubernètesse\n", encoding="utf-8")
+    with patch("app.LEXICON_DIR", str(tmp_path)), patch("app.ADMIN_TOKEN", "secret"):
+        response = client.post("/admin/lexicons/reload", headers=_ADMIN)
+    assert response.status_code == 200
+    assert response.json()["lexicons"]["tech"]["entries"] == 1
+    assert "tech" in app._lexicons
+
+
+def test_reload_lexicons_keeps_previous_on_error(client, tmp_path):
+    import app
+
+    (tmp_path / "bad.tsv").write_text("sans tabulation\n", encoding="utf-8")
+    previous = app._lexicons
+    with patch("app.LEXICON_DIR", str(tmp_path)), patch("app.ADMIN_TOKEN", "secret"):
+        response = client.post("/admin/lexicons/reload", headers=_ADMIN)
+    assert response.status_code == 422
+    assert app._lexicons is previous
+
+
+def test_reload_lexicons_requires_token(client, tmp_path):
+    with (
+        patch("app.ADMIN_TOKEN", "secret"),
+        patch("app.LEXICON_DIR", str(tmp_path)),
+    ):
+        assert client.post("/admin/lexicons/reload").status_code == 401
+        response = client.post("/admin/lexicons/reload", headers=_ADMIN)
+    assert response.status_code == 200
+
+
+def test_admin_routes_are_closed_without_token(client, tmp_path):
+    with patch("app.ADMIN_TOKEN", None), patch("app.LEXICON_DIR", str(tmp_path)):
+        assert client.post("/admin/lexicons/reload").status_code == 403
+        assert client.get("/admin/lexicons", headers=_ADMIN).status_code == 403
+
+
+# --- Entrée phonémique ---
+
+
+def test_speech_invalid_input_format_returns_422(client):
+    response = client.post(
+        "/v1/audio/speech", json={"input": "Bonjour", "input_format": "ssml"}
+    )
+    assert response.status_code == 422
+
+
+def test_speech_passes_input_format_to_engine(client):
+    import app
+
+    seen = []
+
+    def _recording_stream(text, voice=None, speed=None, cancel=None, **options):
+        seen.append(options["input_format"])
+        yield np.zeros(480, dtype=np.float32)
+
+    app.get_engine().generate_stream = _recording_stream
+    response = client.post(
+        "/v1/audio/speech", json={"input": "bɔ̃ʒuʁ", "input_format": "phonemes"}
+    )
+    assert response.status_code == 200
+    assert seen == ["phonemes"]
+
+
+def test_input_format_is_part_of_cache_key():
+    import app
+
+    assert app._cache_key("a", "ff_siwis", 1.0, "wav", "", "text") != app._cache_key(
+        "a", "ff_siwis", 1.0, "wav", "", "phonemes"
+    )
+
+
+# --- Ordonnancement et échéances ---
+
+
+def test_speech_reports_eta_headers(client):
+    response = client.post("/v1/audio/speech", json={"input": "Bonjour"})
+    assert float(response.headers["x-estimated-wait"]) == 0.0
+    assert float(response.headers["x-estimated-duration"]) > 0
+
+
+def test_queue_full_sets_retry_after(client):
+    import app
+
+    app._queue_count = 3
+    response = client.post("/v1/audio/speech", json={"input": "Bonjour"})
+    app._queue_count = 0
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+
+
+def test_request_over_deadline_is_rejected(client):
+    with patch("app.DEADLINE_SECONDS", 0.5):
+        response = client.post("/v1/audio/speech", json={"input": "a" * 10_000})
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+    assert response.json()["estimated_seconds"] > 0.5
+
+
+def test_request_within_deadline_is_accepted(client):
+    with patch("app.DEADLINE_SECONDS", 60.0):
+        response = client.post("/v1/audio/speech", json={"input": "Bonjour"})
+    assert response.status_code == 200
+
+
+def _busy(priority_wait):
+    """Moteur principal chargé : 5 s d'attente, ``priority_wait`` en urgence."""
+    import app
+
+    return patch.object(
+        app._engine_lock,
+        "wait_estimate",
+        side_effect=lambda cost, priority=None: (
+            5.0 if priority is None else priority_wait
+        ),
+    )
+
+
+def test_speech_reports_synthesis_path(client):
+    response = client.post("/v1/audio/speech", json={"input": "Bonjour"})
+    assert response.headers["x-synthesis-path"] == "full"
+
+
+def test_invalid_latency_budget_is_rejected(client):
+    for budget in ("abc", "0", "-1", "nan"):
+        response = client.post(
+            "/v1/audio/speech",
+            json={"input": "Bonjour"},
+            headers={"X-Latency-Budget": budget},
+        )
+        assert response.status_code == 422
+
+
+def test_latency_budget_takes_priority_under_load(client):
+    with _busy(0.0):
+        response = client.post(
+            "/v1/audio/speech", json={"input": "Bonjour", "latency_budget": 1.0}
+        )
+    assert response.status_code == 200
+    assert response.headers["x-synthesis-path"] == "priority"
+
+
+def test_latency_budget_shortens_first_segment(client):
+    import app
+
+    seen = {}
+
+    def generate(text, voice=None, speed=None, cancel=None, **options):
+        seen.update(options)
+        yield from _fake_generate_stream(text)
+
+    # 400 caractères : ~4 s avant le premier chunk, ~1,2 s avec 120
+    with _busy(0.5), patch.object(app.get_engine(), "generate_stream", generate):
+        response = client.post(
+            "/v1/audio/speech",
+            json={"input": "a " * 200, "latency_budget": 2.0},
+        )
+    assert response.headers["x-synthesis-path"] == "short_first"
+    assert seen["first_segment_chars"] == app.SHORT_FIRST_CHARS
+
+
+def test_latency_budget_bypasses_queue_limit(client):
+    import app
+
+    app._queue_count = 3
+    response = client.post(
+        "/v1/audio/speech",
+        json={"input": "Bonjour"},
+        headers={"X-Latency-Budget": "1"},
+    )
+    app._queue_count = 0
+    assert response.status_code == 200
+
+
+def test_budgeted_queue_is_still_bounded(client):
+    import app
+
+    app._queue_count = app.MAX_BUDGETED_QUEUE_SIZE
+    response = client.post(
+        "/v1/audio/speech",
+        json={"input": "Bonjour", "latency_budget": 1e9},
+    )
+    app._queue_count = 0
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+
+
+def test_fast_lane_waits_for_its_engine(client):
+    import app
+
+    with patch.object(app, "FAST_BACKEND", "int8"):
+        assert "fast" not in [plan.path for plan in app._plans(True)]
+        with patch.object(app, "_fast_engine", object()):
+            assert app._plans(True)[-1].path == "fast"
+
+
+def test_fast_engine_is_loaded_at_startup_with_mapped_weights(client):
+    import app
+
+    built = {}
+
+    class _Engine:
+        def __init__(self, **kwargs):
+            built.update(kwargs)
+
+    with (
+        patch.object(app, "FAST_BACKEND", "int8"),
+        patch.object(app, "_fast_engine", None),
+        patch.object(app, "KokoroEngine", _Engine),
+        TestClient(app.app),
+    ):
+        assert isinstance(app._fast_engine, _Engine)
+    assert built["backend"] == "int8"
+    assert built["weights"] == app.WEIGHTS_MMAP
+
+
+def test_budgeted_queue_retry_after_uses_the_chosen_lane(client):
+    import app
+
+    app._queue_count = app.MAX_BUDGETED_QUEUE_SIZE
+    with (
+        patch.object(app, "FAST_BACKEND", "int8"),
+        patch.object(app, "_fast_engine", object()),
+        patch.object(app._engine_lock, "backlog", return_value=60.0),
+        _busy(5.0),
+    ):
+        response = client.post(
+            "/v1/audio/speech", json={"input": "Bonjour", "latency_budget": 1.0}
+        )
+    app._queue_count = 0
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_unreachable_latency_budget_is_rejected(client):
+    import app
+
+    with _busy(5.0):
+        response = client.post(
+            "/v1/audio/speech", json={"input": "Bonjour", "latency_budget": 0.5}
+        )
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+    assert response.json()["estimated_first_audio_seconds"] > 0.5
+    assert app._metrics["rejected_budget"] >= 1
+
+
+def test_completed_synthesis_calibrates_cost_model(client):
+    import app
+
+    client.post("/v1/audio/speech", json={"input": "Bonjour", "voice": "v"})
+    assert "v@1" in app._cost_model.snapshot()
+
+
+# --- Cache HTTP : ETag, If-None-Match, Range, GET ---
+
+_PAYLOAD = {"input": "Bonjour", "response_format": "mp3"}
+
+
+def _fake_encoder(data):
+    """encode_stream factice : consomme le PCM et renvoie ``data``."""
+
+    async def encode(pcm_chunks, fmt):
+        async for _ in pcm_chunks:
+            pass
+        yield data
+
+    return encode
+
+
+def _cached(client, data=b"0123456789", payload=_PAYLOAD):
+    """Synthétise ``payload`` (encodé en ``data``) et renvoie l'ETag du cache."""
+    with patch("app.encode_stream", _fake_encoder(data)):
+        client.post("/v1/audio/speech", json=payload)
+    return client.post("/v1/audio/speech", json=payload).headers["etag"]
+
+
+def test_synthesized_stream_has_no_strong_validator(client):
+    for payload in ({"input": "Bonjour"}, _PAYLOAD, {"input": ""}):
+        with patch("app.encode_stream", _fake_encoder(b"audio")):
+            response = client.post("/v1/audio/speech", json=payload)
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+        assert "accept-ranges" not in response.headers
+        assert response.headers["cache-control"] == "no-store"
+
+
+def test_uncached_conditional_request_is_synthesized(client):
+    response = client.post(
+        "/v1/audio/speech",
+        json={"input": "Bonjour"},
+        headers={"If-None-Match": "*", "Range": "bytes=0-3"},
+    )
+    assert response.status_code == 200
+    assert response.content[:4] == b"RIFF"
+    assert len(response.content) > 44
+
+
+def test_etag_is_stable_and_depends_on_inputs(client):
+    first = _cached(client)
+    second = client.post("/v1/audio/speech", json=_PAYLOAD).headers["etag"]
+    other = _cached(client, payload={**_PAYLOAD, "input": "Salut"})
+    assert first == second
+    assert first != other
+
+
+def test_if_none_match_returns_304(client):
+    etag = _cached(client)
+    response = client.post(
+        "/v1/audio/speech",
+        json=_PAYLOAD,
+        headers={"If-None-Match": f'"autre", W/{etag}'},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_cached_degraded_variant_is_revalidated(client):
+    payload = {**_PAYLOAD, "input": "a " * 200, "latency_budget": 2.0}
+    with _busy(0.5), patch("app.encode_stream", _fake_encoder(b"degraded")):
+        degraded = client.post("/v1/audio/speech", json=payload)
+    assert degraded.headers["x-synthesis-path"] == "short_first"
+    cached = client.post("/v1/audio/speech", json=payload)
+    assert cached.content == b"degraded"
+    response = client.post(
+        "/v1/audio/speech",
+        json=payload,
+        headers={"If-None-Match": cached.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_cached_response_advertises_ranges(client):
+    _cached(client)
+    response = client.post("/v1/audio/speech", json=_PAYLOAD)
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+@pytest.mark.parametrize(
+    ("range_header", "content", "content_range"),
+    [
+        ("bytes=2-5", b"2345", "bytes 2-5/10"),
+        ("bytes=7-", b"789", "bytes 7-9/10"),
+        ("bytes=-3", b"789", "bytes 7-9/10"),
+        ("bytes=8-100", b"89", "bytes 8-9/10"),
+    ],
+)
+def test_range_returns_206(client, range_header, content, content_range):
+    _cached(client)
+    response = client.post(
+        "/v1/audio/speech", json=_PAYLOAD, headers={"Range": range_header}
+    )
+    assert response.status_code == 206
+    assert response.content == content
+    assert response.headers["content-range"] == content_range
+
+
+def test_unsatisfiable_range_returns_416(client):
+    _cached(client)
+    response = client.post(
+        "/v1/audio/speech", json=_PAYLOAD, headers={"Range": "bytes=20-"}
+    )
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+
+def test_multi_range_and_stale_if_range_return_full_body(client):
+    _cached(client)
+    multi = client.post(
+        "/v1/audio/speech", json=_PAYLOAD, headers={"Range": "bytes=0-1,4-5"}
+    )
+    stale = client.post(
+        "/v1/audio/speech",
+        json=_PAYLOAD,
+        headers={"Range": "bytes=0-1", "If-Range": '"ancien"'},
+    )
+    assert multi.status_code == stale.status_code == 200
+    assert multi.content == stale.content == b"0123456789"
+
+
+def test_get_form_matches_post(client):
+    etag = _cached(client)
+    response = client.get(
+        "/v1/audio/speech",
+        params={"input": "Bonjour", "response_format": "mp3"},
+        headers={"Range": "bytes=0-3"},
+    )
+    assert response.status_code == 206
+    assert response.headers["etag"] == etag
+    assert response.content == b"0123"
+    assert "public" in response.headers["cache-control"]
+
+
+def test_get_form_streams_wav(client):
+    response = client.get(
+        "/v1/audio/speech", params={"input": "Bonjour", "speed": "1.5"}
+    )
+    assert response.status_code == 200
+    assert response.content[:4] == b"RIFF"
+
+
+# --- Interface Gradio ---
+
+
+async def _collect(agen):
+    return [item async for item in agen]
+
+
+def test_gradio_streams_chunks_progressively(client):
+    import asyncio
+
+    import app
+
+    chunks = asyncio.run(_collect(app.synthesize("Bonjour")))
+    # Un élément par chunk du moteur, pas un seul audio final
+    assert len(chunks) == 2
+    assert all(sr == 24000 and audio.dtype == np.int16 for sr, audio in chunks)
+
+
+def test_gradio_holds_engine_lock_while_generating(client):
+    import asyncio
+
+    import app
+
+    held = []
+
+    def _checking_stream(text, voice=None, speed=None, cancel=None, **_options):
+        held.append(app._engine_lock.locked())
+        yield np.zeros(480, dtype=np.float32)
+
+    app.get_engine().generate_stream = _checking_stream
+    asyncio.run(_collect(app.synthesize("Bonjour")))
+    assert held == [True]
+    assert not app._engine_lock.locked()
+
+
+def test_gradio_uses_audio_cache(client):
+    import asyncio
+
+    import app
+
+    first = asyncio.run(_collect(app.synthesize("Bonjour")))
+    calls = []
+
+    def _counting_stream(text, voice=None, speed=None, cancel=None, **_options):
+        calls.append(text)
+        yield np.zeros(480, dtype=np.float32)
+
+    app.get_engine().generate_stream = _counting_stream
+    second = asyncio.run(_collect(app.synthesize("Bonjour")))
+    assert calls == []
+    assert len(second) == 1
+    np.testing.assert_array_equal(
+        second[0][1], np.concatenate([audio for _sr, audio in first])
+    )
+
+
+def test_gradio_cache_hit_and_empty_text_do_not_load_the_engine(client):
+    import asyncio
+
+    import app
+
+    first = asyncio.run(_collect(app.synthesize("Bonjour")))
+    with patch("app.get_engine", side_effect=AssertionError("modèle chargé")):
+        cached = asyncio.run(_collect(app.synthesize("Bonjour")))
+        assert asyncio.run(_collect(app.synthesize("  "))) == []
+    assert cached[0][0] == first[0][0] == 24000
+
+
+def test_gradio_respects_queue_limit(client):
+    import asyncio
+
+    import gradio as gr
+
+    import app
+
+    app._queue_count = app.MAX_QUEUE_SIZE
+    try:
+        with pytest.raises(gr.Error):
+            asyncio.run(_collect(app.synthesize("Bonjour")))
+    finally:
+        app._queue_count = 0
+
+
+def test_shared_cache_serves_audio_synthesized_by_another_worker(client, tmp_path):
+    import app
+    from shared_cache import SharedCache
+
+    app._shared_cache = SharedCache(tmp_path)
+    _cached(client, b"encoded audio")
+    # Autre worker : son cache local est vide
+    app._audio_cache.clear()
+    response = client.post("/v1/audio/speech", json=_PAYLOAD)
+    assert response.content == b"encoded audio"
+    assert client.get("/v1/metrics").json()["shared_cache_hits"] == 1
+    # Remonté dans le cache local
+    assert len(app._audio_cache) == 1
+
+
+def test_phrase_pack_bypasses_engine_and_queue(client, tmp_path):
+    import app
+    from phrase_pack import PhrasePack, build_pack
+
+    class _Engine:
+        sample_rate = 24000
+
+        def generate_stream(self, text, voice=None, speed=None, lexicon=None):
+            yield np.full(480, 0.25, dtype=np.float32)
+
+    build_pack([("Bonjour", "ff_siwis", 1.0)], tmp_path / "p.pack", _Engine())
+    app._phrase_pack = PhrasePack(tmp_path / "p.pack")
+
+    def _failing_stream(*args, **kwargs):
+        raise AssertionError("le modèle ne doit pas être appelé")
+        yield
+
+    app.get_engine().generate_stream = _failing_stream
+    app._queue_count = app.MAX_QUEUE_SIZE
+    try:
+        response = client.post("/v1/audio/speech", json={"input": "Bonjour"})
+    finally:
+        app._queue_count = 0
+    assert response.status_code == 200
+    assert response.headers["x-estimated-duration"] == "0.000"
+    assert len(response.content) == 44 + 480 * 2
+    assert client.get("/v1/metrics").json()["phrase_pack_hits"] == 1
+
+
+def test_phrase_pack_audio_has_its_own_cache_key(client, tmp_path):
+    import app
+    from phrase_pack import PhrasePack, build_pack
+
+    class _Engine:
+        sample_rate = 24000
+
+        def generate_stream(self, text, voice=None, speed=None, lexicon=None):
+            yield np.full(480, 0.25, dtype=np.float32)
+
+    synthesized = _cached(client, b"model audio")
+    build_pack([("Bonjour", "ff_siwis", 1.0)], tmp_path / "p.pack", _Engine())
+    app._phrase_pack = PhrasePack(tmp_path / "p.pack")
+    with patch("app.encode_stream", _fake_encoder(b"pack audio")):
+        packed = client.post("/v1/audio/speech", json=_PAYLOAD)
+    assert packed.headers["x-synthesis-path"] == "phrase_pack"
+    assert packed.content == b"pack audio"
+    assert _cached(client, b"pack audio") != synthesized
+
+
+def test_memory_reports_process_and_caches_without_loading_engine(client):
+    import app
+
+    asyncio.run(app._cache_put("k", b"12345"))
+    with patch.object(app, "_engine", None):
+        body = client.get("/v1/memory").json()
+    assert body["engine"] is None
+    assert body["fast_engine"] is None
+    assert body["process"]["peak_rss"] > 0
+    assert body["audio_cache"] == {"entries": 1, "bytes": 5}
+
+
+def test_memory_reports_every_loaded_engine(client):
+    import app
+
+    engine = object.__new__(KokoroEngine)
+    engine.memory = lambda: {"backend": "int8"}
+    with patch.object(app, "_engine", None), patch.object(app, "_fast_engine", engine):
+        body = client.get("/v1/memory").json()
+    assert body["engine"] is None
+    assert body["fast_engine"] == {"backend": "int8"}
+
+
+# --- Traces et identifiant de requête ---
+
+
+def test_request_id_is_echoed_or_generated(client):
+    response = client.post(
+        "/v1/audio/speech", json={"input": "Bonjour"}, headers={"X-Request-ID": "abc-1"}
+    )
+    assert response.headers["x-request-id"] == "abc-1"
+    generated = client.get("/v1/metrics").headers["x-request-id"]
+    assert generated and generated != "abc-1"
+
+
+def test_invalid_request_id_is_replaced(client):
+    response = client.get("/v1/metrics", headers={"X-Request-ID": "a b\tc"})
+    assert response.headers["x-request-id"] != "a b\tc"
+
+
+def test_speech_request_is_traced(client, tmp_path):
+    import json
+
+    import tracing
+
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("file", str(path))
+    try:
+        client.post(
+            "/v1/audio/speech",
+            json={"input": "Bonjour"},
+            headers={"X-Request-ID": "r1"},
+        )
+    finally:
+        tracing.configure()
+    spans = [
+        span
+        for line in path.read_text().splitlines()
+        for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["POST /v1/audio/speech"]
+    assert {
+        "validate",
+        "cache.lookup",
+        "engine.queue",
+        "engine.synthesis",
+        "pcm",
+    } <= set(by_name)
+    assert {span["traceId"] for span in spans} == {root["traceId"]}
+    attributes = {a["key"]: a["value"] for a in root["attributes"]}
+    assert attributes["request.id"] == {"stringValue": "r1"}
+    assert attributes["synthesis.path"] == {"stringValue": "full"}
+    assert attributes["http.response.status_code"] == {"intValue": "200"}
@@ -0,0 +1,67 @@
+import numpy as np
+
+from audio_buffer import AudioBuffer, float_to_pcm16
+
+
+def _reference_pcm(chunk):
+    """Ancienne conversion dupliquée dans speech()."""
+    return (chunk * 32767).clip(-32768, 32767).astype(np.int16)
+
+
+def test_float_to_pcm16_matches_reference():
+    chunk = np.linspace(-1.5, 1.5, 1001, dtype=np.float32)
+    out = np.empty(len(chunk), dtype=np.int16)
+    float_to_pcm16(chunk, out)
+    np.testing.assert_array_equal(out, _reference_pcm(chunk))
+
+
+def test_float_to_pcm16_dither_is_small_and_deterministic():
+    chunk = np.sin(np.linspace(0, 20, 4800, dtype=np.float32)) * 0.5
+    a = np.empty(len(chunk), dtype=np.int16)
+    b = np.empty(len(chunk), dtype=np.int16)
+    float_to_pcm16(chunk, a, rng=np.random.default_rng(0))
+    float_to_pcm16(chunk, b, rng=np.random.default_rng(0))
+    np.testing.assert_array_equal(a, b)
+    diff = a.astype(np.int32) - _reference_pcm(chunk).astype(np.int32)
+    assert np.abs(diff).max() <= 2
+
+
+def test_buffer_grows_and_keeps_samples():
+    buf = AudioBuffer(capacity=10)
+    chunks = [np.full(7, i / 10, dtype=np.float32) for i in range(5)]
+    for chunk in chunks:
+        buf.append(chunk)
+    assert len(buf) == 35
+    np.testing.assert_array_equal(buf.samples, _reference_pcm(np.concatenate(chunks)))
+
+
+def test_buffer_grows_while_view_is_referenced():
+    buf = AudioBuffer(capacity=4)
+    first = buf.append(np.ones(4, dtype=np.float32))
+    buf.append(np.ones(100, dtype=np.float32))
+    assert len(buf) == 104
+    assert first[0] == 32767
+
+
+def test_buffer_float32():
+    buf = AudioBuffer(dtype=np.float32, capacity=2)
+    buf.append(np.array([0.5, -0.5], dtype=np.float32))
+    buf.append(np.array([0.25], dtype=np.float32))
+    samples = buf.trim()
+    assert samples.dtype == np.float32
+    np.testing.assert_array_equal(samples, [0.5, -0.5, 0.25])
+
+
+def test_buffer_clear_reuses_memory():
+    buf = AudioBuffer(capacity=100)
+    buf.append(np.zeros(50, dtype=np.float32))
+    buf.clear()
+    pcm = buf.append(np.ones(3, dtype=np.float32))
+    assert len(buf) == 3
+    assert pcm.tobytes() == buf.tobytes() == bytes(buf.getbuffer())
+
+
+def test_empty_buffer():
+    buf = AudioBuffer()
+    assert len(buf) == 0
+    assert buf.trim().size == 0
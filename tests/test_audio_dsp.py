@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from audio_dsp import SegmentJoiner
+
+SR = 24000
+
+
+def _chunk(lead_ms=200, voiced_ms=500, trail_ms=300, amplitude=0.3):
+    """Chunk type Kokoro : silence, son, silence."""
+    lead, voiced, trail = (int(ms * SR / 1000) for ms in (lead_ms, voiced_ms, trail_ms))
+    t = np.arange(voiced) / SR
+    tone = (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    return np.concatenate(
+        [np.zeros(lead, np.float32), tone, np.zeros(trail, np.float32)]
+    )
+
+
+def _run(joiner, chunks):
+    out = [joiner.process(audio, text) for audio, text in chunks]
+    out.append(joiner.flush())
+    return np.concatenate(out)
+
+
+def _silent_runs(audio):
+    """Longueurs des plages de zéros exacts à l'intérieur du signal."""
+    zero = np.concatenate([[False], audio == 0, [False]])
+    edges = np.flatnonzero(np.diff(zero.astype(np.int8)))
+    return [int(e - s) for s, e in zip(edges[::2], edges[1::2])]
+
+
+def test_edges_are_trimmed_to_margin():
+    joiner = SegmentJoiner(SR, keep_ms=40)
+    out = _run(joiner, [(_chunk(), "Bonjour")])
+    # 500 ms de son + deux marges de 40 ms (à une trame de 10 ms près)
+    assert abs(len(out) - int(0.58 * SR)) <= SR // 100
+
+
+def test_pause_depends_on_punctuation():
+    for text, pause_ms in (("Bonjour.", 350), ("Bonjour,", 150)):
+        joiner = SegmentJoiner(SR, keep_ms=0)
+        out = _run(joiner, [(_chunk(), text), (_chunk(), "suite")])
+        longest = max(_silent_runs(out))
+        assert longest == pytest.approx(pause_ms * SR / 1000, abs=SR // 100)
+
+
+def test_crossfade_without_punctuation():
+    joiner = SegmentJoiner(SR, keep_ms=0, fade_ms=8)
+    first, second = _chunk(), _chunk()
+    out = _run(joiner, [(first, "une phrase coupée"), (second, "en deux")])
+    fade = int(0.008 * SR)
+    # Les deux parties voisées se recouvrent sur la durée du fondu
+    assert abs(len(out) - (2 * int(0.5 * SR) - fade)) <= 2 * SR // 100
+
+
+def test_no_clicks_at_joints():
+    joiner = SegmentJoiner(SR)
+    out = _run(joiner, [(_chunk(), "Un."), (_chunk(), "deux"), (_chunk(), "trois")])
+    # Un sinus à 220 Hz varie d'au plus ~0.02 par échantillon
+    assert np.max(np.abs(np.diff(out))) < 0.03
+
+
+def test_silent_chunk_only_adds_pause():
+    joiner = SegmentJoiner(SR, keep_ms=0)
+    assert len(joiner.process(np.zeros(SR, np.float32), "…")) == 0
+    out = _run(joiner, [(_chunk(), "Bonjour")])
+    assert len(out) < int(0.52 * SR)
+
+
+def test_trailing_silent_chunk_stays_within_audio():
+    joiner = SegmentJoiner(SR)
+    total = len(joiner.process(_chunk(), "Fin."))
+    total += len(joiner.process(np.zeros(SR, np.float32), "…"))
+    total += len(joiner.flush())
+    assert joiner.last_span[1] <= total
+
+
+def test_only_fade_is_held_back():
+    joiner = SegmentJoiner(SR, fade_ms=8)
+    total = 0
+    for _ in range(5):
+        total += len(joiner.process(_chunk(), "Phrase."))
+        assert joiner.emitted == total
+    assert len(joiner.flush()) == int(0.008 * SR)
+
+
+def test_offsets_locate_kept_audio():
+    joiner = SegmentJoiner(SR, keep_ms=0)
+    joiner.process(_chunk(lead_ms=200), "Un.")
+    assert joiner.last_span[0] == 0
+    assert joiner.last_offset == pytest.approx(-0.2 * SR, abs=SR // 100)
+    joiner.process(_chunk(lead_ms=100), "Deux.")
+    start, end = joiner.last_span
+    # Premier chunk (500 ms) + pause de 350 ms
+    assert start == pytest.approx(0.85 * SR, abs=SR // 100)
+    assert end - start == pytest.approx(0.5 * SR, abs=SR // 100)
+    assert start - joiner.last_offset == pytest.approx(0.1 * SR, abs=SR // 100)
@@ -0,0 +1,81 @@
+import asyncio
+import struct
+from unittest.mock import patch
+
+import numpy as np
+
+import audio_encoder
+from audio_encoder import encode_file, encode_stream, encode_wav, wav_header
+
+
+def test_wav_header_streaming_sizes_unknown():
+    header = wav_header()
+    assert len(header) == 44
+    assert struct.unpack_from("<I", header, 4)[0] == 0xFFFFFFFF
+    assert struct.unpack_from("<I", header, 40)[0] == 0xFFFFFFFF
+
+
+def test_encode_wav_sizes():
+    pcm = np.arange(10, dtype=np.int16)
+    data = encode_wav(pcm)
+    assert len(data) == 44 + 20
+    assert struct.unpack_from("<I", data, 4)[0] == 36 + 20
+    assert struct.unpack_from("<I", data, 40)[0] == 20
+    assert data[44:] == pcm.tobytes()
+
+
+def _collect(pcm_chunks, read_size=64 * 1024):
+    async def source():
+        for chunk in pcm_chunks:
+            yield chunk
+
+    async def run():
+        return [
+            data async for data in encode_stream(source(), "mp3", read_size=read_size)
+        ]
+
+    return asyncio.run(run())
+
+
+def test_encode_stream_pipes_through_subprocess():
+    """`cat` remplace ffmpeg : on vérifie la plomberie stdin → stdout."""
+    chunks = [bytes([i]) * 100_000 for i in range(5)]
+    with patch.object(audio_encoder, "_ffmpeg_command", return_value=["cat"]):
+        out = _collect(chunks, read_size=4096)
+    assert b"".join(out) == b"".join(chunks)
+    assert max(len(d) for d in out) <= 4096
+
+
+def test_encode_stream_consumer_stops_early():
+    """Fermer le flux tôt tue le sous-processus et arrête la production."""
+    produced = []
+
+    async def source():
+        for i in range(1000):
+            produced.append(i)
+            yield b"x" * 65536
+
+    async def run():
+        stream = encode_stream(source(), "mp3", read_size=1024)
+        async for _ in stream:
+            break
+        await stream.aclose()
+
+    with patch.object(audio_encoder, "_ffmpeg_command", return_value=["cat"]):
+        asyncio.run(run())
+    assert len(produced) < 1000
+
+
+def test_encode_file_wav_matches_encode_wav(tmp_path):
+    pcm = np.arange(1000, dtype=np.int16)
+    path = tmp_path / "out.wav"
+    encode_file([pcm[:300].tobytes(), pcm[300:].tobytes()], "wav", str(path))
+    assert path.read_bytes() == encode_wav(pcm)
+
+
+def test_encode_file_pipes_through_subprocess(tmp_path):
+    chunks = [bytes([i]) * 100_000 for i in range(5)]
+    path = tmp_path / "out.mp3"
+    with patch.object(audio_encoder, "_ffmpeg_command", return_value=["cat"]):
+        encode_file(iter(chunks), "mp3", str(path))
+    assert path.read_bytes() == b"".join(chunks)
@@ -0,0 +1,128 @@
+import json
+import wave
+
+import numpy as np
+import pytest
+
+import batch
+from batch import BatchItem, read_done, read_items, run_batch
+
+
+class _FakeEngine:
+    """Un chunk de 10 ms par caractère ; compte les textes synthétisés."""
+
+    sample_rate = 24000
+
+    def __init__(self):
+        self.calls: list[str] = []
+
+    def generate_stream(self, text, voice=None, speed=None, lexicon=None):
+        self.calls.append(text)
+        for _ in text:
+            yield np.zeros(240, dtype=np.float32)
+
+
+def _calls():
+    """Textes synthétisés par le moteur du dernier run (sans pool)."""
+    return batch._worker_engine.calls
+
+
+def _item(item_id, text):
+    return BatchItem(item_id, text, "ff_siwis", 1.0, f"{item_id}.wav")
+
+
+def test_read_items_from_directory(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_text("Bonjour.\n", encoding="utf-8")
+    (tmp_path / "sub" / "b.txt").write_text("Salut.", encoding="utf-8")
+    items = list(read_items(tmp_path, fmt="mp3"))
+    assert [(i.id, i.text, i.output) for i in items] == [
+        ("a", "Bonjour.", "a.mp3"),
+        ("sub/b", "Salut.", "sub/b.mp3"),
+    ]
+
+
+def test_read_items_from_jsonl(tmp_path):
+    manifest = tmp_path / "corpus.jsonl"
+    manifest.write_text(
+        json.dumps({"id": "x", "text": "Bonjour", "speed": 1.5})
+        + "\n\n"
+        + json.dumps({"text": "Salut", "output": "autre/s.wav"})
+        + "\n",
+        encoding="utf-8",
+    )
+    items = list(read_items(manifest))
+    assert items[0] == BatchItem("x", "Bonjour", "ff_siwis", 1.5, "x.wav")
+    assert items[1].id == "000003"
+    assert items[1].output == "autre/s.wav"
+
+
+def test_read_items_requires_text(tmp_path):
+    manifest = tmp_path / "corpus.jsonl"
+    manifest.write_text(json.dumps({"id": "x"}) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="corpus.jsonl:1"):
+        list(read_items(manifest))
+
+
+def test_run_batch_writes_wav_files(tmp_path):
+    stats = run_batch([_item("a", "abc")], tmp_path, engine_factory=_FakeEngine)
+    with wave.open(str(tmp_path / "a.wav")) as w:
+        assert w.getframerate() == 24000
+        assert w.getnframes() == 3 * 240
+    assert stats.synthesized == 1
+    assert stats.chars == 3
+    assert stats.audio_seconds == pytest.approx(0.03)
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_run_batch_deduplicates_identical_inputs(tmp_path):
+    items = [_item("a", "même texte"), _item("b", "même texte"), _item("c", "autre")]
+    stats = run_batch(items, tmp_path, engine_factory=_FakeEngine)
+    assert sorted(_calls()) == ["autre", "même texte"]
+    assert stats.synthesized == 2
+    assert stats.deduplicated == 1
+    assert (tmp_path / "a.wav").read_bytes() == (tmp_path / "b.wav").read_bytes()
+
+
+def test_run_batch_resumes_from_manifest(tmp_path):
+    run_batch([_item("a", "abc")], tmp_path, engine_factory=_FakeEngine)
+    stats = run_batch(
+        [_item("a", "abc"), _item("b", "de")], tmp_path, engine_factory=_FakeEngine
+    )
+    assert _calls() == ["de"]
+    assert stats.skipped == 1
+    assert set(read_done(tmp_path).values()) == {"a.wav", "b.wav"}
+
+
+def test_resume_ignores_outputs_of_another_lexicon_or_backend(tmp_path):
+    lexicon = tmp_path / "tech.tsv"
+    lexicon.write_text("abc\tabécé\n", encoding="utf-8")
+    out = tmp_path / "out"
+    run_batch([_item("a", "abc")], out, engine_factory=_FakeEngine)
+    for options in ({"lexicon_path": str(lexicon)}, {"backend": "int8"}):
+        run_batch([_item("a", "abc")], out, engine_factory=_FakeEngine, **options)
+        assert _calls() == ["abc"]
+
+
+def test_resume_redoes_deleted_outputs(tmp_path):
+    run_batch([_item("a", "abc")], tmp_path, engine_factory=_FakeEngine)
+    (tmp_path / "a.wav").unlink()
+    run_batch([_item("a", "abc")], tmp_path, engine_factory=_FakeEngine)
+    assert _calls() == ["abc"]
+
+
+def test_read_done_ignores_truncated_line(tmp_path):
+    (tmp_path / "a.wav").write_bytes(b"")
+    (tmp_path / "done.jsonl").write_text(
+        json.dumps({"key": "k", "output": "a.wav"}) + '\n{"key": "tr', encoding="utf-8"
+    )
+    assert read_done(tmp_path) == {"k": "a.wav"}
+
+
+def test_run_batch_process_pool(tmp_path):
+    items = [_item(str(i), "x" * (i + 1)) for i in range(6)]
+    stats = run_batch(items, tmp_path, workers=2, engine_factory=_FakeEngine)
+    assert stats.synthesized == 6
+    for i in range(6):
+        with wave.open(str(tmp_path / f"{i}.wav")) as w:
+            assert w.getnframes() == (i + 1) * 240
@@ -0,0 +1,446 @@
+import threading
+
+import numpy as np
+import pytest
+
+from tts_engine import (
+    _MAX_PHONEMES_PER_CHUNK,
+    KokoroEngine,
+    _iter_segments,
+    _word_timings,
+)
+
+
+class _FakePipeline:
+    """Simule KPipeline : un chunk de silence par appel, en comptant les appels."""
+
+    def __init__(self, chunks_per_segment=1):
+        self.chunks_per_segment = chunks_per_segment
+        self.calls = []
+        self.token_calls = []
+
+    def __call__(self, text, voice=None, speed=None):
+        self.calls.append(text)
+        for _ in range(self.chunks_per_segment):
+            yield text, "", np.zeros(240, dtype=np.float32)
+
+    def generate_from_tokens(self, tokens, voice=None, speed=None):
+        self.token_calls.append(tokens)
+        yield "", tokens, np.zeros(240, dtype=np.float32)
+
+
+def _fake_engine(pipeline):
+    engine = object.__new__(KokoroEngine)
+    engine.pipeline = pipeline
+    engine.voice = "ff_siwis"
+    engine.speed = 1.0
+    engine.sample_rate = 24000
+    # Le post-traitement a ses propres tests : ici l'audio est du silence
+    engine.postprocess = False
+    engine.phrase_pack = None
+    engine.backend = "eager"
+    return engine
+
+
+def _long_text(sentences=5):
+    return " ".join(f"Phrase numéro {i}. " + "x" * 790 for i in range(sentences))
+
+
+# --- Annulation coopérative ---
+
+
+def test_generate_stream_without_cancel_yields_all_segments():
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    chunks = list(engine.generate_stream(_long_text()))
+    assert len(chunks) == len(pipeline.calls) > 1
+
+
+def test_generate_stream_stops_between_segments():
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    cancel = threading.Event()
+    it = engine.generate_stream(_long_text(), cancel=cancel)
+    next(it)
+    cancel.set()
+    assert list(it) == []
+    assert len(pipeline.calls) == 1
+
+
+def test_generate_stream_stops_between_chunks():
+    pipeline = _FakePipeline(chunks_per_segment=5)
+    engine = _fake_engine(pipeline)
+    cancel = threading.Event()
+    it = engine.generate_stream("Bonjour.", cancel=cancel)
+    next(it)
+    cancel.set()
+    assert list(it) == []
+
+
+def test_generate_stream_already_cancelled():
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    cancel = threading.Event()
+    cancel.set()
+    assert list(engine.generate_stream("Bonjour.", cancel=cancel)) == []
+    assert pipeline.calls == []
+
+
+# --- Timings ---
+
+
+class _Result(tuple):
+    """Imite KPipeline.Result : dépaquetable en 3 éléments, avec pred_dur."""
+
+    def __new__(cls, gs, ps, audio, pred_dur):
+        obj = super().__new__(cls, (gs, ps, audio))
+        obj.pred_dur = pred_dur
+        return obj
+
+
+def test_word_timings_frames_to_seconds():
+    # <bos>=2, b, ɔ̃ (2 code points), ' ', ʒ, u, <eos>=1
+    ps = "bɔ̃ ʒu"
+    pred_dur = [2] + [4] * len(ps) + [1]
+    words = _word_timings("bon jour", ps, pred_dur)
+    assert [w["text"] for w in words] == ["bon", "jour"]
+    assert [w["phonemes"] for w in words] == ["bɔ̃", "ʒu"]
+    frame = 600 / 24000
+    assert words[0]["start"] == pytest.approx(2 * frame)
+    assert words[0]["end"] == pytest.approx(14 * frame)
+    assert words[1]["start"] == pytest.approx(18 * frame)
+    assert words[1]["end"] == pytest.approx(26 * frame)
+
+
+def test_word_timings_skips_out_of_vocab_and_punctuation():
+    vocab = {c: i for i, c in enumerate("abc ,")}
+    # 'ʔ' absent du vocab : pas de token, donc pas de durée
+    words = _word_timings("ab, c", "aʔb, c", [1, 1, 1, 1, 1, 1, 1], vocab)
+    assert [w["phonemes"] for w in words] == ["ab", "c"]
+    assert [w["text"] for w in words] == ["ab", "c"]
+
+
+def test_word_timings_text_none_on_mismatch():
+    words = _word_timings("l'API", "la pe i", [1] * 9)
+    assert [w["text"] for w in words] == [None, None, None]
+
+
+def test_generate_stream_with_timings_offsets():
+    class _TimedPipeline:
+        def __call__(self, text, voice=None, speed=None):
+            for _ in range(2):
+                yield _Result(
+                    "ab", "ab", np.zeros(1200, dtype=np.float32), [0, 1, 1, 0]
+                )
+
+    engine = _fake_engine(_TimedPipeline())
+    results = list(engine.generate_stream_with_timings("ab"))
+    assert len(results) == 2
+    audio, timings = results[1]
+    assert len(audio) == 1200
+    assert timings["start"] == pytest.approx(0.05)
+    assert timings["end"] == pytest.approx(0.1)
+    assert timings["words"][0]["start"] == pytest.approx(0.05)
+    assert timings["words"][0]["end"] == pytest.approx(0.1)
+
+
+def _padded_tone(lead=4800, voiced=12000, trail=7200):
+    tone = 0.3 * np.sin(2 * np.pi * 220 * np.arange(voiced) / 24000)
+    return np.concatenate([np.zeros(lead), tone, np.zeros(trail)]).astype(np.float32)
+
+
+def test_postprocess_trims_and_keeps_timings_consistent():
+    class _TonePipeline:
+        def __call__(self, text, voice=None, speed=None):
+            for gs in ("Un.", "Deux."):
+                # 24 frames de 600 échantillons : 8 de silence, 20 de son, 12 de silence
+                yield _Result(gs, "œ̃.", _padded_tone(), [8, 20, 2, 2, 8])
+
+    engine = _fake_engine(_TonePipeline())
+    engine.postprocess = True
+    raw = 2 * len(_padded_tone())
+    results = list(engine.generate_stream_with_timings("Un. Deux."))
+    assert len(results) == 2
+    total = sum(len(audio) for audio, _timings in results)
+    assert total < raw
+    first, second = results[0][1], results[1][1]
+    # Le son du premier chunk démarre presque au début du flux
+    assert first["start"] < 0.05
+    # Pause de 350 ms après le point
+    assert second["start"] - first["end"] == pytest.approx(0.35, abs=0.02)
+    for timings in (first, second):
+        for word in timings["words"]:
+            assert timings["start"] <= word["start"] <= word["end"] <= timings["end"]
+    assert second["end"] <= total / 24000
+    plain = list(engine.generate_stream("Un. Deux."))
+    assert sum(len(a) for a in plain) == total
+
+
+# --- Mémoire bornée ---
+
+
+def test_iter_results_memory_is_independent_of_text_length():
+    """750k caractères : aucune copie du texte complet n'est faite."""
+    import tracemalloc
+
+    def _pipeline(text, voice=None, speed=None):
+        yield text, "", np.zeros(240, dtype=np.float32)
+
+    text = "Le machine learning avance. " * (750_000 // 28)
+    engine = _fake_engine(_pipeline)
+    tracemalloc.start()
+    try:
+        for _ in engine._iter_results(text, None, None, None):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < len(text) // 10
+
+
+# --- Préchargement du G2P ---
+
+
+class _RecordingG2P:
+    def __init__(self, events):
+        self.events = events
+
+    def prefetch(self, text):
+        self.events.append(("prefetch", text))
+
+
+class _PrefetchPipeline(_FakePipeline):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+        self.g2p = _RecordingG2P(self.events)
+
+    def __call__(self, text, voice=None, speed=None):
+        self.events.append(("synth", text))
+        yield from super().__call__(text, voice, speed)
+
+
+def test_g2p_of_next_segment_is_prefetched():
+    pipeline = _PrefetchPipeline()
+    list(_fake_engine(pipeline).generate_stream(_long_text(3)))
+    segments = pipeline.calls
+    assert len(segments) > 2
+    # Chaque segment est préchargé avant la synthèse du segment précédent
+    expected = [("prefetch", segments[0])]
+    for current, following in zip(segments, segments[1:] + [None]):
+        if following is not None:
+            expected.append(("prefetch", following))
+        expected.append(("synth", current))
+    assert pipeline.events == expected
+
+
+def test_phoneme_input_is_not_prefetched():
+    pipeline = _PrefetchPipeline()
+    list(_fake_engine(pipeline).generate_stream("bɔ̃ʒuʁ", input_format="phonemes"))
+    assert pipeline.events == []
+
+
+def test_first_segment_chars_shortens_only_the_first_segment():
+    pipeline = _FakePipeline()
+    text = "Bonjour à tous, voici une annonce assez longue, " + "mot " * 60 + "fin."
+    list(_fake_engine(pipeline).generate_stream(text, first_segment_chars=60))
+    assert len(pipeline.calls) == 2
+    assert len(pipeline.calls[0]) <= 60
+    assert " ".join(pipeline.calls).split() == text.split()
+
+
+def test_segments_are_traced(tmp_path):
+    import json
+
+    import tracing
+
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("file", str(path))
+    try:
+        with tracing.trace("request"):
+            list(_fake_engine(_FakePipeline()).generate_stream(_long_text(2)))
+    finally:
+        tracing.configure()
+    names = [
+        json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"]
+        for line in path.read_text().splitlines()
+    ]
+    assert names.count("fix_pronunciation") == names.count("inference") >= 2
+
+
+# --- Entrée phonémique ---
+
+
+def test_phoneme_input_bypasses_g2p():
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    chunks = list(engine.generate_stream("bɔ̃ʒuʁ.", input_format="phonemes"))
+    assert len(chunks) == 1
+    assert pipeline.calls == []
+    assert pipeline.token_calls == ["bɔ̃ʒuʁ."]
+
+
+def test_phoneme_input_is_not_corrected():
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    list(engine.generate_stream("dos", input_format="phonemes"))
+    assert pipeline.token_calls == ["dos"]
+
+
+def test_phoneme_input_chunks_fit_model_context():
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    phonemes = " ".join(["bɔ̃ʒuʁ mɔ̃ʃɛʁ ami."] * 100)
+    list(engine.generate_stream(phonemes, input_format="phonemes"))
+    assert len(pipeline.token_calls) > 1
+    assert all(len(c) <= _MAX_PHONEMES_PER_CHUNK for c in pipeline.token_calls)
+    assert " ".join(pipeline.token_calls) == phonemes
+
+
+def test_phoneme_input_splits_at_sentence_ends():
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    # L'IPA est en minuscules : « . » suivi d'une minuscule finit la phrase
+    sentence = "bɔ̃ʒuʁ mɔ̃ʃɛʁ ami, sa va bjɛ̃ ɔ̃ sə vwa dəmɛ̃ a ʃɛ lə dɔktœʁ."
+    phonemes = " ".join([sentence] * 12)
+    list(engine.generate_stream(phonemes, input_format="phonemes"))
+    assert len(pipeline.token_calls) > 1
+    assert all(call.endswith(".") for call in pipeline.token_calls)
+
+
+class _TonePipeline(_FakePipeline):
+    """Phonèmes seuls (graphèmes vides, comme Kokoro) : deux chunks audibles."""
+
+    def generate_from_tokens(self, tokens, voice=None, speed=None):
+        tone = np.full(2400, 0.5, dtype=np.float32)
+        yield "", "bɔ̃ʒuʁ.", tone
+        yield "", "ami", tone
+
+
+def test_phoneme_input_pauses_after_sentence_end():
+    engine = _fake_engine(_TonePipeline())
+    engine.postprocess = True
+    audio = np.concatenate(list(engine.generate_stream("x", input_format="phonemes")))
+    # Deux chunks de 0,1 s séparés par la pause de fin de phrase (350 ms)
+    assert len(audio) >= 2 * 2400 + 0.3 * engine.sample_rate
+
+
+def test_unknown_input_format_raises():
+    engine = _fake_engine(_FakePipeline())
+    with pytest.raises(ValueError):
+        list(engine.generate_stream("Bonjour", input_format="ssml"))
+
+
+def test_inline_markup_survives_text_fixes():
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    list(engine.generate_stream("Le [dos](/dos/) et le dos."))
+    assert pipeline.calls == ["Le [dos](/dos/) et le deau."]
+
+
+def test_word_timings_use_markup_word():
+    words = _word_timings("Le [Kube](/kyb/).", "lə kyb.", [1] + [2] * 7 + [1])
+    assert [w["text"] for w in words] == ["Le", "Kube"]
+
+
+# --- Segmentation ---
+
+
+def test_short_text_single_segment():
+    assert list(_iter_segments("Bonjour. Au revoir.")) == ["Bonjour. Au revoir."]
+
+
+def test_segments_group_sentences_up_to_limit():
+    text = "Phrase un. Phrase deux. Phrase trois. Phrase quatre."
+    segments = list(_iter_segments(text, max_chars=25))
+    assert segments == ["Phrase un. Phrase deux.", "Phrase trois.", "Phrase quatre."]
+
+
+def test_segments_never_exceed_limit():
+    text = "Une phrase sans aucune ponctuation " * 200
+    segments = list(_iter_segments(text, max_chars=120))
+    assert all(len(s) <= 120 for s in segments)
+    assert " ".join(segments).split() == text.split()
+
+
+def test_abbreviations_do_not_split():
+    text = "M. Dupont et Mme. Martin lisent la p. 12 du rapport. Ils partent."
+    segments = list(_iter_segments(text, max_chars=60))
+    assert segments[0] == "M. Dupont et Mme. Martin lisent la p. 12 du rapport."
+
+
+def test_initials_do_not_split():
+    segments = list(_iter_segments("J. K. Rowling écrit. Elle publie.", max_chars=25))
+    assert segments == ["J. K. Rowling écrit.", "Elle publie."]
+
+
+def test_long_sentence_split_at_commas_first():
+    text = "Il a acheté des pommes, des poires et des bananes, puis il est rentré"
+    segments = list(_iter_segments(text, max_chars=55))
+    assert segments == [
+        "Il a acheté des pommes, des poires et des bananes,",
+        "puis il est rentré",
+    ]
+
+
+def test_long_sentence_split_before_conjunctions():
+    text = "Il est rentré chez lui mais la porte était fermée donc il a attendu"
+    segments = list(_iter_segments(text, max_chars=30))
+    assert segments == [
+        "Il est rentré chez lui",
+        "mais la porte était fermée",
+        "donc il a attendu",
+    ]
+
+
+def test_numbers_not_split_inside_digit_groups():
+    segments = list(_iter_segments("Il y a 1 000 000 habitants ici", max_chars=12))
+    assert "1 000 000" in segments
+
+
+# --- Phrase pack ---
+
+
+class _PackEngine:
+    sample_rate = 24000
+
+    def generate_stream(self, text, voice=None, speed=None, lexicon=None):
+        yield np.full(480, 0.25, dtype=np.float32)
+
+
+def _with_pack(tmp_path, phrases):
+    from phrase_pack import PhrasePack, build_pack
+
+    path = tmp_path / "phrases.pack"
+    build_pack([(p, "ff_siwis", 1.0) for p in phrases], path, _PackEngine())
+    pipeline = _FakePipeline()
+    engine = _fake_engine(pipeline)
+    engine.phrase_pack = PhrasePack(path)
+    return engine, pipeline
+
+
+def test_phrase_pack_serves_exact_match_without_model(tmp_path):
+    engine, pipeline = _with_pack(tmp_path, ["Votre appel est important."])
+    chunks = list(engine.generate_stream("Votre appel est important."))
+    assert pipeline.calls == []
+    assert len(chunks) == 1
+    np.testing.assert_allclose(chunks[0], 0.25, atol=1e-4)
+
+
+def test_phrase_pack_serves_matching_sentences_within_text(tmp_path):
+    engine, pipeline = _with_pack(tmp_path, ["Bonjour.", "Au revoir."])
+    chunks = list(
+        engine.generate_stream("Bonjour. Votre solde est de 12 €. Au revoir.")
+    )
+    # Seule la phrase absente du pack passe par le modèle
+    assert pipeline.calls == ["Votre solde est de douze euros."]
+    assert [len(c) for c in chunks] == [480, 240, 480]
+
+
+def test_phrase_pack_is_ignored_with_another_lexicon(tmp_path):
+    from lexicon import Lexicon
+
+    engine, pipeline = _with_pack(tmp_path, ["Bonjour."])
+    lexicon = Lexicon([("Kubernetes", "kubèrnétice", False)], version="v1")
+    list(engine.generate_stream("Bonjour.", lexicon=lexicon))
+    assert pipeline.calls == ["Bonjour."]
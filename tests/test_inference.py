@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from inference import compare_audio, prepare_model
+
+
+def _tone(seconds=1.0, freq=220.0, sr=24000):
+    t = np.arange(int(seconds * sr)) / sr
+    return (0.3 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_compare_identical_audio():
+    audio = _tone()
+    metrics = compare_audio(audio, audio)
+    assert metrics["duration_ratio"] == 1.0
+    assert metrics["snr_db"] == float("inf")
+    assert metrics["lsd_db"] == pytest.approx(0.0, abs=1e-6)
+    assert metrics["ltas_db"] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_compare_noisy_audio_is_further():
+    audio = _tone()
+    rng = np.random.default_rng(0)
+    slight = audio + rng.normal(0, 1e-4, len(audio)).astype(np.float32)
+    strong = audio + rng.normal(0, 1e-1, len(audio)).astype(np.float32)
+    close, far = compare_audio(audio, slight), compare_audio(audio, strong)
+    assert close["snr_db"] > far["snr_db"]
+    assert close["lsd_db"] < far["lsd_db"]
+
+
+def test_compare_different_lengths():
+    audio = _tone()
+    metrics = compare_audio(audio, audio[:12000])
+    assert metrics["duration_ratio"] == pytest.approx(0.5)
+    assert metrics["snr_db"] == float("inf")
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError, match="onnx"):
+        prepare_model(object(), "onnx")
+
+
+def test_int8_backend_keeps_outputs_close():
+    torch = pytest.importorskip("torch")
+
+    class _Tiny(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.lstm = torch.nn.LSTM(16, 16, batch_first=True)
+            self.proj = torch.nn.Linear(16, 8)
+
+        def forward(self, x):
+            self.lstm.flatten_parameters()
+            return self.proj(self.lstm(x)[0])
+
+    torch.manual_seed(0)
+    model = _Tiny()
+    x = torch.randn(1, 20, 16)
+    with torch.no_grad():
+        expected = model(x)
+    prepare_model(model, "int8")
+    output = model(x)
+    assert not output.requires_grad
+    assert torch.allclose(output, expected, atol=0.05)
+
+
+def test_map_weights_shares_file_pages(tmp_path):
+    torch = pytest.importorskip("torch")
+    from inference import map_weights, model_memory
+
+    model = torch.nn.Sequential(torch.nn.Linear(8, 8), torch.nn.Linear(8, 2))
+    expected = model(torch.ones(1, 8))
+    path = tmp_path / "weights.pt"
+    mapped = map_weights(model, path)
+    assert path.exists()
+    assert mapped == sum(p.numel() * 4 for p in model.parameters())
+    torch.testing.assert_close(model(torch.ones(1, 8)), expected)
+    # Un second modèle mappe le même fichier au lieu de l'écrire
+    other = torch.nn.Sequential(torch.nn.Linear(8, 8), torch.nn.Linear(8, 2))
+    map_weights(other, path)
+    torch.testing.assert_close(other(torch.ones(1, 8)), expected)
+    memory = model_memory(other)
+    assert memory["mapped_bytes"] == memory["bytes"] == mapped
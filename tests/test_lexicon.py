@@ -0,0 +1,145 @@
+import json
+import os
+
+import pytest
+
+from lexicon import Lexicon, load_lexicons
+from tts_engine import _fix_pronunciation
+
+
+def _lexicon(*entries):
+    return Lexicon(entries, name="test")
+
+
+# --- Recherche ---
+
+
+def test_simple_replacement():
+    lexicon = _lexicon(("Kubernetes", "Kubernètesse", False))
+    assert lexicon.apply("Déployé sur Kubernetes.") == "Déployé sur Kubernètesse."
+
+
+def test_case_insensitive_by_default():
+    lexicon = _lexicon(("kubernetes", "Kubernètesse", False))
+    assert lexicon.apply("KUBERNETES") == "Kubernètesse"
+
+
+def test_case_sensitive_entry():
+    lexicon = _lexicon(("SNCF", "esse enne cé èffe", True))
+    assert lexicon.apply("la SNCF") == "la esse enne cé èffe"
+    assert lexicon.apply("la sncf") == "la sncf"
+
+
+def test_case_sensitive_entry_wins():
+    lexicon = _lexicon(("Orange", "Oranje", True), ("orange", "oranje", False))
+    assert lexicon.apply("Orange orange") == "Oranje oranje"
+
+
+def test_no_partial_match():
+    lexicon = _lexicon(("dos", "deau", False))
+    assert lexicon.apply("endosser") == "endosser"
+
+
+def test_multi_word_terms_and_hyphens():
+    lexicon = _lexicon(("open source", "opène sourss", False))
+    assert lexicon.apply("un projet open source") == "un projet opène sourss"
+    assert lexicon.apply("un projet open-source") == "un projet opène sourss"
+
+
+def test_longest_term_first():
+    lexicon = _lexicon(
+        ("machine", "machinne", False), ("machine learning", "ML", False)
+    )
+    assert lexicon.apply("le machine learning") == "le ML"
+    assert lexicon.apply("la machine à laver") == "la machinne à laver"
+
+
+def test_words_separated_by_punctuation_do_not_match():
+    lexicon = _lexicon(("open source", "opène sourss", False))
+    assert lexicon.apply("open, source") == "open, source"
+
+
+def test_empty_lexicon_returns_text_unchanged():
+    assert _lexicon().apply("Bonjour") == "Bonjour"
+
+
+def test_fix_pronunciation_applies_lexicon_before_builtins():
+    lexicon = _lexicon(("Kubernetes", "Kubernètesse", False))
+    fixed = _fix_pronunciation("Kubernetes et le dos", lexicon)
+    assert fixed == "Kubernètesse et le deau"
+
+
+# --- Chargement ---
+
+
+def test_load_tsv(tmp_path):
+    path = tmp_path / "tech.tsv"
+    path.write_text(
+        "# commentaire\n\nKubernetes\tKubernètesse\nSNCF\tesse enne cé èffe\tcs\n",
+        encoding="utf-8",
+    )
+    lexicon = Lexicon.load(path)
+    assert lexicon.name == "tech"
+    assert len(lexicon) == 2
+    assert lexicon.apply("la sncf") == "la sncf"
+
+
+def test_load_tsv_rejects_malformed_line(tmp_path):
+    path = tmp_path / "bad.tsv"
+    path.write_text("sans tabulation\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="bad.tsv:1"):
+        Lexicon.load(path)
+
+
+def test_load_json_dict_and_list(tmp_path):
+    (tmp_path / "a.json").write_text(json.dumps({"Kubernetes": "K8s"}))
+    (tmp_path / "b.json").write_text(
+        json.dumps([{"term": "SNCF", "replacement": "S", "case_sensitive": True}])
+    )
+    lexicons = load_lexicons(tmp_path)
+    assert sorted(lexicons) == ["a", "b"]
+    assert lexicons["a"].apply("kubernetes") == "K8s"
+    assert lexicons["b"].apply("sncf SNCF") == "sncf S"
+
+
+def test_load_lexicons_missing_directory(tmp_path):
+    assert load_lexicons(tmp_path / "absent") == {}
+
+
+def test_cache_roundtrip_and_invalidation(tmp_path):
+    path = tmp_path / "tech.tsv"
+    path.write_text("Kubernetes\tKubernètesse\n", encoding="utf-8")
+    first = Lexicon.load(path)
+    assert (tmp_path / "tech.tsv.cache").exists()
+
+    cached = Lexicon.load(path)
+    assert cached.version == first.version
+    assert cached.apply("Kubernetes") == "Kubernètesse"
+
+    path.write_text("Kubernetes\tKoubernetess\n", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reloaded = Lexicon.load(path)
+    assert reloaded.version != first.version
+    assert reloaded.apply("Kubernetes") == "Koubernetess"
+
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    path = tmp_path / "tech.tsv"
+    path.write_text("Kubernetes\tKubernètesse\n", encoding="utf-8")
+    (tmp_path / "tech.tsv.cache").write_bytes(b"\x80\x05pas du JSON")
+    assert Lexicon.load(path).apply("Kubernetes") == "Kubernètesse"
+
+
+def test_cache_is_plain_json(tmp_path):
+    path = tmp_path / "tech.tsv"
+    path.write_text("Kubernetes\tKubernètesse\n", encoding="utf-8")
+    Lexicon.load(path)
+    cached = json.loads((tmp_path / "tech.tsv.cache").read_text(encoding="utf-8"))
+    assert cached["index"]["folded"] == {"kubernetes": "Kubernètesse"}
+
+
+def test_terms_with_an_apostrophe_match():
+    lexicon = Lexicon([("l'open source", "lopène source", False)])
+    assert lexicon.apply("J'aime l'open source.") == "J'aime lopène source."
+    assert lexicon.apply("J'aime l’open-source.") == "J'aime lopène source."
@@ -0,0 +1,20 @@
+import sys
+
+import pytest
+
+from memory import process_memory, release_memory
+
+
+def test_process_memory_reports_peak_rss():
+    assert process_memory()["peak_rss"] > 0
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="smaps_rollup : Linux seul")
+def test_process_memory_splits_private_and_shared():
+    stats = process_memory()
+    assert stats["rss"] > 0
+    assert stats["private"] + stats["shared"] == pytest.approx(stats["rss"], rel=0.05)
+
+
+def test_release_memory_does_not_fail():
+    release_memory()
@@ -0,0 +1,135 @@
+import pytest
+
+from normalizer import cardinal, normalize, ordinal, roman_value
+from tts_engine import _fix_pronunciation
+
+
+@pytest.mark.parametrize(
+    "n, words",
+    [
+        (0, "zéro"),
+        (17, "dix-sept"),
+        (21, "vingt et un"),
+        (71, "soixante et onze"),
+        (80, "quatre-vingts"),
+        (81, "quatre-vingt-un"),
+        (99, "quatre-vingt-dix-neuf"),
+        (200, "deux cents"),
+        (201, "deux cent un"),
+        (1001, "mille un"),
+        (80_000, "quatre-vingt mille"),
+        (200_000, "deux cent mille"),
+        (2_000_000, "deux millions"),
+        (1_789, "mille sept cent quatre-vingt-neuf"),
+    ],
+)
+def test_cardinal(n, words):
+    assert cardinal(n) == words
+
+
+def test_cardinal_feminine():
+    assert cardinal(1, feminine=True) == "une"
+    assert cardinal(21, feminine=True) == "vingt et une"
+
+
+@pytest.mark.parametrize(
+    "n, words",
+    [
+        (2, "deuxième"),
+        (5, "cinquième"),
+        (9, "neuvième"),
+        (11, "onzième"),
+        (21, "vingt et unième"),
+        (80, "quatre-vingtième"),
+        (1_000_000, "millionième"),
+    ],
+)
+def test_ordinal(n, words):
+    assert ordinal(n) == words
+
+
+def test_roman_value_rejects_malformed_numerals():
+    assert roman_value("XIV") == 14
+    assert roman_value("MCMXCIX") == 1999
+    assert roman_value("IIII") is None
+    assert roman_value("VX") is None
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("J'ai 3 chats.", "J'ai trois chats."),
+        ("1 000 000 habitants", "un million habitants"),
+        ("1.000 habitants", "mille habitants"),
+        ("3,5 Go", "trois virgule cinq gigaoctets"),
+        ("1,5 Go", "un virgule cinq gigaoctet"),
+        ("3,05", "trois virgule zéro cinq"),
+        ("Il fait -5 °C", "Il fait moins cinq degrés Celsius"),
+        ("12 €", "douze euros"),
+        ("12,50 €", "douze euros cinquante"),
+        ("0,99 €", "quatre-vingt-dix-neuf centimes"),
+        ("$5", "cinq dollars"),
+        ("1 000 000 €", "un million d'euros"),
+        ("15 %", "quinze pour cent"),
+        ("90 km/h", "quatre-vingt-dix kilomètres par heure"),
+        ("1 h", "une heure"),
+        ("à 14h30", "à quatorze heures trente"),
+        ("à 21h05", "à vingt et une heures cinq"),
+        ("vers 8 h", "vers huit heures"),
+        ("14:00", "quatorze heures"),
+        ("le 14/07/1789", "le quatorze juillet mille sept cent quatre-vingt-neuf"),
+        ("le 1/05/2024", "le premier mai deux mille vingt-quatre"),
+        ("2024-07-14", "quatorze juillet deux mille vingt-quatre"),
+        ("le 1er mai", "le premier mai"),
+        ("la 1re fois", "la première fois"),
+        ("le 2e étage", "le deuxième étage"),
+        ("la 2nde guerre", "la seconde guerre"),
+        ("les 3èmes", "les troisièmes"),
+        ("le XIXe siècle", "le dix-neuvième siècle"),
+        ("François Ier", "François premier"),
+        ("Louis XIV", "Louis quatorze"),
+        ("chapitre III", "chapitre trois"),
+        ("007", "zéro zéro sept"),
+        ("1,5 million d'habitants", "un virgule cinq millions d'habitants"),
+        ("2,3 milliards", "deux virgule trois milliards"),
+        ("1 million", "un million"),
+        ("les années 10-20", "les années dix à vingt"),
+        ("10-20 %", "dix à vingt pour cent"),
+        ("le 14/07 au soir", "le quatorze juillet au soir"),
+    ],
+)
+def test_normalize(text, expected):
+    assert normalize(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Ce que Le Monde De la Musique",  # pas des chiffres romains
+        "Jean D. et Louis C. sont là",  # initiales
+        "en 2020 s'est produit",  # « s » n'est pas une unité ici
+        "3 mois",
+        "la version 1.2.3",
+        "le modèle A380",
+    ],
+)
+def test_normalize_leaves_non_numeric_words(text):
+    normalized = normalize(text)
+    for word in ("Ce", "Le", "De", "D.", "C.", "s'est", "mois", "1.2.3", "A380"):
+        if word in text:
+            assert word in normalized
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("1/2", "un/deux"),  # fraction, pas une date
+        ("06-12-34-56", "zéro six-douze-trente-quatre-cinquante-six"),
+    ],
+)
+def test_normalize_leaves_fractions_and_number_sequences(text, expected):
+    assert normalize(text) == expected
+
+
+def test_fix_pronunciation_normalizes_outside_phoneme_markup():
+    assert _fix_pronunciation("[12](/dudʒ/) et 12") == "[12](/dudʒ/) et douze"
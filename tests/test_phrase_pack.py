@@ -0,0 +1,143 @@
+import json
+
+import numpy as np
+import pytest
+
+from lexicon import Lexicon
+from phrase_pack import CHUNK_SAMPLES, PhrasePack, build_pack, read_phrases
+
+
+class _ToneEngine:
+    """Moteur factice : une sinusoïde dont la longueur dépend du texte."""
+
+    sample_rate = 24000
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_stream(self, text, voice=None, speed=None, lexicon=None):
+        self.calls.append((text, voice, speed))
+        t = np.arange(100 * len(text), dtype=np.float32)
+        audio = 0.5 * np.sin(t / 10).astype(np.float32)
+        yield audio[: len(audio) // 2]
+        yield audio[len(audio) // 2 :]
+
+
+def _build(tmp_path, phrases, lexicon=None):
+    path = tmp_path / "phrases.pack"
+    engine = _ToneEngine()
+    count = build_pack(phrases, path, engine, lexicon)
+    return PhrasePack(path), engine, count
+
+
+def test_roundtrip_matches_engine_output(tmp_path):
+    pack, _engine, count = _build(tmp_path, [("Bonjour.", "ff_siwis", 1.0)])
+    assert count == len(pack) == 1
+    expected = np.concatenate(list(_ToneEngine().generate_stream("Bonjour.")))
+    audio = pack.get("Bonjour.", "ff_siwis", 1.0)
+    assert audio.dtype == np.float32
+    np.testing.assert_allclose(audio, expected, atol=1 / 32767)
+
+
+def test_lookup_normalizes_whitespace_and_keys_on_voice_and_speed(tmp_path):
+    pack, _engine, _count = _build(
+        tmp_path, [("Votre appel  est important.", "ff_siwis", 1.0)]
+    )
+    assert pack.get(" Votre appel\nest important. ", "ff_siwis", 1.0) is not None
+    assert pack.get("Votre appel est important.", "ff_siwis", 1.2) is None
+    assert pack.get("Votre appel est important.", "autre", 1.0) is None
+
+
+def test_pcm_is_a_view_on_the_mapped_file(tmp_path):
+    pack, _engine, _count = _build(tmp_path, [("Bonjour.", "ff_siwis", 1.0)])
+    pcm = pack.pcm("Bonjour.", "ff_siwis", 1.0)
+    assert pcm.dtype == np.dtype("<i2")
+    assert not pcm.flags.owndata
+    assert not pcm.flags.writeable
+
+
+def test_duplicates_are_rendered_once(tmp_path):
+    phrases = [("Bonjour.", "ff_siwis", 1.0), ("Bonjour. ", "ff_siwis", 1.0)]
+    _pack, engine, count = _build(tmp_path, phrases)
+    assert count == 1
+    assert len(engine.calls) == 1
+
+
+def test_chunks_cover_the_phrase(tmp_path):
+    text = "Une phrase assez longue pour plusieurs chunks. " * 5
+    pack, _engine, _count = _build(tmp_path, [(text, "ff_siwis", 1.0)])
+    chunks = list(pack.chunks(text, "ff_siwis", 1.0))
+    assert len(chunks) > 1
+    assert all(len(c) <= CHUNK_SAMPLES for c in chunks)
+    np.testing.assert_array_equal(
+        np.concatenate(chunks), pack.get(text, "ff_siwis", 1.0)
+    )
+
+
+def test_pack_is_tied_to_its_lexicon(tmp_path):
+    lexicon = Lexicon([("Kubernetes", "kubèrnétice", False)], version="v1")
+    pack, _engine, _count = _build(tmp_path, [("Bonjour.", "ff_siwis", 1.0)], lexicon)
+    assert pack.accepts(lexicon)
+    assert not pack.accepts(None)
+    assert not pack.accepts(Lexicon([], version="v2"))
+
+
+def test_pack_is_tied_to_its_backend(tmp_path):
+    pack, _engine, _count = _build(tmp_path, [("Bonjour.", "ff_siwis", 1.0)])
+    assert pack.accepts(None, "eager")
+    assert not pack.accepts(None, "int8")
+
+
+def test_lexicon_version_depends_on_content_only(tmp_path):
+    first, second = tmp_path / "a", tmp_path / "b"
+    for directory in (first, second):
+        directory.mkdir()
+        (directory / "tech.tsv").write_text("Kubernetes\tkubèrnétice\n")
+    lexicon = Lexicon.load(first / "tech.tsv", use_cache=False)
+    pack, _engine, _count = _build(tmp_path, [("Bonjour.", "ff_siwis", 1.0)], lexicon)
+    assert pack.accepts(Lexicon.load(second / "tech.tsv", use_cache=False))
+
+
+def test_rejects_files_that_are_not_packs(tmp_path):
+    path = tmp_path / "bad.pack"
+    path.write_bytes(b"not a pack at all")
+    with pytest.raises(ValueError):
+        PhrasePack(path)
+
+
+def test_read_phrases_text_and_jsonl(tmp_path):
+    txt = tmp_path / "phrases.txt"
+    txt.write_text("# commentaire\nBonjour.\n\nAu revoir.\n", encoding="utf-8")
+    assert list(read_phrases(txt, ["a", "b"], [1.0])) == [
+        ("Bonjour.", "a", 1.0),
+        ("Bonjour.", "b", 1.0),
+        ("Au revoir.", "a", 1.0),
+        ("Au revoir.", "b", 1.0),
+    ]
+    jsonl = tmp_path / "phrases.jsonl"
+    jsonl.write_text(
+        json.dumps({"text": "Bonjour.", "speed": 1.2}) + "\n", encoding="utf-8"
+    )
+    assert list(read_phrases(jsonl, ["a"], [1.0])) == [("Bonjour.", "a", 1.2)]
+
+
+def test_version_is_stored_at_build_and_follows_the_audio(tmp_path):
+    class _LoudEngine(_ToneEngine):
+        def generate_stream(self, text, voice=None, speed=None, lexicon=None):
+            for chunk in super().generate_stream(text, voice, speed, lexicon):
+                yield chunk * 1.5
+
+    phrases = [("Bonjour.", "ff_siwis", 1.0)]
+    versions = []
+    for name, engine in (
+        ("a", _ToneEngine()),
+        ("b", _ToneEngine()),
+        ("c", _LoudEngine()),
+    ):
+        build_pack(phrases, tmp_path / f"{name}.pack", engine)
+        pack = PhrasePack(tmp_path / f"{name}.pack")
+        versions.append(pack.version)
+        pack.close()
+    raw = (tmp_path / "a.pack").read_bytes()
+    assert f'"version": "{versions[0]}"'.encode() in raw
+    assert versions[0] == versions[1] != versions[2]
@@ -1,13 +1,18 @@
+import threading
+import time
+
 from tts_engine import (
     EN_TO_FR,
     FRENCH_FIXES,
     PROPER_NAMES,
+    FrenchG2P,
     _fix_en_switches,
     _fix_pronunciation,
     _map_en_to_fr,
+    _pipeline_chunks,
+    _postprocess_phonemes,
 )
 
-
 # --- Tests Layer 1 : _fix_pronunciation (text-level) ---
 
 
@@ -350,3 +355,179 @@ def test_proper_names_in_sentence():
     assert "Bil Guéïtse" in result
     assert "Ilone Mosk" in result
     assert "Opène-a-aille" in result
+
+
+# --- Tests _postprocess_phonemes (réécriture post-espeak complète) ---
+
+
+def _reference_postprocess(ps):
+    """Ancienne suite de passes de FrenchG2P.__call__, sans raccourci."""
+    ps = _fix_en_switches(ps)
+    for old, new in sorted(
+        {
+            "a^ɪ": "I",
+            "a^ʊ": "W",
+            "d^z": "ʣ",
+            "d^ʒ": "ʤ",
+            "e^ɪ": "A",
+            "o^ʊ": "O",
+            "ə^ʊ": "Q",
+            "s^s": "S",
+            "t^s": "ʦ",
+            "t^ʃ": "ʧ",
+            "ɔ^ɪ": "Y",
+        }.items()
+    ):
+        ps = ps.replace(old, new)
+    ps = ps.replace("^", "").replace("-", "")
+    return ps.replace("«", "(").replace("»", ")")
+
+
+_POSTPROCESS_CASES = [
+    "ʒˈi ˈe mˈal o (^e^n)dˈɒs(^f^r)",
+    "(^e^n)fˈʊtbɔːl(^f^r)",
+    "(^e^n)d^ʒˈɒɡɪŋ(^f^r)",
+    "ʒˈɛm lə- (^e^n)fˈʊtbɔːl(^f^r) e lə- (^e^n)d^ʒˈɒɡɪŋ(^f^r)",
+    "bɔ̃ʒˈuʁ kɔmˈɑ̃ ale vˈu",
+    "(^e^n)wiːkˈɛnd(^f^r)",
+    "(en)pˈʊl(fr) e (^e^n)pˈa^ɪp(^f^r)",
+    "t^ʃˈaw, d^zˈeta, ɡˈɑ̃t^s « ɛ̃ » lə-",
+    "(^e^n)sans fin",
+    "",
+]
+
+
+def test_postprocess_matches_reference():
+    for ps in _POSTPROCESS_CASES:
+        assert _postprocess_phonemes(ps) == _reference_postprocess(ps), ps
+
+
+def test_postprocess_e2m_tokens():
+    assert _postprocess_phonemes("t^ʃˈaw d^ʒˈin") == "ʧˈaw ʤˈin"
+
+
+def test_postprocess_french_only_untouched():
+    ps = "bɔ̃ʒˈuʁ kɔmˈɑ̃ ale vˈu"
+    assert _postprocess_phonemes(ps) == ps
+
+
+def test_postprocess_angles_and_dashes():
+    assert _postprocess_phonemes("« lə- mˈɔ̃d »") == "( lə mˈɔ̃d )"
+
+
+# --- Balises inline [mot](/phonèmes/) ---
+
+
+class _FakeBackend:
+    """Simule EspeakBackend : renvoie le texte en minuscules, en comptant les appels."""
+
+    def __init__(self):
+        self.calls = []
+
+    def phonemize(self, texts):
+        self.calls.append(list(texts))
+        return [t.strip().lower() for t in texts]
+
+
+def _g2p(pool_size=1, backend_factory=_FakeBackend):
+    return FrenchG2P(pool_size=pool_size, backend_factory=backend_factory)
+
+
+def test_fix_pronunciation_leaves_markup_untouched():
+    text = "[dos](/dos/) et dos"
+    assert _fix_pronunciation(text) == "[dos](/dos/) et deau"
+
+
+def test_g2p_markup_bypasses_espeak():
+    g2p = _g2p()
+    ps, _ = g2p("Voici [Kubernetes](/kubɛʁnɛtɛs/), enfin.")
+    assert ps == "voici kubɛʁnɛtɛs, enfin."
+    # Un seul appel espeak pour tous les morceaux hors balise
+    assert g2p.backends[0].calls == [["Voici ", ", enfin."]]
+
+
+def test_g2p_markup_only_skips_espeak():
+    g2p = _g2p()
+    assert g2p("[Kube](/kyb/)") == ("kyb", None)
+    assert g2p.backends[0].calls == []
+
+
+def test_g2p_without_markup_unchanged():
+    g2p = _g2p()
+    assert g2p("Bonjour") == ("bonjour", None)
+
+
+# --- Pool de backends et préchargement ---
+
+
+class _SlowBackend(_FakeBackend):
+    """Backend non réentrant : échoue si deux threads l'utilisent en même temps."""
+
+    def __init__(self):
+        super().__init__()
+        self.busy = threading.Lock()
+
+    def phonemize(self, texts):
+        assert self.busy.acquire(blocking=False), "backend utilisé en parallèle"
+        try:
+            time.sleep(0.02)
+            return super().phonemize(texts)
+        finally:
+            self.busy.release()
+
+
+def test_g2p_pool_never_shares_a_backend():
+    g2p = _g2p(pool_size=3, backend_factory=_SlowBackend)
+    texts = [f"Phrase {i}" for i in range(12)]
+    assert g2p.map(texts) == [t.lower() for t in texts]
+    assert sum(len(b.calls) for b in g2p.backends) == 12
+
+
+def test_g2p_pool_runs_in_parallel():
+    # Chaque appel attend que les 4 backends soient occupés en même temps :
+    # un pool qui sérialiserait les appels casserait la barrière
+    barrier = threading.Barrier(4, timeout=5)
+    busy, peak, lock = [0], [0], threading.Lock()
+
+    class _ConcurrentBackend(_FakeBackend):
+        def phonemize(self, texts):
+            with lock:
+                busy[0] += 1
+                peak[0] = max(peak[0], busy[0])
+            try:
+                barrier.wait()
+                return super().phonemize(texts)
+            finally:
+                with lock:
+                    busy[0] -= 1
+
+    g2p = _g2p(pool_size=4, backend_factory=_ConcurrentBackend)
+    texts = [f"Phrase {i}" for i in range(8)]
+    assert g2p.map(texts) == [t.lower() for t in texts]
+    assert peak[0] == 4
+
+
+def test_prefetch_result_is_reused():
+    g2p = _g2p()
+    g2p.prefetch("Bonjour.")
+    assert g2p("Bonjour.") == ("bonjour.", None)
+    assert g2p.backends[0].calls == [["Bonjour."]]
+
+
+def test_prefetch_uses_pipeline_chunks():
+    text = "Première phrase. " * 30 + "\nDeuxième ligne."
+    chunks = _pipeline_chunks(text)
+    assert len(chunks) == 3
+    assert all(len(c) <= 400 for c in chunks)
+    g2p = _g2p()
+    g2p.prefetch(text)
+    for chunk in chunks:
+        g2p(chunk)
+    assert len(g2p.backends[0].calls) == 3
+
+
+def test_prefetch_is_bounded():
+    g2p = _g2p()
+    for i in range(200):
+        g2p.prefetch(f"Texte {i}")
+    assert len(g2p._prefetched) <= 64
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from scheduler import CostModel, PriorityLock
+
+# --- Modèle de coût ---
+
+
+def test_default_estimate_scales_with_length_and_speed():
+    model = CostModel(seconds_per_char=0.01)
+    assert model.estimate(100, "ff_siwis", 1.0) == pytest.approx(1.0)
+    assert model.estimate(100, "ff_siwis", 2.0) == pytest.approx(0.5)
+
+
+def test_observe_sets_then_smooths_rate():
+    model = CostModel(seconds_per_char=0.01, alpha=0.5)
+    model.observe(100, "ff_siwis", 1.0, 2.0)
+    assert model.seconds_per_char("ff_siwis", 1.0) == pytest.approx(0.02)
+    model.observe(100, "ff_siwis", 1.0, 4.0)
+    assert model.seconds_per_char("ff_siwis", 1.0) == pytest.approx(0.03)
+
+
+def test_unseen_voice_uses_global_rate():
+    model = CostModel(seconds_per_char=0.01, alpha=1.0)
+    model.observe(100, "ff_siwis", 1.0, 3.0)
+    # Autre voix, vitesse 1.5 : débit global ramené à la vitesse
+    assert model.seconds_per_char("autre", 1.5) == pytest.approx(0.02)
+
+
+def test_observe_ignores_empty_measures():
+    model = CostModel(seconds_per_char=0.01)
+    model.observe(0, "ff_siwis", 1.0, 1.0)
+    model.observe(10, "ff_siwis", 1.0, 0.0)
+    assert model.snapshot() == {}
+
+
+# --- Verrou à priorité ---
+
+
+async def _run_jobs(lock, costs, hold=0.01):
+    order = []
+
+    async def job(name, cost):
+        async with lock.hold(cost):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async with lock.hold(0):
+        tasks = [asyncio.create_task(job(n, c)) for n, c in costs]
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_shortest_job_first():
+    lock = PriorityLock(aging=0.0)
+    order = asyncio.run(
+        _run_jobs(lock, [("long", 10.0), ("court", 1.0), ("moyen", 5.0)])
+    )
+    assert order == ["court", "moyen", "long"]
+    assert not lock.locked()
+
+
+def test_aging_lets_old_long_jobs_through():
+    async def scenario():
+        lock = PriorityLock(aging=1000.0)
+        order = []
+
+        async def job(name, cost):
+            async with lock.hold(cost):
+                order.append(name)
+
+        await lock.acquire(0)
+        old = asyncio.create_task(job("ancien", 5.0))
+        await asyncio.sleep(0.02)  # 20 ms × 1000 = 20 s de priorité gagnée
+        new = asyncio.create_task(job("nouveau", 1.0))
+        await asyncio.sleep(0)
+        lock.release()
+        await asyncio.gather(old, new)
+        return order
+
+    assert asyncio.run(scenario()) == ["ancien", "nouveau"]
+
+
+def test_cancelled_waiter_is_skipped():
+    async def scenario():
+        lock = PriorityLock()
+        await lock.acquire(0)
+        waiter = asyncio.create_task(lock.acquire(1.0))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        lock.release()
+        return lock.locked()
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_wait_estimate_counts_shorter_jobs_ahead():
+    async def scenario():
+        lock = PriorityLock(aging=0.0)
+        assert lock.wait_estimate(3.0) == 0.0
+        await lock.acquire(2.0)
+        tasks = [asyncio.create_task(lock.acquire(c)) for c in (1.0, 10.0)]
+        await asyncio.sleep(0)
+        estimate = lock.wait_estimate(3.0)
+        backlog = lock.backlog()
+        waiting = lock.waiting()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        lock.release()
+        return estimate, backlog, waiting
+
+    estimate, backlog, waiting = asyncio.run(scenario())
+    # Job en cours (~2 s) + job de 1 s ; le job de 10 s passe après
+    assert estimate == pytest.approx(3.0, abs=0.1)
+    assert backlog == pytest.approx(13.0, abs=0.1)
+    assert waiting == 2
+
+
+def test_priority_lets_urgent_job_jump_ahead():
+    async def scenario():
+        lock = PriorityLock(aging=0.0)
+        order = []
+
+        async def job(name, cost, priority=None):
+            async with lock.hold(cost, priority):
+                order.append(name)
+
+        await lock.acquire(0)
+        tasks = [
+            asyncio.create_task(job("court", 1.0)),
+            asyncio.create_task(job("urgent", 5.0, priority=0.0)),
+        ]
+        await asyncio.sleep(0)
+        # L'urgent passe devant, mais son coût compte dans l'attente des autres
+        urgent_wait = lock.wait_estimate(5.0, priority=0.0)
+        lock.release()
+        await asyncio.gather(*tasks)
+        return order, urgent_wait
+
+    order, urgent_wait = asyncio.run(scenario())
+    assert order == ["urgent", "court"]
+    assert urgent_wait == pytest.approx(5.0, abs=0.1)
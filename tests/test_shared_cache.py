@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+
+import pytest
+
+from shared_cache import SharedCache
+
+
+def test_put_get_roundtrip(tmp_path):
+    cache = SharedCache(tmp_path)
+    assert cache.get("abc") is None
+    cache.put("abc", b"audio")
+    assert cache.get("abc") == b"audio"
+
+
+def test_visible_from_another_instance(tmp_path):
+    # Deux workers = deux instances sur le même répertoire
+    SharedCache(tmp_path).put("abc", b"audio")
+    assert SharedCache(tmp_path).get("abc") == b"audio"
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    cache = SharedCache(tmp_path, max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    os.utime(tmp_path / "a", (1, 1))
+    os.utime(tmp_path / "b", (2, 2))
+    cache.get("a")  # a redevient le plus récent
+    cache.put("c", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"1234"
+    assert cache.stats() == {"entries": 2, "bytes": 8, "max_bytes": 10}
+
+
+def test_puts_under_budget_do_not_scan_the_directory(tmp_path, monkeypatch):
+    cache = SharedCache(tmp_path, max_bytes=100)
+    cache.put("a", b"1234")
+    monkeypatch.setattr(cache, "_entries", lambda: pytest.fail("scan"))
+    cache.put("b", b"1234")
+    cache.put("a", b"123456")  # remplacement : l'ancienne taille est déduite
+    assert cache.stats() == {"entries": 2, "bytes": 10, "max_bytes": 100}
+
+
+def test_entry_larger_than_budget_is_not_stored(tmp_path):
+    cache = SharedCache(tmp_path, max_bytes=4)
+    cache.put("big", b"12345")
+    assert cache.get("big") is None
+
+
+def test_rejects_keys_that_are_not_file_names(tmp_path):
+    cache = SharedCache(tmp_path)
+    with pytest.raises(ValueError):
+        cache.get("../etc/passwd")
+
+
+def test_clear_and_stats(tmp_path):
+    cache = SharedCache(tmp_path)
+    cache.put("a", b"12")
+    cache.put("b", b"345")
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] == 5
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def _writer(directory, worker):
+    cache = SharedCache(directory, max_bytes=2000)
+    for i in range(50):
+        cache.put(f"w{worker}-{i}", bytes(100))
+
+
+def test_concurrent_writers_respect_budget(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_writer, args=(tmp_path, w)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+    stats = SharedCache(tmp_path, max_bytes=2000).stats()
+    assert 0 < stats["bytes"] <= 2000
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture()
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("file", str(path), sample_rate=1.0)
+    yield path
+    tracing.configure()
+
+
+def _spans(path):
+    spans = []
+    for line in path.read_text().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                spans.extend(scope["spans"])
+    return {span["name"]: span for span in spans}
+
+
+def test_spans_are_nested_under_the_root(trace_file):
+    with tracing.trace("request"):
+        with tracing.span("g2p", chars=12):
+            pass
+        opened = tracing.start("encode", format="mp3")
+        opened.end()
+    spans = _spans(trace_file)
+    root = spans["request"]
+    assert root["parentSpanId"] == ""
+    for name in ("g2p", "encode"):
+        assert spans[name]["traceId"] == root["traceId"]
+        assert spans[name]["parentSpanId"] == root["spanId"]
+    assert {"key": "chars", "value": {"intValue": "12"}} in spans["g2p"]["attributes"]
+
+
+def test_span_records_error_status(trace_file):
+    with (
+        pytest.raises(RuntimeError),
+        tracing.trace("request"),
+        tracing.span("inference"),
+    ):
+        raise RuntimeError
+    assert _spans(trace_file)["inference"]["status"]["code"] == 2
+
+
+def test_unsampled_requests_export_nothing(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("file", str(path), sample_rate=0.0)
+    try:
+        with tracing.trace("request") as root, tracing.span("g2p") as child:
+            assert root is child is tracing.NO_SPAN
+    finally:
+        tracing.configure()
+    assert path.read_text() == ""
+
+
+def test_span_outside_a_trace_is_a_no_op(trace_file):
+    with tracing.span("g2p") as span:
+        assert span is tracing.NO_SPAN
+    assert trace_file.read_text() == ""
+
+
+def test_propagate_carries_span_and_request_id_into_pool(trace_file):
+    seen = []
+
+    def work():
+        seen.append(tracing.request_id.get())
+        with tracing.span("g2p"):
+            pass
+
+    token = tracing.request_id.set("abc")
+    try:
+        with tracing.trace("request"), ThreadPoolExecutor(1) as pool:
+            pool.submit(tracing.propagate(work)).result()
+    finally:
+        tracing.request_id.reset(token)
+    spans = _spans(trace_file)
+    assert seen == ["abc"]
+    assert spans["g2p"]["parentSpanId"] == spans["request"]["spanId"]
+
+
+def test_log_records_carry_request_id():
+    tracing.install_log_request_id()
+    tracing.install_log_request_id()  # idempotent
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("test_tracing")
+    logger.addHandler(handler)
+    token = tracing.request_id.set("req-1")
+    try:
+        logger.warning("message")
+    finally:
+        tracing.request_id.reset(token)
+        logger.removeHandler(handler)
+    assert records[0].request_id == "req-1"
+
+
+def test_unknown_exporter_raises():
+    with pytest.raises(ValueError):
+        tracing.configure("zipkin")
+
+
+def test_activate_parents_spans_of_to_thread(trace_file):
+    def work():
+        with tracing.span("inference"):
+            pass
+
+    async def main():
+        with tracing.trace("request"):
+            synthesis = tracing.start("engine.synthesis")
+            with tracing.activate(synthesis):
+                pending = asyncio.ensure_future(asyncio.to_thread(work))
+            await pending
+            synthesis.end()
+
+    asyncio.run(main())
+    spans = _spans(trace_file)
+    assert spans["inference"]["parentSpanId"] == spans["engine.synthesis"]["spanId"]
+    assert spans["engine.synthesis"]["parentSpanId"] == spans["request"]["spanId"]
@@ -0,0 +1,358 @@
+"""Traces des requêtes à travers le pipeline de synthèse.
+
+Chaque requête HTTP échantillonnée ouvre un span racine
+(:class:`TracingMiddleware`). Sous lui, :func:`span` et :func:`start` ouvrent
+des spans : validation, cache, file du moteur, corrections de prononciation,
+G2P et inférence de chaque segment, conversion PCM, encodage. Le span courant
+est porté par un ``contextvar``. Il suit donc la requête dans les tâches
+asyncio et dans les threads de ``asyncio.to_thread``. :func:`propagate` le
+transmet aux pools de threads (G2P).
+
+Export (:func:`configure`) :
+
+- ``file`` : une ligne OTLP/JSON par span, dans un fichier ou sur stderr
+  (``-``). Le format est celui que lit le receiver ``otlpjsonfile`` du
+  collecteur OpenTelemetry ;
+- ``otel`` : spans créés via l'API ``opentelemetry`` (SDK, exporteur et
+  ressource configurés par l'opérateur).
+
+Hors requête échantillonnée, :func:`span` ne coûte qu'une lecture de
+``contextvar``. L'identifiant de requête (``X-Request-ID``, repris du
+client ou généré) est renvoyé dans la réponse. Après
+:func:`install_log_request_id`, chaque enregistrement de log le porte
+(``%(request_id)s``), quels que soient les handlers (uvicorn, gunicorn...).
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+
+EXPORTERS = ("file", "otel")
+_SCOPE = "kokoro-tts"
+# Identifiant de requête accepté tel quel depuis le client
+_REQUEST_ID_RE = re.compile(r"[\w.:-]{1,128}")
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "request_id", default="-"
+)
+
+
+class Span:
+    """Span en cours ; ``set`` ajoute un attribut, ``end`` le termine."""
+
+    __slots__ = (
+        "_ended",
+        "_otel",
+        "attributes",
+        "name",
+        "parent_id",
+        "span_id",
+        "start_ns",
+        "trace_id",
+    )
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else ""
+        self.start_ns = time.time_ns()
+        self.attributes = attributes
+        self._ended = False
+        self._otel = None
+        if _otel_tracer is not None:
+            from opentelemetry import trace
+
+            context = trace.set_span_in_context(parent._otel) if parent else None
+            self._otel = _otel_tracer.start_span(
+                name,
+                context=context,
+                attributes=_otel_attributes(attributes),
+                start_time=self.start_ns,
+            )
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+        if self._otel is not None and value is not None:
+            self._otel.set_attribute(key, value)
+
+    def end(self, error: BaseException | None = None) -> None:
+        if self._ended:
+            return
+        self._ended = True
+        end_ns = time.time_ns()
+        if self._otel is not None:
+            if error is not None:
+                self._otel.record_exception(error)
+                from opentelemetry.trace import Status, StatusCode
+
+                self._otel.set_status(Status(StatusCode.ERROR, type(error).__name__))
+            self._otel.end(end_time=end_ns)
+        elif _file_exporter is not None:
+            _file_exporter.export(self, end_ns, error)
+
+
+class _NoSpan:
+    """Span d'une requête non échantillonnée : aucune mesure, aucun export."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def end(self, error: BaseException | None = None) -> None:
+        pass
+
+
+NO_SPAN = _NoSpan()
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "span", default=None
+)
+
+
+def _attribute_value(value) -> dict:
+    # Types OTLP/JSON : les entiers sont des chaînes (int64)
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otel_attributes(attributes: dict) -> dict:
+    return {
+        key: value if isinstance(value, (bool, int, float, str)) else str(value)
+        for key, value in attributes.items()
+        if value is not None
+    }
+
+
+class _FileExporter:
+    """Écrit chaque span terminé comme une requête d'export OTLP/JSON."""
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._file = (
+            sys.stderr if path == "-" else open(path, "a", encoding="utf-8")  # noqa: SIM115
+        )
+
+    def export(self, span: Span, end_ns: int, error: BaseException | None) -> None:
+        record = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id,
+            "name": span.name,
+            "kind": 2 if not span.parent_id else 1,  # SERVER, INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [
+                {"key": key, "value": _attribute_value(value)}
+                for key, value in span.attributes.items()
+                if value is not None
+            ],
+            "status": (
+                {"code": 2, "message": type(error).__name__}
+                if error is not None
+                else {}
+            ),
+        }
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {
+                                    "key": "service.name",
+                                    "value": {"stringValue": _SCOPE},
+                                }
+                            ]
+                        },
+                        "scopeSpans": [{"scope": {"name": _SCOPE}, "spans": [record]}],
+                    }
+                ]
+            },
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not sys.stderr:
+            self._file.close()
+
+
+_sample_rate = 0.0
+_file_exporter: _FileExporter | None = None
+_otel_tracer = None
+
+
+def configure(exporter: str = "", path: str = "-", sample_rate: float = 1.0) -> None:
+    """Active l'export (``file``, ``otel``) ou le désactive (``""``).
+
+    ``sample_rate`` : fraction des requêtes tracées, tirée au span racine.
+    """
+    global _sample_rate, _file_exporter, _otel_tracer
+    if exporter and exporter not in EXPORTERS:
+        raise ValueError(f"exporteur de traces inconnu : {exporter!r}")
+    if _file_exporter is not None:
+        _file_exporter.close()
+    _file_exporter = _FileExporter(path) if exporter == "file" else None
+    if exporter == "otel":
+        from opentelemetry import trace
+
+        _otel_tracer = trace.get_tracer(_SCOPE)
+    else:
+        _otel_tracer = None
+    _sample_rate = max(0.0, min(1.0, sample_rate)) if exporter else 0.0
+
+
+def current() -> Span | _NoSpan:
+    """Span courant, ou NO_SPAN hors requête échantillonnée."""
+    return _current.get() or NO_SPAN
+
+
+def start(name: str, **attributes) -> Span | _NoSpan:
+    """Ouvre un span enfant du span courant, sans le rendre courant.
+
+    Pour les générateurs : un span actif ne doit pas rester courant à
+    travers un ``yield``. :func:`activate` le rend courant le temps d'un
+    appel.
+    """
+    parent = _current.get()
+    if parent is None:
+        return NO_SPAN
+    return Span(name, parent, attributes)
+
+
+@contextlib.contextmanager
+def activate(span: Span | _NoSpan) -> Iterator[None]:
+    """Rend ``span`` courant dans ce bloc (sans le terminer)."""
+    if span is NO_SPAN:
+        yield
+        return
+    token = _current.set(span)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes) -> Iterator[Span | _NoSpan]:
+    """``with span("g2p"):`` — span enfant du span courant, courant dans le bloc."""
+    opened = start(name, **attributes)
+    if opened is NO_SPAN:
+        yield opened
+        return
+    token = _current.set(opened)
+    try:
+        yield opened
+    except BaseException as exc:
+        opened.end(exc)
+        raise
+    finally:
+        _current.reset(token)
+        opened.end()
+
+
+@contextlib.contextmanager
+def trace(name: str, **attributes) -> Iterator[Span | _NoSpan]:
+    """Span racine d'une requête, ouvert selon le taux d'échantillonnage."""
+    if not _sample_rate or random.random() >= _sample_rate:
+        yield NO_SPAN
+        return
+    root = Span(name, None, attributes)
+    token = _current.set(root)
+    try:
+        yield root
+    except BaseException as exc:
+        root.end(exc)
+        raise
+    finally:
+        _current.reset(token)
+        root.end()
+
+
+def propagate(fn: Callable) -> Callable:
+    """``fn`` exécuté dans le contexte courant (span, request id), pour un pool."""
+    context = contextvars.copy_context()
+    # Une copie par appel : un contexte ne peut être actif que dans un thread
+    return lambda *args: context.copy().run(fn, *args)
+
+
+def install_log_request_id() -> None:
+    """Ajoute ``request_id`` à tous les enregistrements de log du processus.
+
+    Passe par la fabrique d'enregistrements plutôt que par un filtre : les
+    handlers installés par le serveur (uvicorn, gunicorn) en profitent aussi.
+    """
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "_with_request_id", False):
+        return
+
+    def make_record(*args, **kwargs) -> logging.LogRecord:
+        record = factory(*args, **kwargs)
+        record.request_id = request_id.get()
+        return record
+
+    make_record._with_request_id = True
+    logging.setLogRecordFactory(make_record)
+
+
+class TracingMiddleware:
+    """Middleware ASGI : identifiant de requête et span racine de la requête.
+
+    Le span couvre toute la réponse, streaming compris, et porte la méthode,
+    le chemin, le statut et l'identifiant de requête.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or ())
+        incoming = headers.get(b"x-request-id", b"").decode("latin-1")
+        rid = incoming if _REQUEST_ID_RE.fullmatch(incoming) else uuid.uuid4().hex
+        token = request_id.set(rid)
+
+        with trace(
+            f"{scope['method']} {scope['path']}",
+            **{
+                "http.request.method": scope["method"],
+                "url.path": scope["path"],
+                "request.id": rid,
+            },
+        ) as root:
+
+            async def send_with_id(message) -> None:
+                if message["type"] == "http.response.start":
+                    root.set("http.response.status_code", message["status"])
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", ()),
+                            (b"x-request-id", rid.encode()),
+                        ],
+                    }
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                request_id.reset(token)
@@ -1,9 +1,28 @@
+import functools
+import queue
 import re
-from collections.abc import Iterator
-from typing import Tuple
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Tuple, TypeVar
 
 import numpy as np
 
+import tracing
+from audio_buffer import AudioBuffer
+from audio_dsp import SegmentJoiner
+from inference import (
+    BACKENDS,
+    configure_threads,
+    map_weights,
+    model_memory,
+    prepare_model,
+)
+from lexicon import Lexicon
+from memory import release_memory
+from normalizer import normalize
+from phrase_pack import PhrasePack
+
 # Mots français qu'espeak-ng traite comme anglais.
 # On les remplace par des graphies phonétiques que le G2P français gère correctement.
 # Layer 1 : corrections text-level pour les vrais mots FR (ex: "dos" → s final muet).
@@ -78,8 +97,52 @@ PROPER_NAMES: dict[str, str] = {
 }
 
 
-def _fix_pronunciation(text: str) -> str:
-    """Remplace les mots problématiques avant le passage au G2P."""
+# Balise inline de prononciation : « [mot](/phonèmes/) », même syntaxe que misaki.
+# Les phonèmes entre slashs sont envoyés tels quels au modèle, sans espeak.
+_PHONEME_MARKUP_RE = re.compile(r"\[([^\]\n]+)\]\(/([^/\n]+)/\)")
+# Pas d'espace avant la ponctuation quand un morceau phonémisé suit une balise
+_MARKUP_JOIN_RE = re.compile(r" ([,.;:!?…])")
+INPUT_FORMATS = ("text", "phonemes")
+# Fréquence de sortie de Kokoro, connue sans charger le modèle
+SAMPLE_RATE = 24_000
+
+
+def _split_markup(text: str) -> list[tuple[str, str | None]]:
+    """Découpe ``text`` en ``(morceau, phonèmes)``, phonèmes à None hors balise."""
+    parts: list[tuple[str, str | None]] = []
+    last = 0
+    for m in _PHONEME_MARKUP_RE.finditer(text):
+        if m.start() > last:
+            parts.append((text[last : m.start()], None))
+        parts.append((m.group(0), m.group(2)))
+        last = m.end()
+    if last < len(text):
+        parts.append((text[last:], None))
+    return parts
+
+
+def _fix_pronunciation(text: str, lexicon: Lexicon | None = None) -> str:
+    """Remplace les mots problématiques avant le passage au G2P.
+
+    Un lexique externe, s'il est fourni, passe en premier : les termes métier
+    priment sur les corrections intégrées. Les nombres, dates, unités et
+    montants sont ensuite écrits en toutes lettres (voir normalizer.py). Les balises ``[mot](/phonèmes/)``
+    sont laissées intactes.
+    """
+    with tracing.span("fix_pronunciation", chars=len(text)):
+        if "](/" in text:
+            return "".join(
+                part if phonemes is not None else _fix_text(part, lexicon)
+                for part, phonemes in _split_markup(text)
+            )
+        return _fix_text(text, lexicon)
+
+
+def _fix_text(text: str, lexicon: Lexicon | None) -> str:
+    if lexicon is not None:
+        text = lexicon.apply(text)
+    # Nombres, dates, unités... en toutes lettres
+    text = normalize(text)
     # Noms propres d'abord (case-sensitive, full names avant last names)
     for pattern, replacement in PROPER_NAMES.items():
         text = re.sub(pattern, replacement, text)
@@ -122,8 +185,13 @@ _EN_SWITCH_RE = re.compile(r"\(\^e\^n\)(.*?)\(\^f\^r\)")
 _EN_SWITCH_RE_NOTIE = re.compile(r"\(en\)(.*?)\(fr\)")
 
 
+@functools.lru_cache(maxsize=4096)
 def _map_en_to_fr(phonemes: str) -> str:
-    """Applique le mapping IPA anglais → français sur une section de phonèmes."""
+    """Applique le mapping IPA anglais → français sur une section de phonèmes.
+
+    Mémoïsé : les sections sont des mots courts, et les mêmes anglicismes
+    reviennent sans cesse dans un long document.
+    """
     for old, new in EN_TO_FR:
         phonemes = phonemes.replace(old, new)
     return phonemes
@@ -139,94 +207,335 @@ def _fix_en_switches(ps: str) -> str:
     # Normaliser les flags avec tie
     ps = _EN_SWITCH_RE.sub(lambda m: _map_en_to_fr(m.group(1)), ps)
     # Nettoyer d'éventuels flags sans tie
-    ps = _EN_SWITCH_RE_NOTIE.sub(lambda m: _map_en_to_fr(m.group(1)), ps)
+    if "(en)" in ps:
+        ps = _EN_SWITCH_RE_NOTIE.sub(lambda m: _map_en_to_fr(m.group(1)), ps)
     return ps
 
 
+# Mêmes mappings e2m qu'EspeakG2P pour compatibilité Kokoro
+_E2M: tuple[tuple[str, str], ...] = tuple(
+    sorted(
+        {
+            "a^ɪ": "I",
+            "a^ʊ": "W",
+            "d^z": "ʣ",
+            "d^ʒ": "ʤ",
+            "e^ɪ": "A",
+            "o^ʊ": "O",
+            "ə^ʊ": "Q",
+            "s^s": "S",
+            "t^s": "ʦ",
+            "t^ʃ": "ʧ",
+            "ɔ^ɪ": "Y",
+        }.items()
+    )
+)
+
+
+def _postprocess_phonemes(ps: str) -> str:
+    """Réécrit la sortie espeak en tokens Kokoro (switches, e2m, ties, tirets).
+
+    Les str.replace tournent en C et restent plus rapides qu'une passe unique
+    en regex avec callback Python (voir benchmarks/bench_phonemes.py) ; on
+    saute donc surtout les passes qui ne peuvent rien trouver : sans
+    parenthèse pas de switch anglais, sans tie pas de diphtongue ni
+    d'affriquée — le cas de la grande majorité des segments français.
+    """
+    if "(" in ps:
+        # Corriger les switches anglais AVANT le mapping e2m
+        ps = _fix_en_switches(ps)
+    if "^" in ps:
+        # Diphtongues/affriquées → tokens Kokoro, puis ties restants
+        for old, new in _E2M:
+            ps = ps.replace(old, new)
+        ps = ps.replace("^", "")
+    # Supprimer les tirets, angles back to parentheses
+    return ps.replace("-", "").replace("«", "(").replace("»", ")")
+
+
+def _espeak_backend():
+    import phonemizer.backend
+
+    return phonemizer.backend.EspeakBackend(
+        language="fr-fr",
+        preserve_punctuation=True,
+        with_stress=True,
+        tie="^",
+        language_switch="keep-flags",
+    )
+
+
+# Découpage appliqué par KPipeline (kokoro 0.9) avant d'appeler le G2P pour les
+# langues non anglaises : lignes, puis phrases regroupées jusqu'à 400 caractères.
+_PIPELINE_LINES_RE = re.compile(r"\n+")
+_PIPELINE_SENTENCES_RE = re.compile(r"([.!?]+)")
+_PIPELINE_CHUNK_SIZE = 400
+# Résultats préchargés non consommés (segment annulé...) : on borne la mémoire
+_MAX_PREFETCHED = 64
+
+
+def _pipeline_chunks(text: str) -> list[str]:
+    """Textes que KPipeline passera au G2P pour ``text``.
+
+    Sert uniquement de clé au préchargement : si kokoro change de découpage,
+    le préchargement rate et le G2P se fait simplement à la demande.
+    """
+    chunks: list[str] = []
+    for graphemes in _PIPELINE_LINES_RE.split(text.strip()):
+        if not graphemes.strip():
+            continue
+        sentences = _PIPELINE_SENTENCES_RE.split(graphemes)
+        current = ""
+        found: list[str] = []
+        for i in range(0, len(sentences), 2):
+            sentence = sentences[i]
+            if i + 1 < len(sentences):
+                sentence += sentences[i + 1]
+            if len(current) + len(sentence) <= _PIPELINE_CHUNK_SIZE:
+                current += sentence
+            else:
+                if current:
+                    found.append(current.strip())
+                current = sentence
+        if current:
+            found.append(current.strip())
+        chunks.extend(c for c in (found or [graphemes]) if c.strip())
+    return chunks
+
+
 class FrenchG2P:
     """G2P français avec détection et correction automatique des switches anglais.
 
     Drop-in replacement pour EspeakG2P. Utilise language_switch='keep-flags'
     pour préserver les marqueurs (en)...(fr), puis mappe les phonèmes anglais
     vers des phonèmes français.
+
+    Un EspeakBackend ne supporte pas les appels concurrents : le G2P garde un
+    pool de ``pool_size`` backends indépendants (phonemizer charge une copie
+    de libespeak par instance), prêtés à chaque appel. :meth:`prefetch` lance
+    la phonémisation d'un texte en arrière-plan sur ce pool ; l'appel suivant
+    avec le même texte récupère le résultat au lieu de relancer espeak.
     """
 
-    def __init__(self) -> None:
-        import phonemizer.backend
-
-        self.backend = phonemizer.backend.EspeakBackend(
-            language="fr-fr",
-            preserve_punctuation=True,
-            with_stress=True,
-            tie="^",
-            language_switch="keep-flags",
-        )
-        # Mêmes mappings e2m qu'EspeakG2P pour compatibilité Kokoro
-        self.e2m = sorted(
-            {
-                "a^ɪ": "I",
-                "a^ʊ": "W",
-                "d^z": "ʣ",
-                "d^ʒ": "ʤ",
-                "e^ɪ": "A",
-                "o^ʊ": "O",
-                "ə^ʊ": "Q",
-                "s^s": "S",
-                "t^s": "ʦ",
-                "t^ʃ": "ʧ",
-                "ɔ^ɪ": "Y",
-            }.items()
-        )
+    def __init__(
+        self,
+        pool_size: int = 1,
+        backend_factory: Callable[[], object] = _espeak_backend,
+    ) -> None:
+        self.pool_size = pool_size
+        self.backends = tuple(backend_factory() for _ in range(pool_size))
+        self._idle: queue.SimpleQueue = queue.SimpleQueue()
+        for backend in self.backends:
+            self._idle.put(backend)
+        self._executor = ThreadPoolExecutor(pool_size, thread_name_prefix="g2p")
+        self._prefetched: dict[str, Future] = {}
+        self._prefetch_lock = threading.Lock()
+        self.e2m = list(_E2M)
 
     def __call__(self, text: str) -> Tuple[str, None]:
+        with self._prefetch_lock:
+            future = self._prefetched.pop(text, None)
+        if future is not None:
+            with tracing.span("g2p.wait", chars=len(text)):
+                return future.result(), None
+        return self._convert(text), None
+
+    def map(self, texts: Iterable[str]) -> list[str]:
+        """Phonémise plusieurs textes en parallèle sur le pool."""
+        return list(self._executor.map(tracing.propagate(self._convert), texts))
+
+    def prefetch(self, text: str) -> None:
+        """Phonémise en arrière-plan les morceaux que KPipeline demandera pour ``text``."""
+        with self._prefetch_lock:
+            for chunk in _pipeline_chunks(text):
+                if chunk in self._prefetched:
+                    continue
+                if len(self._prefetched) >= _MAX_PREFETCHED:
+                    del self._prefetched[next(iter(self._prefetched))]
+                # Le span de la requête suit le texte dans le pool
+                self._prefetched[chunk] = self._executor.submit(
+                    tracing.propagate(self._convert), chunk
+                )
+
+    def _convert(self, text: str) -> str:
+        with tracing.span("g2p", chars=len(text)):
+            if "](/" in text:
+                return self._phonemize_with_markup(text)
+            return self._phonemize(text)
+
+    def _phonemize_with_markup(self, text: str) -> str:
+        # Seuls les morceaux hors balise passent par espeak, en un seul appel
+        parts = _split_markup(text)
+        plain = [part for part, phonemes in parts if phonemes is None and part.strip()]
+        phonemized = iter(self._phonemize_many(plain))
+        pieces = []
+        for part, phonemes in parts:
+            if phonemes is not None:
+                pieces.append(phonemes.strip())
+            elif part.strip():
+                pieces.append(next(phonemized))
+        return _MARKUP_JOIN_RE.sub(r"\1", " ".join(p for p in pieces if p))
+
+    def _phonemize(self, text: str) -> str:
+        return self._phonemize_many([text])[0] if text else ""
+
+    def _phonemize_many(self, texts: list[str]) -> list[str]:
+        if not texts:
+            return []
         # Angles to curly quotes (same as EspeakG2P)
-        text = text.replace("«", chr(8220)).replace("»", chr(8221))
-        # Parentheses to angles (protège les parenthèses du texte)
-        text = text.replace("(", "«").replace(")", "»")
-        ps = self.backend.phonemize([text])
+        texts = [
+            t.replace("«", chr(8220))
+            .replace("»", chr(8221))
+            # Parentheses to angles (protège les parenthèses du texte)
+            .replace("(", "«")
+            .replace(")", "»")
+            for t in texts
+        ]
+        backend = self._idle.get()
+        try:
+            ps = backend.phonemize(texts)
+        finally:
+            self._idle.put(backend)
         if not ps:
-            return "", None
-        ps = ps[0].strip()
-        # Corriger les switches anglais AVANT le mapping e2m
-        ps = _fix_en_switches(ps)
-        # Appliquer les mappings e2m (diphthongues/affricates → tokens Kokoro)
-        for old, new in self.e2m:
-            ps = ps.replace(old, new)
-        # Supprimer les ties restants et les tirets
-        ps = ps.replace("^", "")
-        ps = ps.replace("-", "")
-        # Angles back to parentheses
-        ps = ps.replace("«", "(").replace("»", ")")
-        return ps, None
+            return [""] * len(texts)
+        return [_postprocess_phonemes(p.strip()) for p in ps]
+
 
+# Contexte maximal de Kokoro, en tokens phonémiques (au plus un par caractère)
+_MAX_PHONEMES_PER_CHUNK = 510
 
 # Approximate max tokens per segment to avoid Kokoro rushing long texts.
 # Kokoro uses ~1 token per character on average for French.
 _MAX_CHARS_PER_SEGMENT = 800  # ~200 tokens, conservative estimate
 
 # Sentence-ending punctuation for splitting
-_SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;…])\s+")
+# Mot qui précède un point : s'il s'agit d'une abréviation, ce n'est pas une fin de phrase
+_WORD_BEFORE_DOT_RE = re.compile(r"(\w+)\.$")
+_ABBREVIATIONS = frozenset(
+    {
+        # Civilités et titres
+        "M", "MM", "Mme", "Mmes", "Mlle", "Mlles", "Me", "Mgr", "Dr", "Pr", "St", "Ste",
+        # Références et adresses
+        "av", "bd", "boul", "cf", "chap", "coll", "env", "ex", "fig", "art",
+        "p", "pp", "vol", "éd", "n", "no", "tél", "réf", "min", "max", "approx",
+    }
+)  # fmt: skip
+
+# Points de coupe des phrases trop longues, du plus naturel au plus arbitraire :
+# ponctuation de proposition, conjonctions, puis espaces (jamais entre deux chiffres,
+# pour ne pas couper « 1 000 000 »).
+_CLAUSE_SPLIT_RES = (
+    re.compile(r"(?<=[,:;—)])\s+"),
+    re.compile(
+        r"\s+(?=(?:et|ou|mais|donc|car|puis|ni|or|qui|que|dont|où|lorsque|"
+        r"puisque|quand|comme|alors|parce)\b)"
+    ),
+    re.compile(r"(?<!\d)\s+|\s+(?!\d)"),
+)
+
+
+def _is_sentence_end(text: str, pos: int) -> bool:
+    """Vrai si l'espace en ``pos`` suit une vraie fin de phrase."""
+    if text[pos - 1] != ".":
+        return True
+    # « M. Dupont », « p. 12 », « il y a 3 min. et ... » : pas une fin de phrase
+    following = text[pos + 1 : pos + 2]
+    if following and (following.islower() or following.isdigit()):
+        return False
+    match = _WORD_BEFORE_DOT_RE.search(text, max(0, pos - 12), pos)
+    if match is None:
+        return True
+    word = match.group(1)
+    # Initiales (« J. K. Rowling », « J.-C. ») et abréviations connues
+    return not (len(word) == 1 and word.isupper()) and word not in _ABBREVIATIONS
+
+
+def _iter_split(pattern: re.Pattern, text: str) -> Iterator[str]:
+    """Équivalent paresseux de ``pattern.split(text)``."""
+    start = 0
+    for match in pattern.finditer(text):
+        yield text[start : match.start()]
+        start = match.end()
+    yield text[start:]
+
+
+def _iter_sentences(text: str, phonemes: bool = False) -> Iterator[str]:
+    """Yield les phrases du texte, lues paresseusement via finditer.
+
+    ``phonemes`` : l'IPA est en minuscules et sans abréviations, chaque
+    ponctuation finale termine donc une phrase.
+    """
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if phonemes or _is_sentence_end(text, match.start()):
+            yield text[start : match.start()]
+            start = match.end()
+    yield text[start:]
 
 
-def _split_into_segments(
-    text: str, max_chars: int = _MAX_CHARS_PER_SEGMENT
-) -> list[str]:
-    """Split text into segments of ~max_chars at sentence boundaries.
+def _split_long(sentence: str, max_chars: int, level: int = 0) -> Iterator[str]:
+    """Découpe une phrase trop longue en morceaux de max_chars au plus.
 
-    Returns the original text as a single segment if it's short enough.
+    Essaie d'abord les virgules/deux-points, puis les conjonctions, puis les
+    espaces ; un mot plus long que max_chars est coupé net.
+    """
+    if len(sentence) <= max_chars:
+        yield sentence
+        return
+    if level == len(_CLAUSE_SPLIT_RES):
+        for start in range(0, len(sentence), max_chars):
+            yield sentence[start : start + max_chars]
+        return
+
+    current = ""
+    for piece in _iter_split(_CLAUSE_SPLIT_RES[level], sentence):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if current and len(current) + 1 + len(piece) <= max_chars:
+            current = f"{current} {piece}"
+            continue
+        if current:
+            yield current
+        current = ""
+        if len(piece) > max_chars:
+            yield from _split_long(piece, max_chars, level + 1)
+        else:
+            current = piece
+    if current:
+        yield current
+
+
+def _iter_segments(
+    text: str, max_chars: int = _MAX_CHARS_PER_SEGMENT, phonemes: bool = False
+) -> Iterator[str]:
+    """Yield segments of at most max_chars at sentence boundaries.
+
+    Sentences are scanned lazily, so the first segment is available without
+    reading the whole text and no intermediate list is built. Abbreviations
+    (M., Mme., p. 12...) do not end a sentence, and a sentence longer than
+    max_chars is split at clauses, conjunctions, then words. Yields the
+    original text as a single segment if it's short enough. With
+    ``phonemes``, every final punctuation ends a sentence (IPA input).
     """
     if len(text) <= max_chars:
-        return [text]
+        yield text
+        return
 
-    sentences = _SENTENCE_END_RE.split(text)
-    segments: list[str] = []
     current: list[str] = []
     current_len = 0
 
-    for sentence in sentences:
+    for sentence in _iter_sentences(text, phonemes):
+        if len(sentence) > max_chars:
+            if current:
+                yield " ".join(current)
+                current, current_len = [], 0
+            yield from _split_long(sentence, max_chars)
+            continue
         sentence_len = len(sentence)
-        if current and current_len + sentence_len > max_chars:
-            segments.append(" ".join(current))
+        if current and current_len + len(current) + sentence_len > max_chars:
+            yield " ".join(current)
             current = [sentence]
             current_len = sentence_len
         else:
@@ -234,48 +543,389 @@ def _split_into_segments(
             current_len += sentence_len
 
     if current:
-        segments.append(" ".join(current))
+        yield " ".join(current)
+
+
+# Kokoro prédit une durée par token phonémique, en frames de 600 échantillons à 24 kHz.
+_SAMPLES_PER_FRAME = 600
+_PHONEME_PUNCT = ';:,.!?¡¿—…"«»“”()'
+
 
-    return segments
+def _word_timings(
+    graphemes: str,
+    phonemes: str,
+    pred_dur,
+    vocab: dict | None = None,
+    offset: float = 0.0,
+    sample_rate: int = SAMPLE_RATE,
+) -> list[dict]:
+    """Aligne les mots phonémiques sur les durées prédites par Kokoro.
+
+    ``pred_dur`` contient une durée par token d'entrée du modèle : <bos>, chaque
+    phonème présent dans ``vocab`` (les autres sont ignorés par Kokoro), <eos>.
+    Le texte de chaque mot n'est renseigné que si le découpage en mots des
+    graphèmes correspond à celui des phonèmes, sinon il vaut None.
+    """
+    if hasattr(pred_dur, "cpu"):
+        pred_dur = pred_dur.cpu().numpy()
+    bounds = np.concatenate(([0], np.cumsum(np.asarray(pred_dur, dtype=np.int64))))
+    frame = _SAMPLES_PER_FRAME / sample_rate
+
+    spans: list[tuple[str, int, int]] = []
+    current: list[str] = []
+    first = last = 0
+    token = 1  # saute <bos>
+    for ch in phonemes:
+        if vocab is not None and ch not in vocab:
+            continue
+        if token >= len(bounds) - 2:
+            break
+        if ch == " " or ch in _PHONEME_PUNCT:
+            if current:
+                spans.append(("".join(current), first, last))
+                current = []
+        else:
+            if not current:
+                first = token
+            current.append(ch)
+            last = token
+        token += 1
+    if current:
+        spans.append(("".join(current), first, last))
+
+    if "](/" in graphemes:
+        graphemes = _PHONEME_MARKUP_RE.sub(r"\1", graphemes)
+    texts: list[str | None] = [
+        w for w in (w.strip(_PHONEME_PUNCT) for w in graphemes.split()) if w
+    ]
+    if len(texts) != len(spans):
+        texts = [None] * len(spans)
+    return [
+        {
+            "text": word,
+            "phonemes": ps,
+            "start": offset + float(bounds[first]) * frame,
+            "end": offset + float(bounds[last + 1]) * frame,
+        }
+        for word, (ps, first, last) in zip(texts, spans)
+    ]
+
+
+_T = TypeVar("_T")
+
+
+def _short_first(
+    items: Iterator[tuple[str, np.ndarray | None]], max_chars: int
+) -> Iterator[tuple[str, np.ndarray | None]]:
+    """Coupe le premier segment à synthétiser à ``max_chars`` caractères."""
+    for segment, audio in items:
+        if audio is not None or len(segment) <= max_chars:
+            yield segment, audio
+            continue
+        pieces = _split_long(segment, max_chars)
+        yield next(pieces), None
+        rest = " ".join(pieces)
+        if rest:
+            yield rest, None
+        break
+    yield from items
+
+
+def _with_prefetch(
+    segments: Iterator[_T], prefetch: Callable[[_T], None]
+) -> Iterator[_T]:
+    """Lance le G2P du segment suivant pendant la synthèse du segment courant.
+
+    Un seul segment d'avance : la mémoire reste bornée sur les longs textes.
+    """
+    current = next(segments, None)
+    if current is not None:
+        prefetch(current)
+    while current is not None:
+        following = next(segments, None)
+        if following is not None:
+            prefetch(following)
+        yield current
+        current = following
+
+
+def _pack_segments(
+    text: str, pack: PhrasePack, voice: str, speed: float, max_chars: int
+) -> Iterator[tuple[str, np.ndarray | None]]:
+    """Yield ``(texte, audio)`` : audio du phrase pack, ou None à synthétiser.
+
+    Le texte entier est d'abord cherché tel quel, puis phrase par phrase ;
+    les phrases absentes du pack sont regroupées en segments comme par
+    _iter_segments, sans attendre la fin du texte.
+    """
+    audio = pack.get(text, voice, speed)
+    if audio is not None:
+        yield text, audio
+        return
+    run: list[str] = []
+    run_len = 0
+    for sentence in _iter_sentences(text):
+        audio = pack.get(sentence, voice, speed) if sentence.strip() else None
+        if audio is None:
+            run.append(sentence)
+            run_len += len(sentence) + 1
+            if run_len < max_chars:
+                continue
+        if run:
+            for segment in _iter_segments(" ".join(run), max_chars):
+                yield segment, None
+            run, run_len = [], 0
+        if audio is not None:
+            yield sentence, audio
+    if run:
+        for segment in _iter_segments(" ".join(run), max_chars):
+            yield segment, None
 
 
 class KokoroEngine:
     """Moteur TTS basé sur Kokoro (français, voix ff_siwis)."""
 
-    def __init__(self, voice: str = "ff_siwis", speed: float = 1.0):
+    def __init__(
+        self,
+        voice: str = "ff_siwis",
+        speed: float = 1.0,
+        g2p_pool_size: int = 2,
+        backend: str = "eager",
+        threads: int | None = None,
+        postprocess: bool = True,
+        phrase_pack: PhrasePack | None = None,
+        weights: str | None = None,
+    ):
+        """``backend`` : eager, int8 ou compile (voir inference.py) ;
+        ``threads`` : threads intra-op de torch (défaut : ceux de torch) ;
+        ``postprocess`` : rognage des silences et pauses aux jointures des
+        chunks (voir audio_dsp.py) ;
+        ``phrase_pack`` : audio pré-calculé servi sans inférence pour les
+        phrases qu'il contient (voir phrase_pack.py) ;
+        ``weights`` : fichier de poids mappé en mémoire et partagé entre
+        processus, créé au premier démarrage (voir inference.map_weights)."""
         from kokoro import KPipeline
 
+        if backend not in BACKENDS:
+            raise ValueError(f"backend inconnu : {backend!r}")
+        configure_threads(threads)
         self.pipeline = KPipeline(lang_code="f", repo_id="hexgrad/Kokoro-82M")
-        self.pipeline.g2p = FrenchG2P()
+        self.weights = weights
+        if weights:
+            map_weights(self.pipeline.model, weights)
+        prepare_model(self.pipeline.model, backend)
+        self.backend = backend
+        self.postprocess = postprocess
+        self.phrase_pack = phrase_pack
+        # Deux backends par défaut : le G2P du segment suivant tourne pendant
+        # l'inférence du segment courant. Le G2P espeak créé par KPipeline
+        # est abandonné.
+        self.pipeline.g2p = FrenchG2P(pool_size=g2p_pool_size)
+        # Poids d'origine (remplacés par le mmap ou l'int8) et G2P abandonné
+        release_memory()
         self.voice = voice
         self.speed = speed
-        self.sample_rate = 24_000
+        self.sample_rate = SAMPLE_RATE
+
+    def memory(self) -> dict:
+        """Empreinte du moteur : poids du modèle (dont mappés), G2P, pack."""
+        g2p = getattr(self.pipeline, "g2p", None)
+        return {
+            "backend": self.backend,
+            "weights_file": self.weights,
+            "model": model_memory(self.pipeline.model),
+            "g2p_backends": len(getattr(g2p, "backends", ())),
+            "voices_loaded": len(getattr(self.pipeline, "voices", {})),
+            "phrase_pack": (
+                {"phrases": len(self.phrase_pack), "bytes": self.phrase_pack.size}
+                if self.phrase_pack is not None
+                else None
+            ),
+        }
 
     def generate(self, text: str) -> tuple[np.ndarray, int]:
-        text = _fix_pronunciation(text)
-        chunks = []
-        for _gs, _ps, audio in self.pipeline(text, voice=self.voice, speed=self.speed):
+        buf = AudioBuffer(dtype=np.float32)
+        for audio in self.generate_stream(text):
+            buf.append(audio)
+        return buf.trim(), self.sample_rate
+
+    def _iter_results(
+        self,
+        text: str,
+        voice: str | None,
+        speed: float | None,
+        cancel: threading.Event | None,
+        lexicon: Lexicon | None = None,
+        input_format: str = "text",
+        first_segment_chars: int | None = None,
+    ) -> Iterator[tuple[str, str, np.ndarray, object]]:
+        """Yield ``(graphemes, phonemes, audio, pred_dur)`` pour chaque chunk Kokoro.
+
+        Tout est paresseux : segmentation et corrections de prononciation se
+        font segment par segment, jamais sur le texte complet, pour que la
+        mémoire reste bornée quelle que soit la longueur de l'entrée.
+
+        Avec ``input_format="phonemes"``, ``text`` est déjà une chaîne de
+        phonèmes Kokoro : ni corrections ni espeak, chaque segment (au plus
+        510 phonèmes) part directement au modèle.
+
+        Les phrases présentes dans ``phrase_pack`` sortent du mmap, avec
+        des phonèmes vides et sans ``pred_dur``.
+
+        ``first_segment_chars`` raccourcit le premier segment (coupé à une
+        proposition, sinon entre deux mots) : le premier chunk arrive plus
+        tôt, au prix d'une jointure de plus.
+        """
+        if input_format not in INPUT_FORMATS:
+            raise ValueError(f"input_format inconnu : {input_format!r}")
+        voice = voice or self.voice
+        speed = speed if speed is not None else self.speed
+        phonemes = input_format == "phonemes"
+        max_chars = _MAX_PHONEMES_PER_CHUNK if phonemes else _MAX_CHARS_PER_SEGMENT
+        pack = self.phrase_pack
+        if not phonemes and pack is not None and pack.accepts(lexicon, self.backend):
+            items = _pack_segments(text, pack, voice, speed, max_chars)
+        else:
+            items = ((s, None) for s in _iter_segments(text, max_chars, phonemes))
+        if first_segment_chars and not phonemes:
+            items = _short_first(items, first_segment_chars)
+        if not phonemes:
+            items = (
+                (s if audio is not None else _fix_pronunciation(s, lexicon), audio)
+                for s, audio in items
+            )
+            prefetch = getattr(getattr(self.pipeline, "g2p", None), "prefetch", None)
+            if prefetch is not None:
+                items = _with_prefetch(
+                    items, lambda item: item[1] is None and prefetch(item[0])
+                )
+        for segment, audio in items:
+            if cancel is not None and cancel.is_set():
+                return
             if audio is not None:
-                chunks.append(audio)
-        if not chunks:
-            return np.array([], dtype=np.float32), self.sample_rate
-        return np.concatenate(chunks), self.sample_rate
+                # Phrase du pack : aucun travail du modèle
+                yield segment, "", audio, None
+                continue
+            if phonemes:
+                results = self.pipeline.generate_from_tokens(
+                    segment, voice=voice, speed=speed
+                )
+            else:
+                results = self.pipeline(segment, voice=voice, speed=speed)
+            results = iter(results)
+            while True:
+                # G2P (s'il n'a pas été préchargé) et modèle, chunk par chunk ;
+                # le dernier appel, sans chunk, n'est pas exporté
+                inference = tracing.start("inference", chars=len(segment))
+                with tracing.activate(inference):
+                    result = next(results, None)
+                if result is None:
+                    break
+                inference.end()
+                gs, ps, audio = result
+                if audio is not None:
+                    pred_dur = getattr(result, "pred_dur", None)
+                    yield gs, ps, np.asarray(audio, dtype=np.float32), pred_dur
+                if cancel is not None and cancel.is_set():
+                    return
 
     def generate_stream(
         self,
         text: str,
         voice: str | None = None,
         speed: float | None = None,
+        cancel: threading.Event | None = None,
+        lexicon: Lexicon | None = None,
+        input_format: str = "text",
+        first_segment_chars: int | None = None,
     ) -> Iterator[np.ndarray]:
         """Yield les chunks audio au fur et à mesure de la génération.
 
         Long texts are split into segments at sentence boundaries to avoid
         Kokoro rushing the output on large inputs.
+
+        ``cancel`` permet d'interrompre la génération de façon coopérative :
+        l'event est vérifié entre chaque segment et chaque chunk, le générateur
+        s'arrête alors sans lancer de nouvelle inférence.
+
+        ``lexicon`` ajoute un lexique de prononciation externe pour ce texte.
+        ``input_format="phonemes"`` envoie ``text`` tel quel au modèle, comme
+        chaîne de phonèmes Kokoro, sans passer par espeak.
+        ``first_segment_chars`` raccourcit le premier segment pour réduire
+        le délai avant le premier chunk.
+
+        Avec ``postprocess``, les chunks traversent un SegmentJoiner : les
+        silences de bord sont rognés et remplacés par des pauses selon la
+        ponctuation, sans jamais retenir plus de quelques millisecondes.
         """
-        text = _fix_pronunciation(text)
-        voice = voice or self.voice
-        speed = speed if speed is not None else self.speed
-        for segment in _split_into_segments(text):
-            for _gs, _ps, audio in self.pipeline(segment, voice=voice, speed=speed):
-                if audio is not None:
-                    yield np.asarray(audio, dtype=np.float32)
+        joiner = SegmentJoiner(self.sample_rate) if self.postprocess else None
+        for gs, ps, audio, _dur in self._iter_results(
+            text, voice, speed, cancel, lexicon, input_format, first_segment_chars
+        ):
+            if joiner is not None:
+                audio = joiner.process(audio, gs or ps)
+                if not len(audio):
+                    continue
+            yield audio
+        if joiner is not None:
+            tail = joiner.flush()
+            if len(tail):
+                yield tail
+
+    def generate_stream_with_timings(
+        self,
+        text: str,
+        voice: str | None = None,
+        speed: float | None = None,
+        cancel: threading.Event | None = None,
+        lexicon: Lexicon | None = None,
+        input_format: str = "text",
+        first_segment_chars: int | None = None,
+    ) -> Iterator[tuple[np.ndarray, dict]]:
+        """Comme generate_stream, avec les timings de chaque chunk.
+
+        Les timings sont un sous-produit de la synthèse (durées prédites par
+        Kokoro), sans passe d'alignement forcé. Chaque chunk audio est
+        accompagné d'un dict ``{"text", "phonemes", "start", "end", "words"}``
+        dont les temps sont en secondes depuis le début du flux.
+        """
+        vocab = getattr(getattr(self.pipeline, "model", None), "vocab", None)
+        sr = self.sample_rate
+        joiner = SegmentJoiner(sr) if self.postprocess else None
+        offset = 0
+        # Avec le joiner, chaque chunk est émis au suivant : la fin retenue du
+        # dernier chunk (flush) peut ainsi lui être rattachée
+        pending: tuple[np.ndarray, dict] | None = None
+        for gs, ps, audio, pred_dur in self._iter_results(
+            text, voice, speed, cancel, lexicon, input_format, first_segment_chars
+        ):
+            if joiner is None:
+                origin, span = offset, (offset, offset + len(audio))
+                offset += len(audio)
+            else:
+                audio = joiner.process(audio, gs or ps)
+                origin, span = joiner.last_offset, joiner.last_span
+            start, end = span[0] / sr, span[1] / sr
+            words = []
+            if pred_dur is not None:
+                words = _word_timings(gs, ps, pred_dur, vocab, origin / sr, sr)
+                for word in words:
+                    # Les bords rognés ne doivent pas sortir du chunk
+                    word["start"] = min(max(word["start"], start), end)
+                    word["end"] = min(max(word["end"], word["start"]), end)
+            timings = {
+                "text": gs,
+                "phonemes": ps,
+                "start": start,
+                "end": end,
+                "words": words,
+            }
+            if joiner is None:
+                yield audio, timings
+                continue
+            if pending is not None:
+                yield pending
+            pending = (audio, timings)
+        if pending is not None:
+            audio, timings = pending
+            yield np.concatenate([audio, joiner.flush()]), timings